@@ -13,7 +13,9 @@ sys.path.insert(0, project_root)
 from sqlmodel import SQLModel
 
 from app.core.config import settings
-from app.models.subscription import Subscription
+from app.models.analytics import CreatorRevenueDaily, CreatorTierStats
+from app.models.outbox import OutboxEvent
+from app.models.subscription import Subscription, SubscriptionHistory
 from app.models.tier import Tier
 
 config = context.config
@@ -70,8 +72,15 @@ async def run_migrations_online() -> None:
     and associate a connection with the context.
 
     MODIFIED FOR ASYNC and SQLModel
+
+    ``alembic -x shard=NAME upgrade head`` migrates a subscription shard from
+    SUBSCRIPTION_SHARDS instead of the primary database.
     """
-    async_db_url = str(settings.SQLALCHEMY_DATABASE_URI)
+    shard = context.get_x_argument(as_dictionary=True).get("shard")
+    if shard:
+        async_db_url = str(settings.SUBSCRIPTION_SHARDS[shard])
+    else:
+        async_db_url = str(settings.SQLALCHEMY_DATABASE_URI)
 
     connectable = create_async_engine(
         async_db_url,
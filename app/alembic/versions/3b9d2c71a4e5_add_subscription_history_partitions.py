@@ -0,0 +1,81 @@
+"""add partitioned subscription history
+
+Revision ID: 3b9d2c71a4e5
+Revises: edecc7539e18
+Create Date: 2026-10-19 10:12:31.204518
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "3b9d2c71a4e5"
+down_revision = "edecc7539e18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_subscription_expires_at", "subscription", ["expires_at"], unique=False)
+
+    op.create_table(
+        "subscription_history",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("supporter_id", sa.UUID(), nullable=False),
+        sa.Column("tier_id", sa.UUID(), nullable=False),
+        sa.Column(
+            "status",
+            postgresql.ENUM(
+                "ACTIVE",
+                "INACTIVE",
+                "PENDING",
+                "CANCELLED",
+                name="subscriptionstatus",
+                create_type=False,
+            ),
+            nullable=True,
+        ),
+        sa.Column("started_at", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("expires_at", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("created_at", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column("updated_at", postgresql.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column(
+            "archived_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint("id", "expires_at", name="subscription_history_pkey"),
+        postgresql_partition_by="RANGE (expires_at)",
+    )
+    op.create_index(
+        "ix_subscription_history_supporter_id",
+        "subscription_history",
+        ["supporter_id"],
+        unique=False,
+    )
+    op.create_index(
+        "ix_subscription_history_tier_id", "subscription_history", ["tier_id"], unique=False
+    )
+    # Yearly partitions are created by the archival job before it moves rows into them
+    op.execute(
+        "CREATE TABLE subscription_history_default PARTITION OF subscription_history DEFAULT"
+    )
+
+
+def downgrade():
+    op.execute(
+        """
+        INSERT INTO subscription
+            (id, supporter_id, tier_id, status, started_at, expires_at, created_at, updated_at)
+        SELECT id, supporter_id, tier_id, status, started_at, expires_at, created_at, updated_at
+        FROM subscription_history
+        ON CONFLICT (id) DO NOTHING
+        """
+    )
+    op.drop_index("ix_subscription_history_tier_id", table_name="subscription_history")
+    op.drop_index("ix_subscription_history_supporter_id", table_name="subscription_history")
+    op.drop_table("subscription_history")
+    op.drop_index("ix_subscription_expires_at", table_name="subscription")
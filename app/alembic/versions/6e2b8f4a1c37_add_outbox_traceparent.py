@@ -0,0 +1,28 @@
+"""add outbox traceparent
+
+Revision ID: 6e2b8f4a1c37
+Revises: a4f1c8e2d903
+Create Date: 2026-10-19 16:42:18.204511
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6e2b8f4a1c37"
+down_revision = "a4f1c8e2d903"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "subscription_outbox",
+        sa.Column("traceparent", sqlmodel.sql.sqltypes.AutoString(length=55), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("subscription_outbox", "traceparent")
@@ -0,0 +1,49 @@
+"""add subscription outbox
+
+Revision ID: 8c41f0d2b6a7
+Revises: 3b9d2c71a4e5
+Create Date: 2026-10-19 11:02:47.918233
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "8c41f0d2b6a7"
+down_revision = "3b9d2c71a4e5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "subscription_outbox",
+        sa.Column("id", sa.BigInteger(), sa.Identity(always=True), nullable=False),
+        sa.Column("event_type", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column("subscription_id", sa.UUID(), nullable=False),
+        sa.Column("key", sqlmodel.sql.sqltypes.AutoString(length=64), nullable=False),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column(
+            "created_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.Column("published_at", postgresql.TIMESTAMP(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id", name="subscription_outbox_pkey"),
+    )
+    op.create_index(
+        "ix_subscription_outbox_unpublished",
+        "subscription_outbox",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("published_at IS NULL"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_subscription_outbox_unpublished", table_name="subscription_outbox")
+    op.drop_table("subscription_outbox")
@@ -0,0 +1,37 @@
+"""add outbox txid
+
+Revision ID: 9f4c2a7d1e58
+Revises: 6e2b8f4a1c37
+Create Date: 2026-10-19 18:05:41.730284
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9f4c2a7d1e58"
+down_revision = "6e2b8f4a1c37"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing rows all get this migration's transaction id, which keeps them ordered by id
+    op.add_column(
+        "subscription_outbox",
+        sa.Column(
+            "txid",
+            sa.BigInteger(),
+            server_default=sa.text("pg_current_xact_id()::text::bigint"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_subscription_outbox_txid_id", "subscription_outbox", ["txid", "id"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_subscription_outbox_txid_id", table_name="subscription_outbox")
+    op.drop_column("subscription_outbox", "txid")
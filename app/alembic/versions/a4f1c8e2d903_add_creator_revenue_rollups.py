@@ -0,0 +1,60 @@
+"""add creator revenue rollups
+
+Revision ID: a4f1c8e2d903
+Revises: d5e7a9c3f182
+Create Date: 2026-10-19 13:05:41.662094
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = "a4f1c8e2d903"
+down_revision = "d5e7a9c3f182"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "creator_tier_stats",
+        sa.Column("tier_id", sa.UUID(), nullable=False),
+        sa.Column("creator_id", sa.UUID(), nullable=False),
+        sa.Column("currency", sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False),
+        sa.Column("active_supporters", sa.Integer(), nullable=False),
+        sa.Column(
+            "updated_at",
+            postgresql.TIMESTAMP(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+        sa.ForeignKeyConstraint(["tier_id"], ["tier.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("tier_id", name="creator_tier_stats_pkey"),
+    )
+    op.create_index(
+        "ix_creator_tier_stats_creator_id", "creator_tier_stats", ["creator_id"], unique=False
+    )
+
+    op.create_table(
+        "creator_revenue_daily",
+        sa.Column("creator_id", sa.UUID(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("tier_id", sa.UUID(), nullable=False),
+        sa.Column("currency", sqlmodel.sql.sqltypes.AutoString(length=3), nullable=False),
+        sa.Column("active_supporters", sa.Integer(), nullable=False),
+        sa.Column("mrr", sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column("activations", sa.Integer(), nullable=False),
+        sa.Column("churned", sa.Integer(), nullable=False),
+        sa.Column("payments", sa.Integer(), nullable=False),
+        sa.Column("payments_amount", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("creator_id", "day", "tier_id", name="creator_revenue_daily_pkey"),
+    )
+
+
+def downgrade():
+    op.drop_table("creator_revenue_daily")
+    op.drop_index("ix_creator_tier_stats_creator_id", table_name="creator_tier_stats")
+    op.drop_table("creator_tier_stats")
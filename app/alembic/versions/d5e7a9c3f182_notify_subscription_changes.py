@@ -0,0 +1,44 @@
+"""notify subscription changes
+
+Revision ID: d5e7a9c3f182
+Revises: 8c41f0d2b6a7
+Create Date: 2026-10-19 12:20:05.377106
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "d5e7a9c3f182"
+down_revision = "8c41f0d2b6a7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NOTIFY is delivered on commit, so listeners only see committed outbox rows
+    op.execute(
+        """
+        CREATE FUNCTION notify_subscription_change() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify(
+                'subscription_changes',
+                json_build_object('id', NEW.id, 'payload', NEW.payload)::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER subscription_outbox_notify
+        AFTER INSERT ON subscription_outbox
+        FOR EACH ROW EXECUTE FUNCTION notify_subscription_change()
+        """
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER subscription_outbox_notify ON subscription_outbox")
+    op.execute("DROP FUNCTION notify_subscription_change()")
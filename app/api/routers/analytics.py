@@ -0,0 +1,48 @@
+import datetime
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from app.core.auth import CurrentUserUUID
+from app.core.sharding import Shard, shard_router
+from app.schemas.analytics import CreatorAnalytics
+from app.services.revenue import creator_daily_revenue, creator_tier_totals, merge_shard_rollups
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+MAX_RANGE_DAYS = 366
+
+
+@router.get(
+    "/creators/me",
+    response_model=CreatorAnalytics,
+    summary="Get the current creator's supporter and revenue analytics",
+    description="Active supporters and MRR per tier and currency, now and per UTC day "
+    "(last 30 days by default), read from the revenue rollups.",
+)
+async def get_creator_analytics(
+    creator_id: CurrentUserUUID,
+    start: Annotated[datetime.date | None, Query()] = None,
+    end: Annotated[datetime.date | None, Query()] = None,
+):
+    end = end or datetime.datetime.now(datetime.UTC).date()
+    start = start or end - datetime.timedelta(days=29)
+    if start > end or (end - start).days >= MAX_RANGE_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"start must precede end by at most {MAX_RANGE_DAYS} days",
+        )
+
+    async def read_shard(shard: Shard) -> tuple[list[dict], list[dict]]:
+        async with shard.read_session_factory() as session:
+            tiers = await creator_tier_totals(session, creator_id)
+            daily = await creator_daily_revenue(session, creator_id, start, end)
+            return tiers, daily
+
+    per_shard = await shard_router.gather("analytics", read_shard)
+    tiers = merge_shard_rollups((tiers for tiers, _ in per_shard), ("tier_id",))
+    daily = merge_shard_rollups((daily for _, daily in per_shard), ("day", "tier_id"))
+    logger.info(f"Retrieved analytics for creator {creator_id} from {start} to {end}")
+    return CreatorAnalytics(creator_id=creator_id, start=start, end=end, tiers=tiers, daily=daily)
@@ -0,0 +1,48 @@
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+
+from app.core.health import readiness
+from app.core.kafka_metrics import consumer_metrics
+
+router = APIRouter()
+
+
+@router.get(
+    "/live",
+    summary="Liveness probe",
+    description="Reports that the process is up and serving requests.",
+)
+async def liveness():
+    return {"status": "ok"}
+
+
+@router.get(
+    "/ready",
+    summary="Readiness probe",
+    description="Reports ready once the connection pool is warmed up and the Kafka consumer "
+    "has subscribed without a fatal error since. Partition assignment is reported by "
+    "/health/consumer.",
+)
+async def readiness_probe():
+    checks = readiness.checks()
+    if readiness.ready:
+        return {"status": "ready", "checks": checks}
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "not_ready", "checks": checks},
+    )
+
+
+@router.get(
+    "/consumer",
+    summary="Kafka consumer health",
+    description="Reports whether the payment event consumer keeps polling without a fatal "
+    "error and with its lag under KAFKA_CONSUMER_MAX_HEALTHY_LAG.",
+)
+async def consumer_health():
+    healthy, details = consumer_metrics.health()
+    if healthy:
+        return {"status": "healthy", **details}
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "unhealthy", **details}
+    )
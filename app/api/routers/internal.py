@@ -1,14 +1,17 @@
-import datetime
+import json
 import logging
 import uuid
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from sqlmodel import select
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
-from app.core.database import get_async_session
-from app.models.subscription import Subscription, SubscriptionStatus
-from app.models.tier import Tier
+from app.core.metrics import registry
+from app.core.sharding import shard_router
+from app.core.tracing import InMemorySpanExporter, span_processor
+from app.services.access import check_access
+from app.services.change_feed import stream_changes
+from app.services.export import export_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -23,23 +26,15 @@ router = APIRouter()
 async def check_access_internal(
     supporter_id: uuid.UUID = Query(...),
     creator_id: uuid.UUID = Query(...),
-    session: AsyncSession = Depends(get_async_session),
 ):
     logger.debug(f"Internal access check: Supporter {supporter_id} for Creator {creator_id}")
 
-    statement = (
-        select(1)
-        .select_from(Subscription)
-        .join(Tier, Subscription.tier_id == Tier.id)
-        .where(
-            (Subscription.supporter_id == supporter_id)
-            & (Tier.creator_id == creator_id)
-            & (Subscription.status == SubscriptionStatus.ACTIVE)
-            & (Subscription.expires_at > datetime.datetime.now(datetime.UTC))
+    try:
+        has_access = await check_access(supporter_id, creator_id)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Access check timed out"
         )
-    )
-    result = await session.execute(statement)
-    has_access = result.scalar()
 
     if has_access:
         logger.debug(f"Access GRANTED for Supporter {supporter_id} to Creator {creator_id}")
@@ -50,3 +45,96 @@ async def check_access_internal(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No active subscription found for this creator.",
         )
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Process metrics (Internal)",
+    description="Exposes process metrics in the Prometheus text format.",
+)
+async def metrics_internal():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get(
+    "/traces/{trace_id}",
+    summary="Get the spans of a trace (Internal)",
+    description="Spans of one trace recorded by this process, oldest first. Only available "
+    "with TRACING_EXPORTER=memory.",
+)
+async def get_trace_internal(trace_id: str):
+    exporter = span_processor.exporter
+    if not isinstance(exporter, InMemorySpanExporter):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="In-memory trace export is disabled"
+        )
+    # Spans still queued for export are not visible yet
+    await span_processor.export_pending()
+    spans = exporter.trace(trace_id)
+    if not spans:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trace not found")
+    return spans
+
+
+@router.get(
+    "/changes",
+    summary="Stream entitlement changes (Internal)",
+    description="Streams committed (supporter_id, creator_id, expires_at, status) changes as "
+    "server-sent events or NDJSON. Resume with the last received cursor, except with sharded "
+    "storage where only live changes are streamed.",
+)
+async def stream_changes_internal(
+    cursor: Annotated[int, Query(ge=0)] = 0,
+    format: Annotated[Literal["sse", "ndjson"], Query()] = "sse",
+    last_event_id: Annotated[int | None, Header(ge=0)] = None,
+):
+    # EventSource clients send the last seen id on reconnect
+    if last_event_id is not None:
+        cursor = max(cursor, last_event_id)
+    if cursor and shard_router.sharded:
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Resuming by cursor is not supported with sharded subscription storage",
+        )
+    logger.info(f"Change feed stream opened from cursor {cursor} ({format})")
+
+    # Tell proxies not to buffer the stream
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if format == "sse":
+        return StreamingResponse(
+            _sse_changes(cursor), media_type="text/event-stream", headers=headers
+        )
+    return StreamingResponse(
+        _ndjson_changes(cursor), media_type="application/x-ndjson", headers=headers
+    )
+
+
+@router.get(
+    "/exports/subscriptions",
+    response_class=StreamingResponse,
+    summary="Export subscriptions (Internal)",
+    description="Stream all subscriptions, or one creator's, as CSV or NDJSON.",
+)
+async def export_subscriptions_internal(
+    creator_id: Annotated[uuid.UUID | None, Query()] = None,
+    format: Annotated[Literal["csv", "ndjson"], Query()] = "csv",
+):
+    logger.info(f"Internal subscription export (creator_id: {creator_id}, format: {format})")
+    return export_response(creator_id, format)
+
+
+async def _sse_changes(cursor: int):
+    async for change in stream_changes(cursor):
+        if change is None:
+            yield ": keepalive\n\n"
+        else:
+            yield f"id: {change['cursor']}\ndata: {json.dumps(change)}\n\n"
+
+
+async def _ndjson_changes(cursor: int):
+    async for change in stream_changes(cursor):
+        if change is None:
+            yield "\n"
+        else:
+            yield json.dumps(change) + "\n"
@@ -0,0 +1,77 @@
+import logging
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import settings
+from app.core.profiling import (
+    ProfilerBusy,
+    profile_event_loop,
+    request_profiles,
+    sample_process,
+    token_matches,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def require_profiling_token(x_profiling_token: Annotated[str | None, Header()] = None):
+    """Profiling is off without PROFILING_TOKEN and needs the token in X-Profiling-Token"""
+    if not settings.PROFILING_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is disabled")
+    if not token_matches(x_profiling_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid profiling token")
+
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+Seconds = Annotated[float, Query(gt=0, le=settings.PROFILING_MAX_SECONDS)]
+
+
+@router.get(
+    "/cpu",
+    response_class=PlainTextResponse,
+    summary="Sample process stacks (Internal)",
+    description="Samples the stacks of every thread for the given time and returns them in "
+    "the collapsed format read by flamegraph.pl and speedscope.",
+)
+async def profile_cpu(
+    seconds: Seconds = 10.0,
+    interval_ms: Annotated[float, Query(ge=1, le=1000)] = settings.PROFILING_SAMPLE_INTERVAL_MS,
+):
+    try:
+        collapsed = await sample_process(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    return PlainTextResponse(collapsed)
+
+
+@router.get(
+    "/loop",
+    summary="Measure event loop blocking (Internal)",
+    description="Reports event loop lag and the callbacks and tasks that blocked the loop for "
+    "at least threshold_ms during the given time.",
+)
+async def profile_loop(
+    seconds: Seconds = 10.0,
+    threshold_ms: Annotated[float, Query(gt=0)] = 20.0,
+):
+    try:
+        return await profile_event_loop(seconds, threshold_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
+@router.get(
+    "/requests/{profile_id}",
+    response_class=PlainTextResponse,
+    summary="Get a per-request profile (Internal)",
+    description="Collapsed stacks of a request sent with the X-Profile header, by the id "
+    "returned in its X-Profile-Id response header.",
+)
+async def get_request_profile(profile_id: str):
+    collapsed = request_profiles.get(profile_id)
+    if collapsed is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return PlainTextResponse(collapsed)
@@ -1,18 +1,24 @@
 import datetime
 import logging
 import uuid
-from typing import Annotated
+from typing import Annotated, Literal
 
 import httpx
-from auth_lib.auth import CurrentUserUUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import union_all
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.core.database import get_async_session
-from app.models.subscription import Subscription, SubscriptionStatus
+from app.core.auth import CurrentUserUUID
+from app.core.responses import FastJSONResponse
+from app.core.sharding import get_supporter_session, shard_router
+from app.core.tracing import inject, span
+from app.models.subscription import Subscription, SubscriptionHistory, SubscriptionStatus
 from app.models.tier import Tier
 from app.schemas.subscription import PaymentInitiationResponse, SubscriptionCreate, SubscriptionRead
+from app.services.export import export_response
+from app.services.subscriptions import cancel_subscription
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -28,7 +34,7 @@ async def create_new_subscription(
     request: Request,
     subscription_create: SubscriptionCreate,
     supporter_id: CurrentUserUUID,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_supporter_session),
 ):
     logger.info(
         f"User {supporter_id} attempting to subscribe to tier: {subscription_create.tier_id}"
@@ -90,7 +96,16 @@ async def create_new_subscription(
                 f"Calling Payment Service at {payment_service_url} for"
                 f" user {supporter_id}, tier {payload['tier_id']}"
             )
-            response = await client.post(payment_service_url, json=payload, headers=headers)
+            with span(
+                "POST payment_service /payment/checkout-session",
+                "client",
+                {"http.method": "POST", "http.url": payment_service_url},
+            ) as client_span:
+                response = await client.post(
+                    payment_service_url, json=payload, headers=inject(headers)
+                )
+                if client_span is not None:
+                    client_span.set_attribute("http.status_code", response.status_code)
             response.raise_for_status()
 
             payment_init_data = response.json()
@@ -127,27 +142,102 @@ async def create_new_subscription(
             )
 
 
+@router.post(
+    "/subscriptions/{subscription_id}/cancel",
+    response_model=SubscriptionRead,
+    summary="Cancel a subscription",
+    description="Cancel an active or pending subscription owned by the current user.",
+)
+async def cancel_user_subscription(
+    subscription_id: uuid.UUID,
+    supporter_id: CurrentUserUUID,
+    session: AsyncSession = Depends(get_supporter_session),
+):
+    statement = select(Subscription).where(Subscription.id == subscription_id).with_for_update()
+    result = await session.execute(statement)
+    subscription = result.scalar_one_or_none()
+
+    if not subscription:
+        logger.info(f"Subscription not found: {subscription_id}")
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Subscription not found")
+
+    if subscription.supporter_id != supporter_id:
+        logger.info(f"User {supporter_id} attempted to cancel subscription {subscription_id}")
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to cancel this subscription"
+        )
+
+    if subscription.status not in (SubscriptionStatus.ACTIVE, SubscriptionStatus.PENDING):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Subscription is not active"
+        )
+
+    tier = await session.get(Tier, subscription.tier_id)
+    return await cancel_subscription(session, subscription, tier)
+
+
 @router.get(
     "/users/{user_id}/subscriptions",
     response_model=list[SubscriptionRead],
     summary="Get all subscriptions for a user",
-    description="Retrieve all subscriptions for a specific user.",
+    description="Retrieve all subscriptions for a specific user. "
+    "Archived subscriptions are included only with include_history=true.",
 )
 async def get_user_subscriptions(
     user_id: uuid.UUID,
     limit: Annotated[int, Query(ge=1, le=50)] = 20,
     offset: Annotated[int, Query(ge=0)] = 0,
-    session: AsyncSession = Depends(get_async_session),
+    include_history: Annotated[bool, Query()] = False,
 ):
-    statement = (
-        select(Subscription)
-        .where(Subscription.supporter_id == user_id)
-        .order_by(Subscription.expires_at.desc())
-        .offset(offset)
-        .limit(limit)
-    )
-    result = await session.execute(statement)
-    subscriptions = result.scalars().all()
+    if include_history:
+        live = select(*_read_columns(Subscription)).where(Subscription.supporter_id == user_id)
+        archived = select(*_read_columns(SubscriptionHistory)).where(
+            SubscriptionHistory.supporter_id == user_id
+        )
+        combined = union_all(live, archived).subquery()
+        statement = (
+            select(combined).order_by(combined.c.expires_at.desc()).offset(offset).limit(limit)
+        )
+    else:
+        statement = (
+            select(*_read_columns(Subscription))
+            .where(Subscription.supporter_id == user_id)
+            .order_by(Subscription.expires_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )
+    async with shard_router.shard_for(user_id).read_session_factory() as session:
+        result = await session.execute(statement)
+        subscriptions = [dict(row) for row in result.mappings()]
 
     logger.info(f"Retrieved {len(subscriptions)} subscriptions for user_id: {user_id}")
-    return subscriptions
+    # Rows already have the SubscriptionRead shape, skip re-validating them
+    return FastJSONResponse(subscriptions)
+
+
+@router.get(
+    "/creators/me/subscriptions/export",
+    response_class=StreamingResponse,
+    summary="Export the current creator's subscriptions",
+    description="Stream every subscription to the current user's tiers as CSV or NDJSON.",
+)
+async def export_creator_subscriptions(
+    creator_id: CurrentUserUUID,
+    format: Annotated[Literal["csv", "ndjson"], Query()] = "csv",
+):
+    logger.info(f"Exporting subscriptions of creator {creator_id} as {format}")
+    return export_response(creator_id, format)
+
+
+def _read_columns(model):
+    """Columns of SubscriptionRead"""
+    return (
+        model.id,
+        model.supporter_id,
+        model.tier_id,
+        model.status,
+        model.started_at,
+        model.expires_at,
+        model.created_at,
+        model.updated_at,
+    )
@@ -2,15 +2,23 @@ import logging
 import uuid
 from typing import Annotated
 
-from auth_lib.auth import CurrentUserUUID
 from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.core.database import get_async_session
+from app.core.auth import CurrentUserUUID
+from app.core.database import get_async_session, get_read_async_session
+from app.core.responses import FastJSONResponse
 from app.models.tier import Tier
 from app.schemas.tier import TierCreate, TierRead, TierUpdate
+from app.services.tiers import (
+    TIER_READ_COLUMNS,
+    delete_tier_copies,
+    get_tier_read,
+    replicate_tier,
+    tier_lookups,
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -36,6 +44,7 @@ async def create_tier(
     try:
         await session.commit()
         await session.refresh(tier_to_return)
+        await replicate_tier(tier_to_return.id)
         logger.info(f"Successfully committed tier changes for tier_id: {tier_to_return.id}")
         return tier_to_return
     except IntegrityError:
@@ -60,19 +69,19 @@ async def create_tier(
     summary="Get a tier by ID",
     description="Retrieve a tier by its unique identifier.",
 )
-async def get_tier(
-    tier_id: uuid.UUID,
-    session: AsyncSession = Depends(get_async_session),
-):
-    statement = select(Tier).where(Tier.id == tier_id)
-    result = await session.execute(statement)
-    tier = result.scalar_one_or_none()
+async def get_tier(tier_id: uuid.UUID):
+    try:
+        tier = await get_tier_read(tier_id)
+    except TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Tier lookup timed out"
+        )
 
     if not tier:
         logger.info(f"The tier not found for tier_id: {tier_id}")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tier not found")
     logger.info(f"Tier found for tier_id: {tier_id}")
-    return tier
+    return FastJSONResponse(tier)
 
 
 @router.put(
@@ -111,7 +120,9 @@ async def update_tier(
 
     try:
         await session.commit()
+        tier_lookups.invalidate(tier_id)
         await session.refresh(tier_to_return)
+        await replicate_tier(tier_id)
         logger.info(f"Successfully committed tier changes for tier_id: {tier_to_return.id}")
         return tier_to_return
     except IntegrityError:
@@ -140,7 +151,8 @@ async def delete_tier(
     current_user: CurrentUserUUID,
     session: AsyncSession = Depends(get_async_session),
 ):
-    statement = select(Tier).where(Tier.id == tier_id)
+    # Locked until the delete commits, so no update copies the tier back to the shards
+    statement = select(Tier).where(Tier.id == tier_id).with_for_update()
     result = await session.execute(statement)
     tier_to_delete = result.scalar_one_or_none()
 
@@ -156,12 +168,13 @@ async def delete_tier(
         )
 
     logger.info(f"Deleting tier with tier_id: {tier_id}")
-    await session.delete(tier_to_delete)
-
     try:
-        await session.commit()
-        logger.info(f"Successfully deleted tier_id: {tier_id}")
-        return Response(status_code=status.HTTP_204_NO_CONTENT)
+        if await delete_tier_copies(tier_id):
+            await session.delete(tier_to_delete)
+            await session.commit()
+            tier_lookups.invalidate(tier_id)
+            logger.info(f"Successfully deleted tier_id: {tier_id}")
+            return Response(status_code=status.HTTP_204_NO_CONTENT)
     except Exception as e:
         await session.rollback()
         logger.exception(f"Error deleting tier_id: {tier_id} - {e}")
@@ -170,6 +183,14 @@ async def delete_tier(
             detail="Could not delete tier",
         )
 
+    # Same answer as the subscription foreign key gives without sharding
+    await session.rollback()
+    logger.error(f"Error deleting tier_id: {tier_id} - subscriptions on a shard refer to it")
+    raise HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail="Could not delete tier",
+    )
+
 
 @router.get(
     "/users/{creator_id}/tiers",
@@ -181,17 +202,18 @@ async def get_all_tiers_by_creator(
     creator_id: uuid.UUID,
     limit: Annotated[int, Query(ge=1, le=50)] = 20,
     offset: Annotated[int, Query(ge=0)] = 0,
-    session: AsyncSession = Depends(get_async_session),
+    session: AsyncSession = Depends(get_read_async_session),
 ):
     statement = (
-        select(Tier)
+        select(*TIER_READ_COLUMNS)
         .where(Tier.creator_id == creator_id)
         .order_by(Tier.created_at.desc())  # Usually want newest first
         .offset(offset)
         .limit(limit)
     )
     result = await session.execute(statement)
-    tiers = result.scalars().all()
+    tiers = [dict(row) for row in result.mappings()]
 
     logger.info(f"Retrieved {len(tiers)} posts for creator_id: {creator_id}")
-    return tiers
+    # Rows already have the TierRead shape, skip re-validating them
+    return FastJSONResponse(tiers)
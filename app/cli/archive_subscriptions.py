@@ -0,0 +1,40 @@
+"""Move lapsed subscriptions from the hot table to subscription_history.
+
+Usage: python -m app.cli.archive_subscriptions [--retention-days N] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import dispose_engines
+from app.core.sharding import shard_router
+from app.services.archival import archive_lapsed_subscriptions
+
+logger = logging.getLogger(__name__)
+
+
+async def main(retention_days: int, batch_size: int) -> None:
+    try:
+        total = 0
+        for shard in shard_router.shards:
+            async with shard.session_factory() as session:
+                moved = await archive_lapsed_subscriptions(session, retention_days, batch_size)
+            logger.info(f"Archived {moved} subscriptions on {shard.name}")
+            total += moved
+        logger.info(f"Archival finished: {total} subscriptions moved to history")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--retention-days", type=int, default=settings.SUBSCRIPTION_HISTORY_RETENTION_DAYS
+    )
+    parser.add_argument("--batch-size", type=int, default=settings.SUBSCRIPTION_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args.retention_days, args.batch_size))
@@ -0,0 +1,43 @@
+"""Rebuild the creator revenue rollups from subscriptions.
+
+Usage: python -m app.cli.backfill_revenue_rollups [--days N | --start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+
+from app.core.database import dispose_engines
+from app.core.sharding import shard_router
+from app.services.revenue import backfill_revenue_rollups
+
+logger = logging.getLogger(__name__)
+
+
+async def main(start: datetime.date, end: datetime.date) -> None:
+    try:
+        rows = 0
+        for shard in shard_router.shards:
+            logger.info(f"Backfilling revenue rollups on {shard.name}")
+            async with shard.session_factory() as session:
+                rows += await backfill_revenue_rollups(session, start, end)
+        logger.info(f"Backfill finished: {rows} daily rows from {start} to {end}")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=90, help="Days back from --end")
+    parser.add_argument("--start", type=datetime.date.fromisoformat)
+    parser.add_argument(
+        "--end",
+        type=datetime.date.fromisoformat,
+        default=datetime.datetime.now(datetime.UTC).date(),
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    start = args.start or args.end - datetime.timedelta(days=args.days - 1)
+    asyncio.run(main(start, args.end))
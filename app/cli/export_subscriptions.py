@@ -0,0 +1,49 @@
+"""Dump subscriptions as CSV with Postgres COPY.
+
+Usage: python -m app.cli.export_subscriptions [--creator-id UUID] [--output PATH]
+
+With sharded storage every shard is dumped in turn into the same file.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+import uuid
+from typing import IO
+
+from app.core.database import dispose_engines
+from app.core.sharding import shard_router
+from app.services.export import copy_export
+
+logger = logging.getLogger(__name__)
+
+
+async def dump(target: IO[bytes], creator_id: uuid.UUID | None) -> None:
+    for index, shard in enumerate(shard_router.shards):
+        async with shard.read_engine.connect() as connection:
+            status = await copy_export(connection, target, creator_id, header=index == 0)
+        logger.info(f"Exported {shard.name}: {status}")
+
+
+async def main(creator_id: uuid.UUID | None, output: str | None) -> None:
+    try:
+        if output:
+            with open(output, "wb") as f:
+                await dump(f, creator_id)
+        else:
+            await dump(sys.stdout.buffer, creator_id)
+        logger.info("Export finished")
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--creator-id", type=uuid.UUID, help="Only this creator's subscriptions")
+    parser.add_argument("--output", help="File to write, stdout by default")
+    args = parser.parse_args()
+
+    # Log to stderr so a dump to stdout stays clean
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    asyncio.run(main(args.creator_id, args.output))
@@ -0,0 +1,78 @@
+"""Bulk import tiers or subscriptions from CSV or NDJSON through COPY.
+
+Usage: python -m app.cli.import_subscriptions {tiers,subscriptions} PATH [--format csv|ndjson]
+       [--rejects PATH] [--batch-size N] [--shard NAME]
+
+Columns (CSV header or NDJSON keys):
+  tiers:         id, creator_id, name, description, price, currency
+  subscriptions: id (optional), supporter_id, tier_id, status, started_at, expires_at
+
+Import tiers before the subscriptions that reference them. Rows that cannot be parsed or
+fail validation are written to the rejects file with their line number and reason.
+Imported subscriptions bypass the outbox and the revenue rollups; run
+app.cli.backfill_revenue_rollups afterwards.
+
+With sharded storage tiers are imported into the primary database; copy them to the shards
+with app.cli.rebalance_shards --tiers-only before importing subscriptions. Subscriptions go to
+the --shard given (the first shard by default); app.cli.rebalance_shards then moves every row
+to the shard that owns its supporter.
+"""
+
+import argparse
+import asyncio
+import logging
+
+from app.core.config import settings
+from app.core.database import async_engine, dispose_engines
+from app.core.sharding import shard_router
+from app.services.bulk_import import IMPORT_KINDS, RejectWriter, import_rows, read_rows
+
+logger = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace) -> None:
+    kind = IMPORT_KINDS[args.kind]
+    engine = async_engine
+    if args.kind == "subscriptions":
+        engine = (
+            shard_router.get(args.shard).engine if args.shard else shard_router.shards[0].engine
+        )
+    try:
+        with (
+            open(args.path, newline="", encoding="utf-8") as source,
+            open(args.rejects, "w", newline="", encoding="utf-8") as rejects_file,
+        ):
+            rejects = RejectWriter(rejects_file)
+            async with engine.connect() as connection:
+                raw_connection = await connection.get_raw_connection()
+                report = await import_rows(
+                    raw_connection.driver_connection,
+                    kind,
+                    read_rows(source, args.format),
+                    rejects,
+                    args.batch_size,
+                )
+        logger.info(
+            f"Import finished: {report.parsed} rows read, {report.merged} merged into "
+            f"{kind.table}, {report.rejected} rejected (see {args.rejects})"
+        )
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("kind", choices=sorted(IMPORT_KINDS))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"])
+    parser.add_argument("--rejects", help="Rejected rows CSV, PATH.rejects.csv by default")
+    parser.add_argument("--batch-size", type=int, default=settings.IMPORT_BATCH_SIZE)
+    parser.add_argument("--shard", help="Shard receiving subscriptions, the first by default")
+    args = parser.parse_args()
+    args.format = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    args.rejects = args.rejects or f"{args.path}.rejects.csv"
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(args))
@@ -0,0 +1,91 @@
+"""Move subscriptions to the shard that owns their supporter under the configured shard map.
+
+Usage: python -m app.cli.rebalance_shards [--dry-run] [--copy-only] [--tiers-only]
+       [--batch-size N]
+
+Run it with the SUBSCRIPTION_SHARDS and SUBSCRIPTION_SHARD_MAP the service should end up
+with. Tiers are first synced from the primary database to every shard. To change the map:
+
+  1. Migrate new shards: alembic -x shard=NAME upgrade head
+  2. While the service still runs the old map, run with --copy-only and the new map: rows are
+     copied to their new shard and stay on the old one. Creator exports list them twice
+     until step 4.
+  3. Deploy the new map.
+  4. Run again without --copy-only: rows changed since the copy are copied again and every
+     misplaced row is deleted from its old shard.
+
+A copy never overwrites a row that changed later on its new shard. Today's revenue rollups
+of every shard that gained or lost rows are recounted at the end. Outbox events stay on the
+shard that wrote them and are relayed from there.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.config import settings
+from app.core.database import dispose_engines
+from app.core.sharding import shard_router
+from app.services.rebalance import (
+    SHARDED_TABLES,
+    move_misplaced,
+    rebuild_today_rollups,
+    sync_tiers,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        if not args.dry_run:
+            tiers, deleted = await sync_tiers(args.batch_size)
+            logger.info(
+                f"Copied {tiers} tiers to {len(shard_router.shards)} shards, deleted {deleted} "
+                "copies of tiers no longer in the primary database"
+            )
+        if args.tiers_only:
+            return
+
+        affected: set[str] = set()
+        for source in shard_router.shards:
+            for table in SHARDED_TABLES:
+                report = await move_misplaced(
+                    table, source, args.batch_size, args.copy_only, args.dry_run
+                )
+                logger.info(
+                    f"{table.name} on {source.name}: {report.misplaced} misplaced rows, "
+                    f"{report.deleted} deleted, copied to {sorted(report.targets) or 'none'}"
+                )
+                if report.targets:
+                    affected |= report.targets | {source.name}
+
+        for name in sorted(affected):
+            await rebuild_today_rollups(shard_router.get(name))
+            logger.info(f"Recounted today's revenue rollups on {name}")
+        logger.info("Rebalance finished" + (" (dry run)" if args.dry_run else ""))
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__.splitlines()[0], formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Only count misplaced rows, change nothing"
+    )
+    parser.add_argument(
+        "--copy-only", action="store_true", help="Copy misplaced rows but keep the originals"
+    )
+    parser.add_argument("--tiers-only", action="store_true", help="Only sync tiers to the shards")
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.SUBSCRIPTION_REBALANCE_BATCH_SIZE
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if not shard_router.sharded:
+        sys.exit("SUBSCRIPTION_SHARDS is not set, there is nothing to rebalance")
+    asyncio.run(main(args))
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+import re
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = b"x-request-deadline"
+
+# First match wins. Streams are exempt: they hold a connection for as long as the client reads.
+ROUTE_GROUPS: tuple[tuple[str | None, re.Pattern, str | None], ...] = (
+    (None, re.compile(r"^/health/"), None),
+    (None, re.compile(r"^/internal/(metrics|changes)$"), None),
+    # Profiles are time-boxed and must still run when the service is overloaded
+    (None, re.compile(r"^/internal/profiling/"), None),
+    ("GET", re.compile(r"^/internal/check-access$"), "access"),
+    (
+        "GET",
+        re.compile(r"^/(internal/exports/|subscriptions/creators/me/subscriptions/export)"),
+        "export",
+    ),
+    ("POST", re.compile(r"^/subscriptions/subscriptions$"), "checkout"),
+    (
+        "GET",
+        re.compile(r"^/(subscriptions/users/[^/]+/subscriptions|tier/users/[^/]+/tiers)$"),
+        "listing",
+    ),
+)
+DEFAULT_GROUP = "default"
+
+admission_wait = registry.histogram(
+    "admission_queue_wait_seconds", "Time requests waited for a concurrency slot", ["group"]
+)
+admission_rejected = registry.counter(
+    "admission_rejected",
+    "Requests shed before running: queue_timeout waited past the group budget, deadline "
+    "had no time left for the caller",
+    ["group", "reason"],
+)
+admission_abandoned = registry.counter(
+    "admission_abandoned",
+    "Admitted requests cancelled because the caller's deadline passed",
+    ["group"],
+)
+
+
+def route_group(method: str, path: str) -> str | None:
+    for group_method, pattern, group in ROUTE_GROUPS:
+        if (group_method is None or group_method == method) and pattern.match(path):
+            return group
+    return DEFAULT_GROUP
+
+
+def request_deadline(scope: Scope) -> float | None:
+    """Caller deadline from X-Request-Deadline (Unix epoch milliseconds) as a Unix time"""
+    for name, value in scope["headers"]:
+        if name == DEADLINE_HEADER:
+            try:
+                return int(value) / 1000
+            except ValueError:
+                return None
+    return None
+
+
+class _Group:
+    def __init__(self, name: str, concurrency: int, queue_timeout: float):
+        self.name = name
+        self.queue_timeout = queue_timeout
+        self.slots = asyncio.Semaphore(concurrency)
+        self.concurrency = concurrency
+        self.in_flight = 0
+
+
+class AdmissionControlMiddleware:
+    """Per route group concurrency limits with bounded queueing and deadline-aware shedding.
+
+    Each group has its own slots, so a burst of listings or checkouts cannot take the
+    slots of the internal access check. A request waits for a slot at most the group's
+    queue budget, or until the caller's X-Request-Deadline, and is otherwise rejected right
+    away with 503 and Retry-After. Admitted requests are cancelled once the deadline passes.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.groups = {
+            name: _Group(
+                name,
+                concurrency,
+                settings.ADMISSION_QUEUE_TIMEOUT_SECONDS.get(
+                    name, settings.ADMISSION_QUEUE_TIMEOUT_SECONDS[DEFAULT_GROUP]
+                ),
+            )
+            for name, concurrency in settings.ADMISSION_CONCURRENCY.items()
+        }
+        registry.gauge(
+            "admission_in_flight",
+            "Requests holding a concurrency slot",
+            ["group"],
+            callback=lambda: [((group.name,), group.in_flight) for group in self.groups.values()],
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        name = route_group(scope["method"], scope["path"])
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+        group = self.groups.get(name) or self.groups[DEFAULT_GROUP]
+
+        deadline = request_deadline(scope)
+        budget = group.queue_timeout
+        if deadline is not None:
+            budget = min(budget, deadline - time.time())
+            if budget <= 0:
+                admission_rejected.inc(group=group.name, reason="deadline")
+                await _reject(send, "Request deadline already passed")
+                return
+
+        started = time.perf_counter()
+        try:
+            if group.slots.locked():
+                await asyncio.wait_for(group.slots.acquire(), budget)
+            else:
+                await group.slots.acquire()
+        except TimeoutError:
+            admission_wait.observe(time.perf_counter() - started, group=group.name)
+            reason = "deadline" if budget < group.queue_timeout else "queue_timeout"
+            admission_rejected.inc(group=group.name, reason=reason)
+            logger.warning(f"Shed {scope['method']} {scope['path']} ({group.name}: {reason})")
+            await _reject(send, "Server is overloaded, retry later")
+            return
+        admission_wait.observe(time.perf_counter() - started, group=group.name)
+
+        group.in_flight += 1
+        try:
+            if deadline is None:
+                await self.app(scope, receive, send)
+            else:
+                await self._call_with_deadline(group, deadline, scope, receive, send)
+        finally:
+            group.in_flight -= 1
+            group.slots.release()
+
+    async def _call_with_deadline(
+        self, group: _Group, deadline: float, scope: Scope, receive: Receive, send: Send
+    ) -> None:
+        response_started = False
+
+        async def tracking_send(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            async with asyncio.timeout(deadline - time.time()) as budget:
+                await self.app(scope, receive, tracking_send)
+        except TimeoutError:
+            # A TimeoutError raised by the handler itself, e.g. a pool or upstream timeout,
+            # is not this deadline and goes to the usual error handling
+            if not budget.expired():
+                raise
+            admission_abandoned.inc(group=group.name)
+            logger.warning(f"Abandoned {scope['method']} {scope['path']} past its deadline")
+            if not response_started:
+                await _reject(send, "Request deadline passed", status=504)
+
+
+async def _reject(send: Send, detail: str, status: int = 503) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(settings.ADMISSION_RETRY_AFTER_SECONDS).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,98 @@
+import base64
+import binascii
+import collections
+import hashlib
+import inspect
+import json
+import time
+import uuid
+from typing import Annotated
+
+from auth_lib import auth
+from fastapi import Depends, Request
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+auth_cache_lookups = registry.counter(
+    "auth_cache_lookups", "Bearer token verifications by cache outcome", ["outcome"]
+)
+
+REQUEST_PARAMETER = "auth_cache_request"
+
+
+def _bearer_token(request: Request) -> str | None:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token
+
+
+def _expires_at(token: str) -> float | None:
+    """exp claim of a JWT whose signature was already verified, without verifying again"""
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError, binascii.Error):
+        return None
+
+
+class CachedUserDependency:
+    """Wraps the auth_lib user dependency and remembers verified tokens until they expire.
+
+    Tokens are keyed by their SHA-256 digest in a bounded LRU. A hit skips signature
+    verification; a miss, an unparsable token or a token without exp goes through auth_lib
+    unchanged. The wrapper exposes the wrapped dependency's parameters, so FastAPI keeps
+    resolving its sub-dependencies (and their 401/403 errors) as before.
+    """
+
+    def __init__(self, dependency, max_size: int):
+        self.dependency = dependency
+        self.max_size = max_size
+        self._cache: collections.OrderedDict[bytes, tuple[float, uuid.UUID]] = (
+            collections.OrderedDict()
+        )
+        signature = inspect.signature(dependency)
+        request = inspect.Parameter(
+            REQUEST_PARAMETER, inspect.Parameter.KEYWORD_ONLY, annotation=Request
+        )
+        self.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request])
+
+    async def __call__(self, **kwargs) -> uuid.UUID:
+        request: Request = kwargs.pop(REQUEST_PARAMETER)
+        token = _bearer_token(request)
+        key = hashlib.sha256(token.encode()).digest() if token else None
+
+        if key is not None:
+            entry = self._cache.get(key)
+            if entry is not None:
+                expires_at, user_id = entry
+                if expires_at > time.time():
+                    self._cache.move_to_end(key)
+                    auth_cache_lookups.inc(outcome="hit")
+                    return user_id
+                del self._cache[key]
+
+        user_id = self.dependency(**kwargs)
+        if inspect.isawaitable(user_id):
+            user_id = await user_id
+        auth_cache_lookups.inc(outcome="miss")
+
+        expires_at = _expires_at(token) if token else None
+        if key is not None and expires_at is not None and expires_at > time.time():
+            self._cache[key] = (expires_at, user_id)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return user_id
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+cached_current_user = CachedUserDependency(
+    auth.CurrentUserUUID.__metadata__[0].dependency, settings.AUTH_CACHE_SIZE
+)
+
+# Drop-in replacement for auth_lib.auth.CurrentUserUUID
+CurrentUserUUID = Annotated[uuid.UUID, Depends(cached_current_user)]
@@ -1,5 +1,5 @@
 import os
-from typing import Any
+from typing import Any, Literal
 
 from pydantic import PostgresDsn, field_validator
 from pydantic_core import MultiHostUrl
@@ -14,6 +14,9 @@ class Settings(BaseSettings):
 
     APP_ENV: str = "development"
 
+    # Total time shutdown waits for the consumer, background tasks and HTTP requests to drain
+    SHUTDOWN_DRAIN_TIMEOUT_SECONDS: float = 25.0
+
     # Postgres Database Config
     POSTGRES_SERVER: str
     POSTGRES_PORT: int = 5432
@@ -26,9 +29,129 @@ class Settings(BaseSettings):
     KAFKA_BOOTSTRAP_SERVERS: str = "kafka:9092"
     KAFKA_PAYMENT_EVENTS_TOPIC: str = "payment_events"
     KAFKA_CONSUMER_GROUP_ID: str = "subscription_service_group"
+    KAFKA_SUBSCRIPTION_EVENTS_TOPIC: str = "subscription_events"
+    KAFKA_PRODUCER_LINGER_MS: int = 20
+    KAFKA_PRODUCER_BATCH_SIZE: int = 131072
+    KAFKA_PRODUCER_COMPRESSION: str = "zstd"
+    # librdkafka statistics (per-partition lag, group state) interval, 0 disables them
+    KAFKA_STATISTICS_INTERVAL_MS: int = 15000
+    # /health/consumer fails when the loop has not polled for this long or lag exceeds the limit
+    KAFKA_CONSUMER_STALL_SECONDS: float = 30.0
+    KAFKA_CONSUMER_MAX_HEALTHY_LAG: int = 10000
 
     SQLALCHEMY_DATABASE_URI: PostgresDsn | None = None
 
+    # Optional read replica used by read-only endpoints
+    POSTGRES_REPLICA_SERVER: str | None = None
+    POSTGRES_REPLICA_PORT: int | None = None
+    SQLALCHEMY_REPLICA_DATABASE_URI: PostgresDsn | None = None
+
+    # Connection pool
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    # Connections idle for longer than this are pinged on checkout instead of pre-pinging every one
+    DB_POOL_PING_IDLE_SECONDS: float = 30.0
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_SLOW_QUERY_THRESHOLD_MS: float = 200.0
+    # Connections opened and prepared before the app reports ready
+    DB_POOL_WARMUP_CONNECTIONS: int = 5
+    DB_WARMUP_TIMEOUT: float = 30.0
+    DB_WARMUP_RETRY_SECONDS: float = 5.0
+
+    # Optional sharding of subscriptions by supporter_id: shard name -> database DSN, e.g.
+    # {"s0": "postgresql+asyncpg://...", "s1": "..."}. Empty keeps every subscription in the
+    # primary database. Tiers stay in the primary database and are copied to every shard.
+    SUBSCRIPTION_SHARDS: dict[str, PostgresDsn] = {}
+    # Supporters hash into this many buckets; changing it moves almost every supporter
+    SUBSCRIPTION_SHARD_BUCKETS: int = 1024
+    # shard name -> bucket ranges such as "0-511" or "0-99,200-299". Every bucket needs exactly
+    # one shard. Empty splits the buckets into equal contiguous ranges in shard name order.
+    SUBSCRIPTION_SHARD_MAP: dict[str, str] = {}
+    SUBSCRIPTION_REBALANCE_BATCH_SIZE: int = 1000
+
+    # Lapsed subscriptions older than this move to subscription_history
+    SUBSCRIPTION_HISTORY_RETENTION_DAYS: int = 90
+    SUBSCRIPTION_ARCHIVE_BATCH_SIZE: int = 5000
+
+    SUBSCRIPTION_EXPIRY_INTERVAL_SECONDS: float = 60.0
+    SUBSCRIPTION_EXPIRY_BATCH_SIZE: int = 1000
+
+    # Transactional outbox relay
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_PUBLISH_TIMEOUT_SECONDS: float = 10.0
+    OUTBOX_RETENTION_HOURS: int = 72
+
+    EXPORT_BATCH_SIZE: int = 2000
+    IMPORT_BATCH_SIZE: int = 50000
+
+    # Verified bearer tokens kept until their exp claim
+    AUTH_CACHE_SIZE: int = 10000
+
+    # Admission control per route group, see app/core/admission.py
+    ADMISSION_CONCURRENCY: dict[str, int] = {
+        "access": 64,
+        "checkout": 16,
+        "listing": 16,
+        "export": 2,
+        "default": 32,
+    }
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: dict[str, float] = {
+        "access": 0.05,
+        "checkout": 1.0,
+        "listing": 0.5,
+        "export": 0.1,
+        "default": 0.5,
+    }
+    ADMISSION_RETRY_AFTER_SECONDS: int = 1
+
+    # Request coalescing for hot lookups, a TTL of 0 disables the result cache
+    SINGLE_FLIGHT_MAX_WAIT_SECONDS: float = 2.0
+    SINGLE_FLIGHT_CACHE_SIZE: int = 10000
+    ACCESS_CACHE_TTL_SECONDS: float = 0.0
+    TIER_CACHE_TTL_SECONDS: float = 0.0
+
+    # Node-local entitlement snapshot shared by all workers, e.g. /dev/shm/entitlements.
+    # Unset keeps access checks on the database.
+    ENTITLEMENT_SNAPSHOT_PATH: str | None = None
+    ENTITLEMENT_SNAPSHOT_REBUILD_SECONDS: float = 300.0
+    # Older snapshots are not trusted and access checks fall back to the database
+    ENTITLEMENT_SNAPSHOT_MAX_AGE_SECONDS: float = 900.0
+
+    # Bloom filter of supporters with an active subscription, misses are denied without a query
+    SUPPORTER_FILTER_ENABLED: bool = True
+    SUPPORTER_FILTER_FALSE_POSITIVE_RATE: float = 0.01
+    SUPPORTER_FILTER_REBUILD_SECONDS: float = 600.0
+    # Capacity over the active supporters at build time, for activations until the next build
+    SUPPORTER_FILTER_HEADROOM: float = 1.5
+
+    # Profiling endpoints and the X-Profile request header, disabled without a token
+    PROFILING_TOKEN: str | None = None
+    PROFILING_MAX_SECONDS: float = 60.0
+    PROFILING_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILING_REQUEST_PROFILES_KEPT: int = 50
+
+    # Tracing: "none" disables it, "memory" keeps recent spans for /internal/traces/{trace_id},
+    # "file" appends JSON lines to TRACING_FILE_PATH
+    TRACING_EXPORTER: Literal["none", "memory", "file"] = "none"
+    TRACING_SERVICE_NAME: str = "subscription-service"
+    # Share of new traces recorded; traces continued from a traceparent follow the caller
+    TRACING_SAMPLE_RATIO: float = 0.1
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_EXPORT_INTERVAL_SECONDS: float = 5.0
+    TRACING_EXPORT_BATCH_SIZE: int = 512
+    TRACING_QUEUE_SIZE: int = 8192
+
+    # Internal entitlement change feed
+    CHANGE_FEED_QUEUE_SIZE: int = 10000
+    CHANGE_FEED_CATCH_UP_BATCH_SIZE: int = 1000
+    CHANGE_FEED_HEARTBEAT_SECONDS: float = 15.0
+    CHANGE_FEED_RECONNECT_SECONDS: float = 5.0
+    # Also reads the outbox without a notification, e.g. once a long transaction ended
+    CHANGE_FEED_POLL_SECONDS: float = 1.0
+
     @field_validator("SQLALCHEMY_DATABASE_URI", mode="before")
     @classmethod
     def assemble_async_db_connection(cls, v: str | None, info: ValidationInfo) -> Any:
@@ -44,5 +167,22 @@ class Settings(BaseSettings):
             path=f"{values.get('POSTGRES_DB') or ''}",
         )
 
+    @field_validator("SQLALCHEMY_REPLICA_DATABASE_URI", mode="before")
+    @classmethod
+    def assemble_async_replica_connection(cls, v: str | None, info: ValidationInfo) -> Any:
+        if isinstance(v, str):
+            return v
+        values = info.data
+        if not values.get("POSTGRES_REPLICA_SERVER"):
+            return None
+        return MultiHostUrl.build(
+            scheme="postgresql+asyncpg",
+            username=values.get("POSTGRES_USER"),
+            password=values.get("POSTGRES_PASSWORD"),
+            host=values.get("POSTGRES_REPLICA_SERVER"),
+            port=values.get("POSTGRES_REPLICA_PORT") or values.get("POSTGRES_PORT"),
+            path=f"{values.get('POSTGRES_DB') or ''}",
+        )
+
 
 settings = Settings()
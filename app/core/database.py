@@ -1,21 +1,143 @@
 import logging
+import time
 from collections.abc import AsyncGenerator
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from .config import settings
+from .instrumentation import instrument_engine
+from .metrics import registry
+from .tracing import trace_engine, tracing_enabled
 
 logger = logging.getLogger(__name__)
 
 
-async_engine = create_async_engine(
-    str(settings.SQLALCHEMY_DATABASE_URI),
-    pool_pre_ping=True,
-    echo=settings.APP_ENV == "development",
-    future=True,
+pool_checkout_wait = registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+pool_checkout_timeouts = registry.counter(
+    "db_pool_checkout_timeouts",
+    "Pool checkouts that gave up after DB_POOL_TIMEOUT",
+    ["pool"],
+)
+pool_liveness_failures = registry.counter(
+    "db_pool_liveness_failures",
+    "Idle connections found dead on checkout and replaced",
+    ["pool"],
 )
 
 
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a free connection"""
+
+    pool_name = "primary"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_checkout_timeouts.inc(pool=self.pool_name)
+            raise
+        finally:
+            pool_checkout_wait.observe(time.perf_counter() - start, pool=self.pool_name)
+
+
+_engines: dict[str, AsyncEngine] = {}
+
+
+def _pool_stats():
+    for name, engine in _engines.items():
+        pool = engine.sync_engine.pool
+        yield (name, "size"), pool.size()
+        yield (name, "checked_out"), pool.checkedout()
+        yield (name, "overflow"), max(pool.overflow(), 0)
+        yield (name, "idle"), pool.checkedin()
+
+
+registry.gauge(
+    "db_pool_connections",
+    "Connection pool state by pool and kind",
+    ["pool", "state"],
+    callback=_pool_stats,
+)
+
+
+def _install_idle_ping(engine: AsyncEngine, pool_name: str) -> None:
+    """Ping only connections that sat idle long enough to have been dropped by the server.
+
+    Replaces ``pool_pre_ping``, which costs a round trip on every checkout.
+    """
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(sync_engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None:
+            return
+        if time.monotonic() - checked_in_at < settings.DB_POOL_PING_IDLE_SECONDS:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            pool_liveness_failures.inc(pool=pool_name)
+            logger.warning(f"Idle {pool_name} connection failed liveness ping: {e}")
+            raise exc.DisconnectionError() from e
+
+
+def build_async_engine(url: str, pool_name: str, read_only: bool = False) -> AsyncEngine:
+    """Create an async engine with the configured pool and liveness strategy"""
+    server_settings = {"default_transaction_read_only": "on"} if read_only else {}
+    pool_class = type(
+        f"{pool_name.capitalize()}QueuePool", (InstrumentedQueuePool,), {"pool_name": pool_name}
+    )
+    engine = create_async_engine(
+        url,
+        poolclass=pool_class,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        connect_args={
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "server_settings": server_settings,
+        },
+        echo=settings.APP_ENV == "development",
+        future=True,
+    )
+    _install_idle_ping(engine, pool_name)
+    instrument_engine(engine)
+    if tracing_enabled():
+        trace_engine(engine, pool_name)
+    _engines[pool_name] = engine
+    return engine
+
+
+async_engine = build_async_engine(str(settings.SQLALCHEMY_DATABASE_URI), "primary")
+
+if settings.SQLALCHEMY_REPLICA_DATABASE_URI:
+    read_async_engine = build_async_engine(
+        str(settings.SQLALCHEMY_REPLICA_DATABASE_URI), "replica", read_only=True
+    )
+else:
+    read_async_engine = async_engine
+
+
 AsyncSessionFactory = async_sessionmaker(
     bind=async_engine,
     autoflush=False,
@@ -23,6 +145,13 @@ AsyncSessionFactory = async_sessionmaker(
     class_=AsyncSession,
 )
 
+ReadAsyncSessionFactory = async_sessionmaker(
+    bind=read_async_engine,
+    autoflush=False,
+    expire_on_commit=False,
+    class_=AsyncSession,
+)
+
 
 async def get_async_session() -> AsyncGenerator[AsyncSession]:
     """FastAPI dependency for async session."""
@@ -37,3 +166,20 @@ async def get_async_session() -> AsyncGenerator[AsyncSession]:
             raise
         finally:
             logger.debug("Profile session closed")
+
+
+async def get_read_async_session() -> AsyncGenerator[AsyncSession]:
+    """FastAPI dependency for a read-only session, served by the replica when configured."""
+    async with ReadAsyncSessionFactory() as session:
+        try:
+            yield session
+        except Exception:
+            logger.exception("Read session rollback because of exception")
+            await session.rollback()
+            raise
+
+
+async def dispose_engines() -> None:
+    """Dispose every engine created by this module"""
+    for engine in _engines.values():
+        await engine.dispose()
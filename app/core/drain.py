@@ -0,0 +1,108 @@
+import asyncio
+import logging
+import signal
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class InFlightRequests:
+    """Counts HTTP requests being handled so shutdown can wait for them"""
+
+    def __init__(self):
+        self.count = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    def started(self) -> None:
+        self.count += 1
+        self._idle.clear()
+
+    def finished(self) -> None:
+        self.count -= 1
+        if self.count == 0:
+            self._idle.set()
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """Wait until no request is in flight, False when the timeout passed first"""
+        try:
+            await asyncio.wait_for(self._idle.wait(), max(timeout, 0))
+            return True
+        except TimeoutError:
+            return False
+
+
+in_flight_requests = InFlightRequests()
+
+
+class InFlightRequestsMiddleware:
+    """Tracks every HTTP request, including ones shed by admission control"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        in_flight_requests.started()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            in_flight_requests.finished()
+
+
+async def drain_task(task: asyncio.Task, name: str, timeout: float) -> bool:
+    """Let a task that was asked to stop finish, cancel it once the timeout passes.
+
+    Returns False when the task had to be abandoned.
+    """
+    try:
+        await asyncio.wait_for(asyncio.shield(task), max(timeout, 0))
+        return True
+    except TimeoutError:
+        logger.warning(f"{name} did not finish within {timeout:.1f}s, abandoning it")
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return False
+    except Exception as e:
+        logger.error(f"{name} failed while draining: {e}")
+        return True
+
+
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM)
+
+
+@contextmanager
+def on_stop_signal(callback: Callable[[], None]) -> Iterator[None]:
+    """Run callback on the event loop when a stop signal arrives, then pass the signal on to the
+    server's handler.
+
+    uvicorn waits for open connections before it runs the lifespan shutdown, so anything keeping a
+    connection open, like a change stream, has to be stopped from the signal itself. Only signals a
+    server already handles are hooked.
+    """
+    # Signal handlers can only be set from the main thread
+    if threading.current_thread() is not threading.main_thread():
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    previous = {sig: handler for sig in STOP_SIGNALS if callable(handler := signal.getsignal(sig))}
+
+    def handle(sig, frame):
+        loop.call_soon_threadsafe(callback)
+        previous[sig](sig, frame)
+
+    for sig in previous:
+        signal.signal(sig, handle)
+    try:
+        yield
+    finally:
+        for sig, handler in previous.items():
+            # Leave a handler installed after ours in place
+            if signal.getsignal(sig) is handle:
+                signal.signal(sig, handler)
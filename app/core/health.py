@@ -0,0 +1,28 @@
+import time
+
+
+class ReadinessState:
+    """Tracks the conditions that must hold before the pod should receive traffic"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.database_warmed = False
+        # Subscribed and not stopped by a fatal error; a pod left without partitions by the
+        # group (more pods than partitions) is still ready
+        self.kafka_subscribed = False
+        # Set on shutdown so load balancers stop routing new requests here
+        self.draining = False
+
+    @property
+    def ready(self) -> bool:
+        return self.database_warmed and self.kafka_subscribed and not self.draining
+
+    def checks(self) -> dict[str, bool]:
+        return {
+            "database": self.database_warmed,
+            "kafka": self.kafka_subscribed,
+            "accepting": not self.draining,
+        }
+
+
+readiness = ReadinessState()
@@ -0,0 +1,141 @@
+import logging
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .config import settings
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+query_duration = registry.histogram(
+    "db_query_duration_seconds",
+    "Duration of individual SQL statements",
+    ["operation"],
+)
+queries_per_operation = registry.histogram(
+    "db_queries_per_operation",
+    "Number of SQL statements issued by one request or consumed message",
+    ["operation"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100),
+)
+query_time_per_operation = registry.histogram(
+    "db_query_time_per_operation_seconds",
+    "Total SQL time of one request or consumed message",
+    ["operation"],
+)
+slow_queries = registry.counter(
+    "db_slow_queries",
+    "SQL statements slower than DB_SLOW_QUERY_THRESHOLD_MS",
+    ["operation"],
+)
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = r"(?:\?|\$\d+|%\(\w+\)s)(?:::\w+(?:\[\])?)?"
+_VALUE_LIST = re.compile(rf"\((?:\s*{_PLACEHOLDER}\s*,)+\s*{_PLACEHOLDER}\s*\)")
+MAX_LOGGED_STATEMENT_LENGTH = 2000
+
+
+class OperationStats:
+    """SQL statements issued on behalf of one route call or consumed message"""
+
+    __slots__ = ("name", "scope", "queries", "query_time")
+
+    def __init__(self, name: str | None = None, scope: Scope | None = None):
+        self.name = name
+        self.scope = scope
+        self.queries = 0
+        self.query_time = 0.0
+
+    @property
+    def label(self) -> str:
+        if self.name is None and self.scope is not None:
+            # The router stores the matched endpoint in the scope before calling it
+            endpoint = self.scope.get("endpoint")
+            if endpoint is None:
+                return "unmatched"
+            self.name = getattr(endpoint, "__name__", "unknown")
+        return self.name or "unknown"
+
+
+current_operation: ContextVar[OperationStats | None] = ContextVar("current_operation", default=None)
+
+
+def _record(stats: OperationStats) -> None:
+    queries_per_operation.observe(stats.queries, operation=stats.label)
+    query_time_per_operation.observe(stats.query_time, operation=stats.label)
+
+
+@contextmanager
+def track_operation(name: str) -> Iterator[OperationStats]:
+    """Attribute SQL statements issued inside the block to the named operation"""
+    stats = OperationStats(name=name)
+    token = current_operation.set(stats)
+    try:
+        yield stats
+    finally:
+        current_operation.reset(token)
+        _record(stats)
+
+
+class QueryInstrumentationMiddleware:
+    """Attributes SQL statements issued while handling a request to the matched route"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = OperationStats(scope=scope)
+        token = current_operation.set(stats)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_operation.reset(token)
+            if stats.queries:
+                _record(stats)
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace, literals and parameter lists so similar statements group together"""
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING_LITERAL.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _VALUE_LIST.sub("(...)", normalized)
+    return normalized[:MAX_LOGGED_STATEMENT_LENGTH]
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Record count and duration of every statement run through the engine"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute", named=True)
+    def _before_cursor_execute(context, **kw):
+        context._query_started_at = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute", named=True)
+    def _after_cursor_execute(context, statement, **kw):
+        elapsed = time.perf_counter() - context._query_started_at
+        stats = current_operation.get()
+        label = stats.label if stats is not None else "background"
+        if stats is not None:
+            stats.queries += 1
+            stats.query_time += elapsed
+
+        query_duration.observe(elapsed, operation=label)
+        if elapsed * 1000 >= settings.DB_SLOW_QUERY_THRESHOLD_MS:
+            slow_queries.inc(operation=label)
+            logger.warning(
+                f"Slow query in {label} ({elapsed * 1000:.1f} ms): {normalize_sql(statement)}"
+            )
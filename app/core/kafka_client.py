@@ -2,15 +2,26 @@ import asyncio
 import datetime
 import json
 import logging
+import time
+from collections.abc import Callable
+from typing import Protocol
 
-from confluent_kafka import Consumer, KafkaError, Message
+from confluent_kafka import Consumer, KafkaError, Message, TopicPartition
 from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import select
 
-from app.core.database import AsyncSessionFactory
+from app.core.health import readiness
+from app.core.instrumentation import track_operation
+from app.core.kafka_metrics import consumer_errors, consumer_metrics
+from app.core.sharding import shard_router
+from app.core.tracing import extract_kafka, span
 from app.models.subscription import Subscription, SubscriptionStatus
-from app.schemas.kafka_events import PaymentSucceededEvent
+from app.models.tier import Tier
+from app.schemas.kafka_events import PaymentSucceededEvent, SubscriptionActivatedEvent
+from app.services.change_feed import change_feed
+from app.services.outbox import add_subscription_event
+from app.services.revenue import RollupDelta, apply_rollup_deltas
 
 from .config import settings
 
@@ -73,7 +84,29 @@ class SubscriptionHandler:
             session.add(subscription)
             logger.info(f"Creating new subscription for user {event.user_id}, tier {event.tier_id}")
 
+        tier = await session.get(Tier, event.tier_id)
+        outbox_event = add_subscription_event(
+            session,
+            SubscriptionActivatedEvent(
+                subscription_id=subscription.id,
+                supporter_id=subscription.supporter_id,
+                creator_id=tier.creator_id,
+                tier_id=tier.id,
+                status=SubscriptionStatus.ACTIVE.value,
+                expires_at=expiry_time,
+                occurred_at=start_time,
+            ),
+        )
+        await apply_rollup_deltas(
+            session,
+            {
+                tier.id: RollupDelta(
+                    active=1, activations=1, payments=1, payments_amount=event.amount
+                )
+            },
+        )
         await session.commit()
+        change_feed.publish_event(outbox_event)
         logger.info(f"Committed subscription changes for user {event.user_id}")
 
 
@@ -83,8 +116,8 @@ class MessageProcessor:
     def __init__(self):
         self.subscription_handler = SubscriptionHandler()
 
-    async def process_message(self, msg: Message, session: AsyncSession) -> bool:
-        """Process a single Kafka message"""
+    async def process_message(self, msg: Message) -> bool:
+        """Process a single Kafka message in a session on the supporter's shard"""
         try:
             event_data = json.loads(msg.value().decode("utf-8"))
             event_type = event_data.get("event_type")
@@ -99,7 +132,9 @@ class MessageProcessor:
                 f" payment {event.payment_id}"
             )
 
-            return await self.subscription_handler.process_subscription(event, session)
+            async with shard_router.shard_for(event.user_id).session_factory() as session:
+                logger.debug(f"Created new DB session for message at offset {msg.offset()}")
+                return await self.subscription_handler.process_subscription(event, session)
 
         except (json.JSONDecodeError, ValidationError) as e:
             logger.error(
@@ -112,36 +147,84 @@ class MessageProcessor:
             return False
 
 
+class ConsumerBackend(Protocol):
+    """Subset of the confluent_kafka.Consumer API the client relies on"""
+
+    def subscribe(self, topics: list[str], on_assign=None, on_revoke=None) -> None: ...
+
+    def poll(self, timeout: float) -> Message | None: ...
+
+    def commit(
+        self,
+        message: Message | None = None,
+        offsets: list[TopicPartition] | None = None,
+        asynchronous: bool = True,
+    ) -> None: ...
+
+    def close(self) -> None: ...
+
+
+ConsumerFactory = Callable[[dict], ConsumerBackend]
+
+
 class KafkaConsumer:
     """Handles Kafka consumer operations"""
 
-    def __init__(self):
+    def __init__(self, consumer_factory: ConsumerFactory = Consumer):
         self._running = True
-        self._consumer: Consumer | None = None
+        self._consumer: ConsumerBackend | None = None
+        self._consumer_factory = consumer_factory
+        # Next offset per (topic, partition) of processed messages whose commit failed
+        self._uncommitted: dict[tuple[str, int], int] = {}
 
-    def _initialize_consumer(self) -> Consumer:
+    def _initialize_consumer(self) -> ConsumerBackend:
         """Initialize and configure Kafka consumer"""
         conf = {
             "bootstrap.servers": settings.KAFKA_BOOTSTRAP_SERVERS,
             "group.id": settings.KAFKA_CONSUMER_GROUP_ID,
             "auto.offset.reset": "earliest",
             "enable.auto.commit": False,
+            "error_cb": self._on_error,
         }
-        consumer = Consumer(conf)
-        consumer.subscribe([settings.KAFKA_PAYMENT_EVENTS_TOPIC])
+        if settings.KAFKA_STATISTICS_INTERVAL_MS > 0:
+            conf["statistics.interval.ms"] = settings.KAFKA_STATISTICS_INTERVAL_MS
+            conf["stats_cb"] = consumer_metrics.stats_cb
+        consumer = self._consumer_factory(conf)
+        consumer.subscribe(
+            [settings.KAFKA_PAYMENT_EVENTS_TOPIC],
+            on_assign=self._on_assign,
+            on_revoke=self._on_revoke,
+        )
+        readiness.kafka_subscribed = True
         logger.info(
             f"Kafka consumer initialized for group '{settings.KAFKA_CONSUMER_GROUP_ID}' "
             f"on topic '{settings.KAFKA_PAYMENT_EVENTS_TOPIC}'"
         )
         return consumer
 
+    def _on_error(self, error: KafkaError):
+        consumer_metrics.error_cb(error)
+        if error.fatal():
+            readiness.kafka_subscribed = False
+
+    def _on_assign(self, consumer: ConsumerBackend, partitions: list[TopicPartition]):
+        consumer_metrics.on_assign(partitions)
+        logger.info(f"Kafka partitions assigned: {[p.partition for p in partitions]}")
+
+    def _on_revoke(self, consumer: ConsumerBackend, partitions: list[TopicPartition]):
+        consumer_metrics.on_revoke(partitions)
+        logger.info(f"Kafka partitions revoked: {[p.partition for p in partitions]}")
+
     async def _handle_message_error(self, msg: Message) -> bool:
         """Handle Kafka message errors"""
         if msg.error().code() == KafkaError._PARTITION_EOF:
             return True
-        elif msg.error().fatal():
+        consumer_errors.inc(code=msg.error().name())
+        if msg.error().fatal():
             logger.error(f"Fatal Kafka error: {msg.error()}. Stopping consumer.")
+            consumer_metrics.fatal_error = str(msg.error())
             self._running = False
+            readiness.kafka_subscribed = False
             return False
         else:
             logger.warning(f"Non-fatal Kafka error: {msg.error()}. Continuing.")
@@ -151,8 +234,8 @@ class KafkaConsumer:
 class KafkaClient:
     """Main Kafka client class orchestrating message consumption"""
 
-    def __init__(self):
-        self.consumer = KafkaConsumer()
+    def __init__(self, consumer_factory: ConsumerFactory = Consumer):
+        self.consumer = KafkaConsumer(consumer_factory)
         self.processor = MessageProcessor()
 
     async def consume_messages(self):
@@ -165,6 +248,7 @@ class KafkaClient:
         try:
             while self.consumer._running:
                 msg = self.consumer._consumer.poll(1.0)
+                consumer_metrics.polled()
 
                 if msg is None:
                     await asyncio.sleep(0.1)
@@ -179,26 +263,44 @@ class KafkaClient:
                     f"Received message from Kafka: Topic={msg.topic()}, "
                     f"Partition={msg.partition()}, Offset={msg.offset()}"
                 )
+                started = time.perf_counter()
                 processed_successfully = False
                 try:
-                    async with AsyncSessionFactory() as session:
-                        logger.debug(f"Created new DB session for message at offset {msg.offset()}")
-                        processed_successfully = await self.processor.process_message(msg, session)
+                    with (
+                        track_operation(f"kafka:{msg.topic()}"),
+                        span(
+                            f"{msg.topic()} process",
+                            "consumer",
+                            {
+                                "messaging.system": "kafka",
+                                "messaging.destination": msg.topic(),
+                                "messaging.kafka.partition": msg.partition(),
+                                "messaging.kafka.offset": msg.offset(),
+                            },
+                            parent=extract_kafka(msg.headers()),
+                        ),
+                    ):
+                        processed_successfully = await self.processor.process_message(msg)
                 except Exception as e:
-                    logger.exception(
-                        f"Error managing session scope for message at offset {msg.offset()}: {e}"
-                    )
+                    logger.exception(f"Error processing message at offset {msg.offset()}: {e}")
                     processed_successfully = False
 
                 if processed_successfully:
                     try:
                         self.consumer._consumer.commit(message=msg, asynchronous=False)
+                        self.consumer._uncommitted.pop((msg.topic(), msg.partition()), None)
+                        consumer_metrics.message_done(msg, started, "processed")
                         logger.debug(
                             f"Committed Kafka offset {msg.offset()} for partition {msg.partition()}"
                         )
                     except Exception as e:
+                        self.consumer._uncommitted[(msg.topic(), msg.partition())] = (
+                            msg.offset() + 1
+                        )
+                        consumer_metrics.message_done(msg, started, "commit_failed")
                         logger.exception(f"Failed to commit Kafka offset {msg.offset()}: {e}")
                 else:
+                    consumer_metrics.message_done(msg, started, "failed")
                     logger.warning(
                         f"Processing failed for message at offset {msg.offset()}."
                         f" Offset not committed. Will likely retry."
@@ -212,9 +314,26 @@ class KafkaClient:
         finally:
             self._cleanup()
 
+    def _flush_offsets(self):
+        """Retry the commits that failed, so processed messages are not redelivered"""
+        pending = self.consumer._uncommitted
+        if not pending:
+            return
+        offsets = [
+            TopicPartition(topic, partition, offset)
+            for (topic, partition), offset in pending.items()
+        ]
+        try:
+            self.consumer._consumer.commit(offsets=offsets, asynchronous=False)
+            pending.clear()
+            logger.info(f"Flushed {len(offsets)} pending Kafka offsets")
+        except Exception as e:
+            logger.exception(f"Failed to flush pending Kafka offsets {offsets}: {e}")
+
     def _cleanup(self):
         """Clean up Kafka consumer resources"""
         if self.consumer._consumer:
+            self._flush_offsets()
             logger.info("Closing Kafka consumer...")
             try:
                 self.consumer._consumer.close()
@@ -223,7 +342,7 @@ class KafkaClient:
                 logger.exception(f"Error closing Kafka consumer: {e}")
 
     def close_consumer(self):
-        """Signal consumer to stop"""
+        """Signal consumer to stop polling; the message in flight still finishes and commits"""
         self.consumer._running = False
         logger.info("Stop signal sent to consumer")
 
@@ -0,0 +1,150 @@
+import json
+import logging
+import time
+
+from confluent_kafka import TIMESTAMP_NOT_AVAILABLE, KafkaError, Message
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+message_processing = registry.histogram(
+    "kafka_message_processing_seconds",
+    "Time from poll to offset commit per consumed message",
+    ["topic", "outcome"],
+)
+message_age = registry.histogram(
+    "kafka_message_age_seconds",
+    "Time from the producer timestamp to the end of processing",
+    ["topic"],
+)
+messages_consumed = registry.counter(
+    "kafka_messages_consumed",
+    "Consumed messages: processed were committed, failed were left for redelivery, "
+    "commit_failed were processed but their offset commit failed",
+    ["topic", "outcome"],
+)
+consumer_errors = registry.counter(
+    "kafka_consumer_errors", "Errors reported by librdkafka or returned from poll", ["code"]
+)
+rebalances = registry.counter(
+    "kafka_consumer_rebalances", "Partition assignment changes seen by this consumer", ["kind"]
+)
+rebalance_pause = registry.histogram(
+    "kafka_consumer_rebalance_seconds",
+    "Time from partitions being revoked to the next assignment, when nothing is consumed",
+)
+
+
+class ConsumerMetrics:
+    """Consumer state from librdkafka statistics and from timers in the consume loop.
+
+    librdkafka calls stats_cb from poll every statistics.interval.ms with a JSON document; the
+    per-partition lag, group state and rebalance counts are kept from the latest one and
+    exposed through callback gauges, so revoked partitions disappear with the next report.
+    """
+
+    def __init__(self):
+        self.lag: dict[tuple[str, str], int] = {}
+        self.group_state = "unknown"
+        self.assigned_partitions = 0
+        self.last_stats_at: float | None = None
+        self.last_poll_at: float | None = None
+        self.revoked_at: float | None = None
+        self.fatal_error: str | None = None
+        registry.gauge(
+            "kafka_consumer_lag",
+            "Messages between the committed offset and the partition high watermark",
+            ["topic", "partition"],
+            callback=lambda: list(self.lag.items()),
+        )
+        registry.gauge(
+            "kafka_consumer_lag_total",
+            "Sum of consumer lag over the assigned partitions",
+            callback=lambda: [((), sum(self.lag.values()))],
+        )
+        registry.gauge(
+            "kafka_consumer_assigned_partitions",
+            "Partitions currently assigned to this consumer",
+            callback=lambda: [((), self.assigned_partitions)],
+        )
+        registry.gauge(
+            "kafka_consumer_poll_age_seconds",
+            "Time since the consume loop last polled",
+            callback=lambda: [((), self.poll_age() or 0.0)],
+        )
+
+    def stats_cb(self, stats_json: str) -> None:
+        try:
+            stats = json.loads(stats_json)
+        except json.JSONDecodeError as e:
+            logger.error(f"Invalid librdkafka statistics: {e}")
+            return
+        lag = {}
+        for topic, topic_stats in stats.get("topics", {}).items():
+            for partition, partition_stats in topic_stats.get("partitions", {}).items():
+                # -1 is librdkafka's internal unassigned partition
+                if partition == "-1" or partition_stats.get("fetch_state") == "none":
+                    continue
+                if partition_stats.get("consumer_lag", -1) >= 0:
+                    lag[(topic, partition)] = partition_stats["consumer_lag"]
+        self.lag = lag
+        group = stats.get("cgrp", {})
+        self.group_state = group.get("state", self.group_state)
+        self.last_stats_at = time.monotonic()
+
+    def error_cb(self, error: KafkaError) -> None:
+        consumer_errors.inc(code=error.name())
+        if error.fatal():
+            self.fatal_error = str(error)
+        logger.warning(f"Kafka client error: {error}")
+
+    def on_assign(self, partitions: list) -> None:
+        rebalances.inc(kind="assign")
+        self.assigned_partitions = len(partitions)
+        if self.revoked_at is not None:
+            rebalance_pause.observe(time.monotonic() - self.revoked_at)
+            self.revoked_at = None
+
+    def on_revoke(self, partitions: list) -> None:
+        rebalances.inc(kind="revoke")
+        self.assigned_partitions = 0
+        self.lag = {}
+        self.revoked_at = time.monotonic()
+
+    def polled(self) -> None:
+        self.last_poll_at = time.monotonic()
+
+    def poll_age(self) -> float | None:
+        return None if self.last_poll_at is None else time.monotonic() - self.last_poll_at
+
+    def message_done(self, msg: Message, started: float, outcome: str) -> None:
+        topic = msg.topic()
+        messages_consumed.inc(topic=topic, outcome=outcome)
+        message_processing.observe(time.perf_counter() - started, topic=topic, outcome=outcome)
+        timestamp_type, timestamp = msg.timestamp()
+        if timestamp_type != TIMESTAMP_NOT_AVAILABLE:
+            message_age.observe(max(0.0, time.time() - timestamp / 1000), topic=topic)
+
+    def health(self) -> tuple[bool, dict]:
+        """Healthy while the loop keeps polling, no fatal error occurred and lag is bounded"""
+        poll_age = self.poll_age()
+        total_lag = sum(self.lag.values())
+        checks = {
+            "polling": poll_age is not None and poll_age < settings.KAFKA_CONSUMER_STALL_SECONDS,
+            "no_fatal_error": self.fatal_error is None,
+            "lag_within_limit": total_lag <= settings.KAFKA_CONSUMER_MAX_HEALTHY_LAG,
+        }
+        details = {
+            "checks": checks,
+            "poll_age_seconds": poll_age,
+            "assigned_partitions": self.assigned_partitions,
+            "group_state": self.group_state,
+            "total_lag": total_lag,
+            "fatal_error": self.fatal_error,
+        }
+        return all(checks.values()), details
+
+
+consumer_metrics = ConsumerMetrics()
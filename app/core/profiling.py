@@ -0,0 +1,229 @@
+import asyncio
+import collections
+import hmac
+import logging
+import os
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+STDLIB = sysconfig.get_paths()["stdlib"]
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+
+# One sampler at a time, whether process-wide or for a single request
+_sampler_lock = threading.Lock()
+# Collapsed stacks of recent per-request profiles by profile id
+request_profiles: collections.OrderedDict[str, str] = collections.OrderedDict()
+
+
+class ProfilerBusy(Exception):
+    """Another profile is already running"""
+
+
+def token_matches(token: str | None) -> bool:
+    return bool(settings.PROFILING_TOKEN and token) and hmac.compare_digest(
+        token.encode(), settings.PROFILING_TOKEN.encode()
+    )
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    path = code.co_filename
+    # Drop install prefixes so stacks from different hosts merge
+    _, marker, rest = path.rpartition(f"site-packages{os.sep}")
+    if marker:
+        path = rest
+    elif path.startswith(PROJECT_ROOT):
+        path = os.path.relpath(path, PROJECT_ROOT)
+    elif path.startswith(STDLIB):
+        path = os.path.relpath(path, STDLIB)
+    return f"{code.co_qualname} ({path})"
+
+
+def _collapse(frame, root: str) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.append(root)
+    return ";".join(reversed(names))
+
+
+class StackSampler:
+    """Samples Python stacks from a background thread into collapsed-stack counts.
+
+    The output is the format flamegraph.pl and speedscope read: one line per distinct stack,
+    frames root first separated by semicolons, then the number of samples. Sampling the event
+    loop thread shows the coroutine chain running at each sample, which includes every request
+    and the Kafka consumer sharing the loop; time the loop spends idle shows up in select.
+    """
+
+    def __init__(self, interval: float, thread_id: int | None = None):
+        self.interval = interval
+        self.thread_id = thread_id
+        self.samples: collections.Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _sample_once(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own or (self.thread_id is not None and thread_id != self.thread_id):
+                continue
+            self.samples[_collapse(frame, names.get(thread_id, str(thread_id)))] += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample_once()
+
+    def start(self) -> None:
+        if not _sampler_lock.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        try:
+            self._thread.join()
+        finally:
+            _sampler_lock.release()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+async def sample_process(seconds: float, interval: float) -> str:
+    """Sample every thread for the given time and return collapsed stacks"""
+    sampler = StackSampler(interval)
+    sampler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        collapsed = sampler.stop()
+    logger.info(f"Sampled process stacks for {seconds}s: {sum(sampler.samples.values())} samples")
+    return collapsed
+
+
+def _describe_callback(handle: asyncio.Handle) -> str:
+    callback = handle._callback
+    task = getattr(callback, "__self__", None)
+    if isinstance(task, asyncio.Task):
+        coro = task.get_coro()
+        return f"task {getattr(coro, '__qualname__', repr(coro))}"
+    return getattr(callback, "__qualname__", repr(callback))
+
+
+async def profile_event_loop(seconds: float, threshold: float) -> dict:
+    """Measure event loop lag and callbacks that block the loop for at least threshold seconds.
+
+    Lag comes from a probe that sleeps a fixed tick and records how late it wakes up. Slow
+    callbacks are timed by wrapping asyncio.Handle._run for the duration of the window only,
+    which needs the default asyncio loop: under uvloop only lag is reported.
+    """
+    tick = 0.01
+    lags: list[float] = []
+    slow: dict[str, list[float]] = {}
+    original_run = asyncio.events.Handle._run
+
+    def timed_run(handle):
+        started = time.perf_counter()
+        try:
+            return original_run(handle)
+        finally:
+            elapsed = time.perf_counter() - started
+            if elapsed >= threshold:
+                stats = slow.setdefault(_describe_callback(handle), [0, 0.0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+                stats[2] = max(stats[2], elapsed)
+
+    if not _sampler_lock.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    asyncio.events.Handle._run = timed_run
+    try:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            await asyncio.sleep(tick)
+            lags.append(max(0.0, time.monotonic() - started - tick))
+    finally:
+        asyncio.events.Handle._run = original_run
+        _sampler_lock.release()
+
+    lags.sort()
+    return {
+        "seconds": seconds,
+        "threshold_ms": threshold * 1000,
+        "lag_ms": {
+            "samples": len(lags),
+            "p50": lags[len(lags) // 2] * 1000 if lags else 0.0,
+            "p99": lags[int(len(lags) * 0.99)] * 1000 if lags else 0.0,
+            "max": lags[-1] * 1000 if lags else 0.0,
+        },
+        "slow_callbacks": [
+            {
+                "callback": name,
+                "count": count,
+                "total_ms": total * 1000,
+                "max_ms": longest * 1000,
+            }
+            for name, (count, total, longest) in sorted(
+                slow.items(), key=lambda item: item[1][1], reverse=True
+            )
+        ],
+    }
+
+
+class RequestProfilingMiddleware:
+    """Samples the event loop thread while one request runs, when it sends X-Profile.
+
+    The header must carry PROFILING_TOKEN. The response gets X-Profile-Id, and the collapsed
+    stacks are fetched from /internal/profiling/requests/{id}. Only installed when
+    PROFILING_TOKEN is set, so requests pay nothing otherwise.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = next((value for name, value in scope["headers"] if name == PROFILE_HEADER), None)
+        if token is None or not token_matches(token.decode("latin-1")):
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(settings.PROFILING_SAMPLE_INTERVAL_MS / 1000, threading.get_ident())
+        try:
+            sampler.start()
+        except ProfilerBusy:
+            await self.app(scope, receive, send)
+            return
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message["headers"], (PROFILE_ID_HEADER, profile_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_profiles[profile_id] = sampler.stop()
+            while len(request_profiles) > settings.PROFILING_REQUEST_PROFILES_KEPT:
+                request_profiles.popitem(last=False)
+            logger.info(f"Profiled {scope['method']} {scope['path']} as {profile_id}")
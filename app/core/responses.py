@@ -0,0 +1,15 @@
+from typing import Any
+
+import pydantic_core
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by pydantic-core instead of the standard library encoder.
+
+    Besides being faster, it serializes UUIDs, datetimes, decimals and enums natively, so
+    endpoints can return plain rows without running them through response model validation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return pydantic_core.to_json(content)
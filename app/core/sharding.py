@@ -0,0 +1,176 @@
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import uuid
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import TypeVar
+
+from sqlalchemy import ColumnElement, literal_column
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker
+
+from .auth import CurrentUserUUID
+from .config import settings
+from .database import (
+    AsyncSessionFactory,
+    ReadAsyncSessionFactory,
+    async_engine,
+    build_async_engine,
+    read_async_engine,
+)
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Name of the only shard when sharding is off, which is the primary database itself
+PRIMARY_SHARD = "primary"
+
+shard_fanouts = registry.counter(
+    "shard_fanout_queries", "Creator-scoped operations sent to every shard", ["operation"]
+)
+
+
+def supporter_bucket(supporter_id: uuid.UUID, buckets: int) -> int:
+    """Bucket of a supporter: the first 32 bits of the md5 of its text form, modulo buckets.
+
+    Stable across processes and versions, and computed the same way in SQL by bucket_sql.
+    """
+    digest = hashlib.md5(str(supporter_id).encode(), usedforsecurity=False).digest()
+    return int.from_bytes(digest[:4], "big") % buckets
+
+
+def bucket_sql(column: ColumnElement, buckets: int) -> ColumnElement:
+    """SQL expression of supporter_bucket for a uuid column"""
+    compiled = f"{column.table.name}.{column.name}"
+    return literal_column(
+        f"(('x' || substr(md5({compiled}::text), 1, 8))::bit(32)::bigint % {int(buckets)})"
+    )
+
+
+def bucket_owners(names: list[str], buckets: int, ranges: dict[str, str]) -> list[str]:
+    """Shard name owning each bucket, from SUBSCRIPTION_SHARD_MAP style ranges.
+
+    Without ranges the buckets are split into equal contiguous ranges in name order. Raises
+    ValueError unless every bucket belongs to exactly one configured shard.
+    """
+    if buckets < len(names):
+        raise ValueError(f"{buckets} buckets cannot be spread over {len(names)} shards")
+    if not ranges:
+        return [names[bucket * len(names) // buckets] for bucket in range(buckets)]
+    unknown = set(ranges) - set(names)
+    if unknown:
+        raise ValueError(f"Shard map names unknown shards: {sorted(unknown)}")
+
+    owners: list[str | None] = [None] * buckets
+    for name, spec in ranges.items():
+        for part in spec.split(","):
+            first, _, last = part.strip().partition("-")
+            first, last = int(first), int(last or first)
+            if not 0 <= first <= last < buckets:
+                raise ValueError(f"Invalid bucket range {part!r} for shard {name}")
+            for bucket in range(first, last + 1):
+                if owners[bucket] is not None:
+                    raise ValueError(f"Bucket {bucket} is mapped to {owners[bucket]} and {name}")
+                owners[bucket] = name
+    missing = [bucket for bucket, owner in enumerate(owners) if owner is None]
+    if missing:
+        raise ValueError(f"{len(missing)} buckets have no shard, the first is {missing[0]}")
+    return owners
+
+
+@dataclasses.dataclass(frozen=True)
+class Shard:
+    """One database holding the subscriptions of a set of supporter buckets"""
+
+    name: str
+    engine: AsyncEngine
+    read_engine: AsyncEngine
+    session_factory: async_sessionmaker[AsyncSession]
+    read_session_factory: async_sessionmaker[AsyncSession]
+
+    @property
+    def dsn(self) -> str:
+        """libpq DSN, for raw asyncpg connections"""
+        return self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+class ShardRouter:
+    """Routes supporter-scoped work to the shard owning the supporter's bucket.
+
+    Everything about one supporter (subscriptions, their outbox events and rollup deltas) lives
+    on one shard, so every write stays a local transaction. Only creator-scoped reads, whose
+    supporters are spread over all shards, are sent to every shard and merged.
+    """
+
+    def __init__(self, shards: list[Shard], owners: list[str]):
+        self.shards = shards
+        self._by_name = {shard.name: shard for shard in shards}
+        self._owners = [self._by_name[name] for name in owners]
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self._owners)
+
+    def shard_for(self, supporter_id: uuid.UUID) -> Shard:
+        if not self._owners:
+            return self.shards[0]
+        return self._owners[supporter_bucket(supporter_id, len(self._owners))]
+
+    def get(self, name: str) -> Shard:
+        try:
+            return self._by_name[name]
+        except KeyError:
+            raise ValueError(
+                f"Unknown shard {name!r}, configured: {sorted(self._by_name)}"
+            ) from None
+
+    def buckets_of(self, shard: Shard) -> list[int]:
+        return [bucket for bucket, owner in enumerate(self._owners) if owner is shard]
+
+    async def gather(self, operation: str, run: Callable[[Shard], Awaitable[T]]) -> list[T]:
+        """Run a creator-scoped operation on every shard concurrently, results in shard order"""
+        if self.sharded:
+            shard_fanouts.inc(operation=operation)
+        return await asyncio.gather(*(run(shard) for shard in self.shards))
+
+
+def _build_router() -> ShardRouter:
+    if not settings.SUBSCRIPTION_SHARDS:
+        primary = Shard(
+            PRIMARY_SHARD,
+            async_engine,
+            read_async_engine,
+            AsyncSessionFactory,
+            ReadAsyncSessionFactory,
+        )
+        return ShardRouter([primary], [])
+
+    names = sorted(settings.SUBSCRIPTION_SHARDS)
+    owners = bucket_owners(
+        names, settings.SUBSCRIPTION_SHARD_BUCKETS, settings.SUBSCRIPTION_SHARD_MAP
+    )
+    shards = []
+    for name in names:
+        engine = build_async_engine(str(settings.SUBSCRIPTION_SHARDS[name]), f"shard_{name}")
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False, class_=AsyncSession
+        )
+        shards.append(Shard(name, engine, engine, session_factory, session_factory))
+    logger.info(f"Subscriptions sharded over {names} in {len(owners)} buckets")
+    return ShardRouter(shards, owners)
+
+
+shard_router = _build_router()
+
+
+async def get_supporter_session(supporter_id: CurrentUserUUID) -> AsyncGenerator[AsyncSession]:
+    """FastAPI dependency for a session on the current user's shard"""
+    async with shard_router.shard_for(supporter_id).session_factory() as session:
+        try:
+            yield session
+        except Exception:
+            logger.exception("Shard session rollback because of exception")
+            await session.rollback()
+            raise
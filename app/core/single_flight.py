@@ -0,0 +1,103 @@
+import asyncio
+import collections
+import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from app.core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+single_flight_requests = registry.counter(
+    "single_flight_requests",
+    "Lookups by how they were served: leader ran the query, coalesced shared an in-flight "
+    "one, cache_hit came from the result cache, timeout gave up waiting",
+    ["name", "outcome"],
+)
+
+_groups: list["SingleFlight"] = []
+
+
+def _in_flight_samples():
+    return [((group.name,), len(group._in_flight)) for group in _groups]
+
+
+registry.gauge(
+    "single_flight_in_flight",
+    "Distinct lookups currently running",
+    ["name"],
+    callback=_in_flight_samples,
+)
+
+
+class SingleFlight:
+    """Shares one in-flight lookup among all concurrent callers asking for the same key.
+
+    The lookup runs in its own task, so a caller that disconnects does not cancel it for the
+    others. Every caller waits at most max_wait seconds and then gets TimeoutError. With a
+    positive cache_ttl successful results are also kept in a bounded LRU for that long.
+    """
+
+    def __init__(self, name: str, max_wait: float, cache_ttl: float = 0.0, cache_size: int = 10000):
+        self.name = name
+        self.max_wait = max_wait
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._in_flight: dict[Hashable, asyncio.Task] = {}
+        self._cache: collections.OrderedDict[Hashable, tuple[float, Any]] = (
+            collections.OrderedDict()
+        )
+        _groups.append(self)
+
+    def _cached(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._cache.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._cache[key]
+            return False, None
+        self._cache.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, task: asyncio.Task) -> None:
+        # A lookup invalidated while running may have read the old value, so it is not cached
+        registered = self._in_flight.get(key) is task
+        if registered:
+            del self._in_flight[key]
+        if task.cancelled() or task.exception() is not None or not registered:
+            return
+        if self.cache_ttl > 0:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, task.result())
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a cached result, later callers start a new lookup"""
+        self._cache.pop(key, None)
+        self._in_flight.pop(key, None)
+
+    async def do(self, key: Hashable, lookup: Callable[[], Awaitable[Any]]) -> Any:
+        if self.cache_ttl > 0:
+            hit, value = self._cached(key)
+            if hit:
+                single_flight_requests.inc(name=self.name, outcome="cache_hit")
+                return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.create_task(lookup())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._store(key, done))
+            single_flight_requests.inc(name=self.name, outcome="leader")
+        else:
+            single_flight_requests.inc(name=self.name, outcome="coalesced")
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), self.max_wait)
+        except TimeoutError:
+            single_flight_requests.inc(name=self.name, outcome="timeout")
+            logger.warning(f"Gave up waiting {self.max_wait}s for {self.name} lookup {key}")
+            raise
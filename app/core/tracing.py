@@ -0,0 +1,352 @@
+import asyncio
+import collections
+import contextlib
+import json
+import logging
+import os
+import random
+import re
+import time
+from collections.abc import Iterator
+from contextvars import ContextVar
+from typing import Any, Protocol
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .config import settings
+from .instrumentation import normalize_sql
+from .metrics import registry
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+MAX_STATEMENT_LENGTH = 500
+HTTP_SERVER_ERROR = 500
+
+tracing_spans = registry.counter(
+    "tracing_spans",
+    "Sampled spans by outcome: exported, dropped when the export queue was full, failed export",
+    ["outcome"],
+)
+
+
+def tracing_enabled() -> bool:
+    return settings.TRACING_EXPORTER != "none"
+
+
+class SpanContext:
+    """W3C trace context carried across processes in the traceparent header"""
+
+    __slots__ = ("trace_id", "span_id", "sampled")
+
+    def __init__(self, trace_id: str, span_id: str, sampled: bool):
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.sampled = sampled
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+def parse_traceparent(value: str | bytes | None) -> SpanContext | None:
+    if isinstance(value, bytes):
+        value = value.decode("latin-1")
+    match = _TRACEPARENT.match(value.strip().lower()) if value else None
+    if match is None:
+        return None
+    trace_id, span_id, flags = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return SpanContext(trace_id, span_id, bool(int(flags, 16) & 1))
+
+
+class Span:
+    """One timed operation; only sampled spans are handed to the exporter when they end"""
+
+    __slots__ = ("context", "parent_id", "name", "kind", "start_ns", "end_ns", "attributes")
+
+    def __init__(
+        self,
+        name: str,
+        kind: str,
+        context: SpanContext,
+        parent_id: str | None,
+        attributes: dict[str, Any] | None = None,
+    ):
+        self.name = name
+        self.kind = kind
+        self.context = context
+        self.parent_id = parent_id
+        self.attributes = attributes or {}
+        self.start_ns = time.time_ns()
+        self.end_ns: int | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        self.attributes["error"] = True
+        self.attributes["error.type"] = type(error).__name__
+        self.attributes["error.message"] = str(error)[:MAX_STATEMENT_LENGTH]
+
+    def end(self) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if self.context.sampled:
+            span_processor.enqueue(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "service": settings.TRACING_SERVICE_NAME,
+            "trace_id": self.context.trace_id,
+            "span_id": self.context.span_id,
+            "parent_span_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1_000_000,
+            "attributes": self.attributes,
+        }
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def start_span(
+    name: str,
+    kind: str = "internal",
+    attributes: dict[str, Any] | None = None,
+    parent: SpanContext | None = None,
+) -> Span:
+    """New span under the given remote parent, else under the current span, else a new trace.
+
+    A new trace is sampled with TRACING_SAMPLE_RATIO; children follow their parent's decision.
+    """
+    if parent is None:
+        active = current_span.get()
+        parent = active.context if active is not None else None
+    if parent is not None:
+        trace_id, sampled, parent_id = parent.trace_id, parent.sampled, parent.span_id
+    else:
+        trace_id = os.urandom(16).hex()
+        sampled = random.random() < settings.TRACING_SAMPLE_RATIO
+        parent_id = None
+    return Span(
+        name, kind, SpanContext(trace_id, os.urandom(8).hex(), sampled), parent_id, attributes
+    )
+
+
+@contextlib.contextmanager
+def span(
+    name: str,
+    kind: str = "internal",
+    attributes: dict[str, Any] | None = None,
+    parent: SpanContext | None = None,
+) -> Iterator[Span | None]:
+    """Run the block in a span that becomes the current one; yields None with tracing off"""
+    if not tracing_enabled():
+        yield None
+        return
+    current = start_span(name, kind, attributes, parent)
+    token = current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_error(e)
+        raise
+    finally:
+        current_span.reset(token)
+        current.end()
+
+
+def current_traceparent() -> str | None:
+    active = current_span.get()
+    return active.context.traceparent if active is not None else None
+
+
+def inject(headers: dict[str, str]) -> dict[str, str]:
+    """Add the current trace context to outgoing HTTP or Kafka headers"""
+    traceparent = current_traceparent()
+    if traceparent is not None:
+        headers[TRACEPARENT_HEADER] = traceparent
+    return headers
+
+
+def extract_kafka(headers: list[tuple[str, bytes]] | None) -> SpanContext | None:
+    for name, value in headers or ():
+        if name == TRACEPARENT_HEADER:
+            return parse_traceparent(value)
+    return None
+
+
+class SpanExporter(Protocol):
+    def export(self, spans: list[dict]) -> None: ...
+
+
+class InMemorySpanExporter:
+    """Keeps the most recent spans in process, for local runs and benchmarks"""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans: collections.deque[dict] = collections.deque(maxlen=max_spans)
+
+    def export(self, spans: list[dict]) -> None:
+        self.spans.extend(spans)
+
+    def trace(self, trace_id: str) -> list[dict]:
+        return sorted(
+            (span for span in self.spans if span["trace_id"] == trace_id),
+            key=lambda span: span["start_time_unix_nano"],
+        )
+
+
+class FileSpanExporter:
+    """Appends spans as JSON lines"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: list[dict]) -> None:
+        with open(self.path, "a", encoding="utf-8") as output:
+            output.writelines(json.dumps(span, default=str) + "\n" for span in spans)
+
+
+class BatchSpanProcessor:
+    """Queues ended spans and exports them in batches from a background task.
+
+    Ending a span only appends to a bounded queue, so request paths never wait on the
+    exporter; spans arriving while the queue is full are dropped and counted.
+    """
+
+    def __init__(self, exporter: SpanExporter | None):
+        self.exporter = exporter
+        self._queue: collections.deque[Span] = collections.deque()
+        self._running = True
+        self._stopped = asyncio.Event()
+
+    def enqueue(self, span: Span) -> None:
+        if self.exporter is None:
+            return
+        if len(self._queue) >= settings.TRACING_QUEUE_SIZE:
+            tracing_spans.inc(outcome="dropped")
+            return
+        self._queue.append(span)
+
+    async def export_pending(self) -> None:
+        while self._queue:
+            batch = [
+                self._queue.popleft().to_dict()
+                for _ in range(min(len(self._queue), settings.TRACING_EXPORT_BATCH_SIZE))
+            ]
+            try:
+                await asyncio.to_thread(self.exporter.export, batch)
+                tracing_spans.inc(len(batch), outcome="exported")
+            except Exception as e:
+                tracing_spans.inc(len(batch), outcome="failed")
+                logger.error(f"Failed to export {len(batch)} spans: {e}")
+
+    async def run(self):
+        if self.exporter is None:
+            return
+        try:
+            while self._running:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._stopped.wait(), settings.TRACING_EXPORT_INTERVAL_SECONDS
+                    )
+                await self.export_pending()
+        except asyncio.CancelledError:
+            logger.info("Span export task cancelled")
+
+    def stop(self):
+        """Export what is queued and stop"""
+        self._running = False
+        self._stopped.set()
+
+
+def _build_exporter() -> SpanExporter | None:
+    if settings.TRACING_EXPORTER == "memory":
+        return InMemorySpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        return FileSpanExporter(settings.TRACING_FILE_PATH)
+    return None
+
+
+span_processor = BatchSpanProcessor(_build_exporter())
+
+
+class TracingMiddleware:
+    """Server span per HTTP request, continuing the caller's trace from traceparent"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        parent = next(
+            (
+                parse_traceparent(value)
+                for name, value in scope["headers"]
+                if name == b"traceparent"
+            ),
+            None,
+        )
+        attributes = {"http.method": scope["method"], "http.target": scope["path"]}
+        with span(f"{scope['method']} {scope['path']}", "server", attributes, parent) as current:
+
+            async def traced_send(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    current.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= HTTP_SERVER_ERROR:
+                        current.set_attribute("error", True)
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                # FastAPI stores the matched route, name the span by its template
+                route = scope.get("route")
+                if route is not None:
+                    current.name = f"{scope['method']} {route.path}"
+                    current.set_attribute("http.route", route.path)
+
+
+def trace_engine(engine: AsyncEngine, pool_name: str) -> None:
+    """Client span per SQL statement issued under a sampled span"""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute", named=True)
+    def _before_cursor_execute(context, statement, **kw):
+        active = current_span.get()
+        if active is None or not active.context.sampled:
+            context._trace_span = None
+            return
+        context._trace_span = start_span(
+            "db.query",
+            "client",
+            {
+                "db.system": "postgresql",
+                "db.pool": pool_name,
+                "db.statement": normalize_sql(statement)[:MAX_STATEMENT_LENGTH],
+            },
+        )
+
+    @event.listens_for(sync_engine, "after_cursor_execute", named=True)
+    def _after_cursor_execute(context, **kw):
+        if context._trace_span is not None:
+            context._trace_span.end()
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        execution_context = exception_context.execution_context
+        trace_span = getattr(execution_context, "_trace_span", None)
+        if trace_span is not None:
+            trace_span.record_error(exception_context.original_exception)
+            trace_span.end()
@@ -7,14 +7,36 @@ from fastapi import Depends, FastAPI, HTTPException
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.api.routers.analytics import router as analytics_router
+from app.api.routers.health import router as health_router
 from app.api.routers.internal import router as internal_router
+from app.api.routers.profiling import router as profiling_router
 from app.api.routers.subscription import router as subscription_router
 from app.api.routers.tier import router as tier_router
+from app.core.admission import AdmissionControlMiddleware
+from app.core.drain import (
+    InFlightRequestsMiddleware,
+    drain_task,
+    in_flight_requests,
+    on_stop_signal,
+)
+from app.core.health import readiness
+from app.core.instrumentation import QueryInstrumentationMiddleware
 from app.core.kafka_client import kafka_client
+from app.core.profiling import RequestProfilingMiddleware
+from app.core.responses import FastJSONResponse
+from app.core.sharding import shard_router
+from app.core.tracing import TracingMiddleware, span_processor, tracing_enabled
 from app.models.tier import Tier
+from app.services.change_feed import change_feed
+from app.services.entitlement_snapshot import snapshot_builder
+from app.services.outbox import outbox_relay
+from app.services.subscriptions import expiry_sweeper
+from app.services.supporter_filter import supporter_filter
+from app.services.warmup import warm_up_pool
 
 from .core.config import settings
-from .core.database import async_engine, get_async_session
+from .core.database import async_engine, dispose_engines, get_async_session, read_async_engine
 
 logging.basicConfig(level=logging.INFO if settings.APP_ENV == "production" else logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -25,23 +47,93 @@ except PackageNotFoundError:
     __version__ = "0.0.0"
 
 
+async def warm_up_database():
+    """Warm the pools, retrying in the background until the database is reachable"""
+    engines = {async_engine, read_async_engine, *(shard.engine for shard in shard_router.shards)}
+    while True:
+        try:
+            for engine in engines:
+                await warm_up_pool(engine, settings.DB_POOL_WARMUP_CONNECTIONS)
+            readiness.database_warmed = True
+            logger.info("Database connection pools warmed up.")
+            return
+        except Exception as e:
+            logger.error(f"Database warm-up failed: {e}. Retrying.")
+            await asyncio.sleep(settings.DB_WARMUP_RETRY_SECONDS)
+
+
+def begin_drain() -> None:
+    """Stop taking new work: readiness fails, the consumer stops polling and the background
+    workers, open change streams included, finish their current batch.
+
+    Runs on the server's stop signal, before the server waits for open connections, and again at
+    the lifespan shutdown in case no signal was hooked.
+    """
+    if readiness.draining:
+        return
+    readiness.draining = True
+    app.state.drain_deadline = asyncio.get_running_loop().time() + (
+        settings.SHUTDOWN_DRAIN_TIMEOUT_SECONDS
+    )
+    logger.info("Draining...")
+    kafka_client.close_consumer()
+    change_feed.stop()
+    expiry_sweeper.stop()
+    outbox_relay.stop()
+    snapshot_builder.stop()
+    supporter_filter.stop()
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     logger.info("Application startup...")
-    # You can add startup logic here, like checking DB connection
+    warm_up_task = asyncio.create_task(warm_up_database())
     try:
-        async with async_engine.connect():
-            logger.info("Database connection successful during startup.")
-    except Exception as e:
-        logger.error(f"Database connection failed during startup: {e}")
-    asyncio.create_task(kafka_client.consume_messages())
-    yield
+        await asyncio.wait_for(asyncio.shield(warm_up_task), timeout=settings.DB_WARMUP_TIMEOUT)
+    except TimeoutError:
+        logger.warning("Database warm-up still running, the app stays unready until it finishes.")
+    # Keep a reference so the task is not garbage collected while it runs
+    app.state.consumer_task = asyncio.create_task(kafka_client.consume_messages())
+    app.state.outbox_task = asyncio.create_task(outbox_relay.run())
+    app.state.expiry_task = asyncio.create_task(expiry_sweeper.run())
+    app.state.change_feed_task = asyncio.create_task(change_feed.run())
+    app.state.snapshot_task = asyncio.create_task(snapshot_builder.run())
+    app.state.supporter_filter_task = asyncio.create_task(supporter_filter.run())
+    app.state.span_export_task = asyncio.create_task(span_processor.run())
+    with on_stop_signal(begin_drain):
+        yield
 
     logger.info("Application shutdown...")
-    await async_engine.dispose()
-    logger.info("Database engine disposed.")
-    kafka_client.close_consumer()
-    logger.info("Kafka Consumer disposed.")
+    begin_drain()
+    loop = asyncio.get_running_loop()
+    deadline = app.state.drain_deadline
+    warm_up_task.cancel()
+
+    # The message in flight finishes, commits its offset and the consumer flushes failed commits
+    # and leaves the group while the database is still available
+    await drain_task(app.state.consumer_task, "Kafka consumer", deadline - loop.time())
+    logger.info("Kafka consumer drained.")
+
+    background_tasks = {
+        "Change feed": app.state.change_feed_task,
+        "Expiry sweeper": app.state.expiry_task,
+        "Outbox relay": app.state.outbox_task,
+        "Snapshot builder": app.state.snapshot_task,
+        "Supporter filter": app.state.supporter_filter_task,
+    }
+    await asyncio.gather(
+        *(drain_task(task, name, deadline - loop.time()) for name, task in background_tasks.items())
+    )
+    logger.info("Background tasks stopped.")
+
+    # uvicorn has already waited for its connections, this covers servers that do not
+    if not await in_flight_requests.wait_idle(deadline - loop.time()):
+        logger.warning(f"{in_flight_requests.count} HTTP requests still running at shutdown")
+    await dispose_engines()
+    logger.info("Database engines disposed.")
+    # Last, so the spans of everything drained above are exported
+    span_processor.stop()
+    await drain_task(app.state.span_export_task, "Span exporter", max(deadline - loop.time(), 1.0))
 
 
 app = FastAPI(
@@ -49,15 +141,33 @@ app = FastAPI(
     description="Handles user profiles.",
     version=__version__,
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
+if settings.PROFILING_TOKEN:
+    app.add_middleware(RequestProfilingMiddleware)
+app.add_middleware(QueryInstrumentationMiddleware)
+# Added last so it runs first and shed requests do no other work
+app.add_middleware(AdmissionControlMiddleware)
+if tracing_enabled():
+    # Outside admission control, so shed requests are traced too
+    app.add_middleware(TracingMiddleware)
+# Outermost, so shutdown waits for every request before the pools are disposed
+app.add_middleware(InFlightRequestsMiddleware)
+
 
 app.include_router(tier_router, prefix="/tier", tags=["Tier"])
 
 app.include_router(subscription_router, prefix="/subscriptions", tags=["Subscriptions"])
 
+app.include_router(analytics_router, prefix="/analytics", tags=["Analytics"])
+
 app.include_router(internal_router, prefix="/internal", tags=["Internal"])
 
+app.include_router(profiling_router, prefix="/internal/profiling", tags=["Internal"])
+
+app.include_router(health_router, prefix="/health", tags=["Health"])
+
 
 @app.get("/test-db/", summary="Test Database Connection", tags=["Test"])
 async def test_db_connection(session: AsyncSession = Depends(get_async_session)):
@@ -0,0 +1,40 @@
+import datetime
+import uuid
+
+from sqlalchemy import BigInteger, Column, Date, DateTime, Numeric, func
+from sqlmodel import Field, SQLModel
+
+
+class CreatorTierStats(SQLModel, table=True):
+    """Running count of active supporters per tier, updated with every state change"""
+
+    __tablename__ = "creator_tier_stats"
+    tier_id: uuid.UUID = Field(primary_key=True, foreign_key="tier.id", ondelete="CASCADE")
+    creator_id: uuid.UUID = Field(index=True, nullable=False)
+    currency: str = Field(max_length=3, nullable=False)
+    active_supporters: int = Field(default=0, nullable=False)
+    updated_at: datetime.datetime | None = Field(
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+        )
+    )
+
+
+class CreatorRevenueDaily(SQLModel, table=True):
+    """Per tier and UTC day: end-of-day supporters and MRR, plus the day's changes.
+
+    Days without changes have no row; their values carry over from the previous row.
+    payments_amount is in minor currency units, as sent by the payment service.
+    """
+
+    __tablename__ = "creator_revenue_daily"
+    creator_id: uuid.UUID = Field(primary_key=True)
+    day: datetime.date = Field(sa_column=Column(Date, primary_key=True))
+    tier_id: uuid.UUID = Field(primary_key=True)
+    currency: str = Field(max_length=3, nullable=False)
+    active_supporters: int = Field(default=0, nullable=False)
+    mrr: float = Field(default=0, sa_column=Column(Numeric(14, 2), nullable=False))
+    activations: int = Field(default=0, nullable=False)
+    churned: int = Field(default=0, nullable=False)
+    payments: int = Field(default=0, nullable=False)
+    payments_amount: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
@@ -0,0 +1,42 @@
+import datetime
+import uuid
+
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Index, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlmodel import Field, SQLModel
+
+
+class OutboxEvent(SQLModel, table=True):
+    """Subscription lifecycle event written in the same transaction as the state change"""
+
+    __tablename__ = "subscription_outbox"
+    __table_args__ = (
+        Index(
+            "ix_subscription_outbox_unpublished",
+            "id",
+            postgresql_where=text("published_at IS NULL"),
+        ),
+        Index("ix_subscription_outbox_txid_id", "txid", "id"),
+    )
+    id: int | None = Field(
+        default=None, sa_column=Column(BigInteger, Identity(always=True), primary_key=True)
+    )
+    event_type: str = Field(max_length=64, nullable=False)
+    subscription_id: uuid.UUID = Field(nullable=False)
+    key: str = Field(max_length=64, nullable=False)
+    payload: dict = Field(sa_column=Column(JSONB, nullable=False))
+    created_at: datetime.datetime | None = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    )
+    # Id of the writing transaction. Ids are assigned at insert, not at commit, so a lower id can
+    # commit later; rows below the oldest running transaction id can no longer appear
+    txid: int | None = Field(
+        sa_column=Column(
+            BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint")
+        ),
+    )
+    # W3C trace context of the transaction that staged the event, forwarded as a Kafka header
+    traceparent: str | None = Field(default=None, max_length=55, nullable=True)
+    published_at: datetime.datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True), nullable=True)
+    )
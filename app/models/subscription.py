@@ -27,7 +27,9 @@ class Subscription(SubscriptionBase, table=True):
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
     )
     expires_at: datetime.datetime | None = Field(
-        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+        sa_column=Column(
+            DateTime(timezone=True), nullable=False, server_default=func.now(), index=True
+        )
     )
     created_at: datetime.datetime | None = Field(
         sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
@@ -37,3 +39,25 @@ class Subscription(SubscriptionBase, table=True):
             DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
         )
     )
+
+
+class SubscriptionHistory(SubscriptionBase, table=True):
+    """Lapsed subscriptions moved out of the hot table, range-partitioned by expiry"""
+
+    __tablename__ = "subscription_history"
+    __table_args__ = {"postgresql_partition_by": "RANGE (expires_at)"}
+    id: uuid.UUID = Field(primary_key=True)
+    supporter_id: uuid.UUID = Field(index=True, nullable=False)
+    tier_id: uuid.UUID = Field(index=True, nullable=False)
+    status: str = Field(
+        sa_column=Column(Enum(SubscriptionStatus, name="subscriptionstatus", create_type=False))
+    )
+    started_at: datetime.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    expires_at: datetime.datetime = Field(
+        sa_column=Column(DateTime(timezone=True), primary_key=True, nullable=False)
+    )
+    created_at: datetime.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    updated_at: datetime.datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    archived_at: datetime.datetime | None = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    )
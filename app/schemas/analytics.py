@@ -0,0 +1,28 @@
+import uuid
+from datetime import date
+from decimal import Decimal
+
+from sqlmodel import SQLModel
+
+
+class TierRevenue(SQLModel):
+    tier_id: uuid.UUID
+    currency: str
+    active_supporters: int
+    mrr: Decimal
+
+
+class TierRevenueDay(TierRevenue):
+    day: date
+    activations: int
+    churned: int
+    payments: int
+    payments_amount: int
+
+
+class CreatorAnalytics(SQLModel):
+    creator_id: uuid.UUID
+    start: date
+    end: date
+    tiers: list[TierRevenue]
+    daily: list[TierRevenueDay]
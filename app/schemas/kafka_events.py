@@ -25,3 +25,25 @@ class PaymentFailedEvent(SQLModel):
     failed_at: datetime
     reason: str | None = None
     stripe_checkout_session_id: str
+
+
+class SubscriptionEvent(SQLModel):
+    subscription_id: uuid.UUID
+    supporter_id: uuid.UUID
+    creator_id: uuid.UUID
+    tier_id: uuid.UUID
+    status: str
+    expires_at: datetime
+    occurred_at: datetime
+
+
+class SubscriptionActivatedEvent(SubscriptionEvent):
+    event_type: Literal["subscription.activated"] = "subscription.activated"
+
+
+class SubscriptionExpiredEvent(SubscriptionEvent):
+    event_type: Literal["subscription.expired"] = "subscription.expired"
+
+
+class SubscriptionCancelledEvent(SubscriptionEvent):
+    event_type: Literal["subscription.cancelled"] = "subscription.cancelled"
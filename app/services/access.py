@@ -0,0 +1,62 @@
+import datetime
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.sharding import shard_router
+from app.core.single_flight import SingleFlight
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+from app.services.entitlement_snapshot import entitlement_snapshot, snapshot_lookups
+from app.services.supporter_filter import supporter_filter
+
+
+def active_access_statement(supporter_id: uuid.UUID, creator_id: uuid.UUID):
+    """Statement selecting 1 when the supporter has an active subscription to the creator"""
+    return (
+        select(1)
+        .select_from(Subscription)
+        .join(Tier, Subscription.tier_id == Tier.id)
+        .where(
+            (Subscription.supporter_id == supporter_id)
+            & (Tier.creator_id == creator_id)
+            & (Subscription.status == SubscriptionStatus.ACTIVE)
+            & (Subscription.expires_at > datetime.datetime.now(datetime.UTC))
+        )
+    )
+
+
+async def has_active_access(
+    session: AsyncSession, supporter_id: uuid.UUID, creator_id: uuid.UUID
+) -> bool:
+    result = await session.execute(active_access_statement(supporter_id, creator_id))
+    return bool(result.scalar())
+
+
+access_lookups = SingleFlight(
+    "check_access",
+    max_wait=settings.SINGLE_FLIGHT_MAX_WAIT_SECONDS,
+    cache_ttl=settings.ACCESS_CACHE_TTL_SECONDS,
+    cache_size=settings.SINGLE_FLIGHT_CACHE_SIZE,
+)
+
+
+async def _lookup_access(supporter_id: uuid.UUID, creator_id: uuid.UUID) -> bool:
+    async with shard_router.shard_for(supporter_id).read_session_factory() as session:
+        return await has_active_access(session, supporter_id, creator_id)
+
+
+async def check_access(supporter_id: uuid.UUID, creator_id: uuid.UUID) -> bool:
+    """Access check answered, cheapest first, by the supporter filter for supporters without
+    any active subscription, by the node's entitlement snapshot when a fresh one is mapped, or
+    by one database lookup shared by all concurrent callers asking about the same pair"""
+    if not supporter_filter.might_have_access(supporter_id):
+        return False
+    if entitlement_snapshot.refresh():
+        return entitlement_snapshot.has_access(supporter_id, creator_id)
+    snapshot_lookups.inc(source="fallback")
+    return await access_lookups.do(
+        (supporter_id, creator_id), lambda: _lookup_access(supporter_id, creator_id)
+    )
@@ -0,0 +1,96 @@
+import datetime
+import logging
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.subscription import Subscription, SubscriptionHistory, SubscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_COLUMNS = (
+    "id",
+    "supporter_id",
+    "tier_id",
+    "status",
+    "started_at",
+    "expires_at",
+    "created_at",
+    "updated_at",
+)
+
+
+def _archivable(cutoff: datetime.datetime):
+    """Rows that are neither live nor touched since the cutoff.
+
+    ACTIVE rows are left to the expiry sweeper even when lapsed, so their expired event is
+    emitted before they move to history.
+    """
+    return (
+        Subscription.status.is_distinct_from(SubscriptionStatus.PENDING),
+        Subscription.status.is_distinct_from(SubscriptionStatus.ACTIVE),
+        Subscription.expires_at < cutoff,
+        Subscription.updated_at < cutoff,
+    )
+
+
+async def ensure_history_partitions(session: AsyncSession, cutoff: datetime.datetime) -> None:
+    """Create yearly history partitions for every year the next archival run can touch.
+
+    Partitions must exist before rows land in them, otherwise they fall into the
+    default partition and the range partition can no longer be attached.
+    """
+    oldest = await session.scalar(
+        select(func.min(Subscription.expires_at)).where(*_archivable(cutoff))
+    )
+    if oldest is None:
+        return
+    for year in range(oldest.year, cutoff.year + 1):
+        await session.execute(
+            text(
+                f"CREATE TABLE IF NOT EXISTS subscription_history_y{year} "
+                f"PARTITION OF subscription_history "
+                f"FOR VALUES FROM ('{year}-01-01 00:00:00+00') TO ('{year + 1}-01-01 00:00:00+00')"
+            )
+        )
+    await session.commit()
+
+
+async def archive_batch(session: AsyncSession, cutoff: datetime.datetime, batch_size: int) -> int:
+    """Move one batch of lapsed subscriptions to history in a single statement"""
+    candidates = (
+        select(Subscription.id)
+        .where(*_archivable(cutoff))
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(Subscription)
+        .where(Subscription.id.in_(candidates))
+        .returning(*(getattr(Subscription, column) for column in ARCHIVED_COLUMNS))
+        .cte("moved")
+    )
+    statement = insert(SubscriptionHistory).from_select(
+        ARCHIVED_COLUMNS, select(*(moved.c[column] for column in ARCHIVED_COLUMNS))
+    )
+    result = await session.execute(statement)
+    await session.commit()
+    return result.rowcount
+
+
+async def archive_lapsed_subscriptions(
+    session: AsyncSession, retention_days: int, batch_size: int
+) -> int:
+    """Move every subscription lapsed for longer than the retention window, batch by batch"""
+    cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=retention_days)
+    logger.info(f"Archiving subscriptions lapsed before {cutoff.isoformat()}")
+    await ensure_history_partitions(session, cutoff)
+
+    total = 0
+    while True:
+        moved = await archive_batch(session, cutoff, batch_size)
+        total += moved
+        logger.info(f"Archived batch of {moved} subscriptions ({total} total)")
+        if moved < batch_size:
+            break
+    return total
@@ -0,0 +1,310 @@
+import csv
+import dataclasses
+import datetime
+import json
+import logging
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from typing import IO, Any
+
+import asyncpg
+
+from app.models.subscription import SubscriptionStatus
+from app.services.change_feed import CHANGE_FEED_CHANNEL, REBUILD_NOTIFICATION
+
+logger = logging.getLogger(__name__)
+
+
+def _uuid(value: str) -> uuid.UUID:
+    return uuid.UUID(str(value))
+
+
+def _timestamp(value: str) -> datetime.datetime:
+    parsed = datetime.datetime.fromisoformat(str(value))
+    if parsed.tzinfo is None:
+        raise ValueError(f"timestamp without time zone: {value}")
+    return parsed
+
+
+def _status(value: str) -> str:
+    # Postgres stores the enum member names
+    return SubscriptionStatus(str(value).lower()).name
+
+
+def _price(value: str) -> float:
+    price = float(value)
+    if price < 0:
+        raise ValueError(f"negative price: {value}")
+    return price
+
+
+def _bounded_text(max_length: int) -> Callable[[str], str]:
+    def parse(value: str) -> str:
+        text = str(value)
+        if not text or len(text) > max_length:
+            raise ValueError(f"expected 1 to {max_length} characters")
+        return text
+
+    return parse
+
+
+@dataclasses.dataclass(frozen=True)
+class ImportKind:
+    """Staging layout and merge statement for one target table"""
+
+    table: str
+    staging_ddl: str
+    # (column, parser, required); optional columns are NULL when missing or empty
+    fields: tuple[tuple[str, Callable[[Any], Any], bool], ...]
+    # Rows that fail validation against existing data: (line_no, reason)
+    reject_sql: str
+    merge_sql: str
+    # Run on the staged rows before validation, e.g. to look up the rows they update
+    resolve_sql: str | None = None
+    # Run after the merge in the same transaction, so listeners hear of it on commit
+    notify_sql: str | None = None
+
+    @property
+    def columns(self) -> list[str]:
+        return ["line_no", *(name for name, _, _ in self.fields)]
+
+
+TIERS = ImportKind(
+    table="tier",
+    staging_ddl="""
+        CREATE TEMP TABLE import_staging (
+            line_no bigint, id uuid, creator_id uuid, name text, description text,
+            price double precision, currency text
+        ) ON COMMIT DROP
+    """,
+    fields=(
+        ("id", _uuid, True),
+        ("creator_id", _uuid, True),
+        ("name", _bounded_text(100), True),
+        ("description", str, False),
+        ("price", _price, True),
+        ("currency", _bounded_text(3), False),
+    ),
+    reject_sql="""
+        SELECT line_no, 'duplicate id in file' FROM (
+            SELECT line_no, row_number() OVER (PARTITION BY id ORDER BY line_no DESC) AS n
+            FROM import_staging
+        ) ranked WHERE n > 1
+    """,
+    merge_sql="""
+        INSERT INTO tier (id, creator_id, name, description, price, currency)
+        SELECT id, creator_id, name, description, price, lower(coalesce(currency, 'usd'))
+        FROM import_staging
+        ON CONFLICT (id) DO UPDATE SET
+            creator_id = EXCLUDED.creator_id,
+            name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            currency = EXCLUDED.currency,
+            updated_at = now()
+    """,
+)
+
+SUBSCRIPTIONS = ImportKind(
+    table="subscription",
+    staging_ddl="""
+        CREATE TEMP TABLE import_staging (
+            line_no bigint, id uuid, supporter_id uuid, tier_id uuid, status text,
+            started_at timestamptz, expires_at timestamptz, resolved_id uuid
+        ) ON COMMIT DROP
+    """,
+    fields=(
+        ("id", _uuid, False),
+        ("supporter_id", _uuid, True),
+        ("tier_id", _uuid, True),
+        ("status", _status, True),
+        ("started_at", _timestamp, True),
+        ("expires_at", _timestamp, True),
+    ),
+    # Rows without an id update the supporter's existing subscription to the tier, if any
+    resolve_sql="""
+        UPDATE import_staging s SET resolved_id = (
+            SELECT e.id FROM subscription e
+            WHERE e.supporter_id = s.supporter_id AND e.tier_id = s.tier_id
+            ORDER BY e.expires_at DESC
+            LIMIT 1
+        )
+        WHERE s.id IS NULL
+    """,
+    # Rows resolving to the same subscription, by id or by (supporter_id, tier_id), would make
+    # the upsert update a row twice; the last one in the file wins
+    reject_sql="""
+        SELECT s.line_no, 'unknown tier_id' FROM import_staging s
+        WHERE NOT EXISTS (SELECT 1 FROM tier t WHERE t.id = s.tier_id)
+        UNION ALL
+        SELECT line_no, 'expires_at before started_at' FROM import_staging
+        WHERE expires_at < started_at
+        UNION ALL
+        SELECT line_no, 'duplicate subscription in file' FROM (
+            SELECT line_no, row_number() OVER (
+                PARTITION BY coalesce(
+                    coalesce(id, resolved_id)::text, supporter_id::text || tier_id::text
+                )
+                ORDER BY line_no DESC
+            ) AS n
+            FROM import_staging
+        ) ranked WHERE n > 1
+    """,
+    merge_sql="""
+        INSERT INTO subscription (id, supporter_id, tier_id, status, started_at, expires_at)
+        SELECT coalesce(s.id, s.resolved_id, gen_random_uuid()), s.supporter_id, s.tier_id,
+               s.status::subscriptionstatus, s.started_at, s.expires_at
+        FROM import_staging s
+        ON CONFLICT (id) DO UPDATE SET
+            supporter_id = EXCLUDED.supporter_id,
+            tier_id = EXCLUDED.tier_id,
+            status = EXCLUDED.status,
+            started_at = EXCLUDED.started_at,
+            expires_at = EXCLUDED.expires_at,
+            updated_at = now()
+    """,
+    # Imported rows bypass the outbox and its NOTIFY, so every instance rebuilds its supporter
+    # filter and entitlement snapshot instead of answering from them without the import
+    notify_sql=f"""
+        SELECT pg_notify('{CHANGE_FEED_CHANNEL}', '{json.dumps(REBUILD_NOTIFICATION)}')
+        WHERE EXISTS (SELECT 1 FROM import_staging)
+    """,
+)
+
+IMPORT_KINDS = {"tiers": TIERS, "subscriptions": SUBSCRIPTIONS}
+
+
+@dataclasses.dataclass
+class ImportReport:
+    parsed: int = 0
+    staged: int = 0
+    rejected: int = 0
+    merged: int = 0
+
+
+class RejectWriter:
+    """Collects rejected rows as CSV (line, reason, raw input) for the operator to fix"""
+
+    def __init__(self, output: IO[str] | None):
+        self._writer = csv.writer(output) if output else None
+        if self._writer:
+            self._writer.writerow(["line", "reason", "row"])
+        self.count = 0
+
+    def reject(self, line_no: int, reason: str, raw: Any = "") -> None:
+        self.count += 1
+        if self._writer:
+            self._writer.writerow([line_no, reason, raw])
+
+
+def read_rows(source: IO[str], format: str) -> Iterator[tuple[int, dict | None, str]]:
+    """Yield (line number, fields, raw text) per input row; fields is None if unreadable"""
+    if format == "csv":
+        reader = csv.DictReader(source)
+        for row in reader:
+            yield reader.line_num, row, ",".join(str(value) for value in row.values())
+        return
+    for line_no, line in enumerate(source, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            yield line_no, None, line.rstrip("\n")
+            continue
+        yield line_no, row if isinstance(row, dict) else None, line.rstrip("\n")
+
+
+def parse_record(kind: ImportKind, line_no: int, row: dict) -> tuple:
+    record = [line_no]
+    for name, parse, required in kind.fields:
+        value = row.get(name)
+        if value is None or value == "":
+            if required:
+                raise ValueError(f"missing {name}")
+            record.append(None)
+            continue
+        try:
+            record.append(parse(value))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"invalid {name}: {e}") from e
+    return tuple(record)
+
+
+async def import_rows(
+    connection: asyncpg.Connection,
+    kind: ImportKind,
+    rows: Iterator[tuple[int, dict | None, str]],
+    rejects: RejectWriter,
+    batch_size: int,
+) -> ImportReport:
+    """Stage rows with COPY, reject invalid ones in bulk, then merge with one upsert.
+
+    Everything runs in one transaction: the staging table is dropped on commit and a
+    failure leaves the target table untouched.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    async with connection.transaction():
+        await connection.execute(kind.staging_ddl)
+
+        batch: list[tuple] = []
+        for line_no, row, raw in rows:
+            report.parsed += 1
+            if row is None:
+                rejects.reject(line_no, "unreadable row", raw)
+                continue
+            try:
+                batch.append(parse_record(kind, line_no, row))
+            except ValueError as e:
+                rejects.reject(line_no, str(e), raw)
+                continue
+            if len(batch) >= batch_size:
+                await connection.copy_records_to_table(
+                    "import_staging", records=batch, columns=kind.columns
+                )
+                report.staged += len(batch)
+                batch = []
+                elapsed = time.perf_counter() - started
+                logger.info(
+                    f"Staged {report.staged} rows ({report.staged / elapsed:.0f} rows/s), "
+                    f"{rejects.count} rejected"
+                )
+        if batch:
+            await connection.copy_records_to_table(
+                "import_staging", records=batch, columns=kind.columns
+            )
+            report.staged += len(batch)
+
+        await connection.execute("ANALYZE import_staging")
+        if kind.resolve_sql:
+            await connection.execute(kind.resolve_sql)
+        invalid = await connection.fetch(
+            f"""
+            WITH rejected (line_no, reason) AS ({kind.reject_sql})
+            SELECT r.line_no, r.reason, row_to_json(s)::text
+            FROM rejected r JOIN import_staging s USING (line_no)
+            ORDER BY r.line_no
+            """
+        )
+        if invalid:
+            for line_no, reason, staged_row in invalid:
+                rejects.reject(line_no, reason, staged_row)
+            await connection.execute(
+                "DELETE FROM import_staging WHERE line_no = any($1::bigint[])",
+                [line_no for line_no, _, _ in invalid],
+            )
+        logger.info(f"Validated staged rows: {len(invalid)} rejected against existing data")
+
+        status = await connection.execute(kind.merge_sql)
+        report.merged = int(status.split()[-1])
+        if kind.notify_sql:
+            await connection.execute(kind.notify_sql)
+
+    report.rejected = rejects.count
+    logger.info(
+        f"Merged {report.merged} rows into {kind.table} in "
+        f"{time.perf_counter() - started:.1f}s ({report.rejected} rejected)"
+    )
+    return report
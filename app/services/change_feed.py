@@ -0,0 +1,362 @@
+import asyncio
+import collections
+import contextlib
+import functools
+import json
+import logging
+import uuid
+from asyncio import FIRST_COMPLETED
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import asyncpg
+from sqlalchemy import BigInteger, literal, literal_column, select, tuple_
+
+from app.core.config import settings
+from app.core.database import AsyncSessionFactory
+from app.core.metrics import registry
+from app.core.sharding import Shard, shard_router
+from app.models.outbox import OutboxEvent
+from app.models.subscription import SubscriptionStatus
+from app.services.access import access_lookups
+from app.services.entitlement_snapshot import entitlement_snapshot, snapshot_builder
+from app.services.supporter_filter import supporter_filter
+
+logger = logging.getLogger(__name__)
+
+CHANGE_FEED_CHANNEL = "subscription_changes"
+CHANGE_FIELDS = ("supporter_id", "creator_id", "expires_at", "status")
+# Sent on the channel after a bulk change that bypassed the outbox, e.g. an import
+REBUILD_NOTIFICATION = {"rebuild": "supporter_filter"}
+# Enough to dedupe the consumer path against the NOTIFY echo of the same commit
+RECENT_IDS = 4096
+
+change_feed_events = registry.counter(
+    "change_feed_events", "Entitlement changes received by the change feed", ["source"]
+)
+change_feed_dropped = registry.counter(
+    "change_feed_dropped_subscribers", "Change feed streams closed because they fell behind"
+)
+
+
+def entitlement_change(event_id: int, payload: dict) -> dict:
+    """Project an outbox payload to the fields change feed subscribers cache"""
+    return {"cursor": event_id, **{field: payload[field] for field in CHANGE_FIELDS}}
+
+
+# Position of an outbox row in the stream order: (txid, id)
+Position = tuple[int, int]
+
+# Transactions below the oldest running one have all ended, so no outbox row can still commit
+# under it. Comparing with it keeps rows of running transactions back until they end.
+TXID_WATERMARK = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+class FeedSubscription:
+    """Bounded queue of live (position, change) pairs for one stream; the position is None
+    with sharded storage"""
+
+    def __init__(self):
+        self.queue: asyncio.Queue[tuple[Position | None, dict]] = asyncio.Queue(
+            settings.CHANGE_FEED_QUEUE_SIZE
+        )
+        self.closed = asyncio.Event()
+
+    async def next_change(self, timeout: float) -> tuple[Position | None, dict] | None:
+        """Next queued change, None when the timeout passed or the stream was closed first"""
+        if not self.queue.empty():
+            return self.queue.get_nowait()
+        getter = asyncio.ensure_future(self.queue.get())
+        closed = asyncio.ensure_future(self.closed.wait())
+        try:
+            await asyncio.wait({getter, closed}, timeout=timeout, return_when=FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            if not getter.done():
+                getter.cancel()
+        return getter.result() if getter.done() and not getter.cancelled() else None
+
+
+class ChangeFeedHub:
+    """Fans committed entitlement changes out to in-process stream subscribers.
+
+    Changes arrive from two sources: the consumer path publishes right after its commit, and a
+    LISTEN connection receives the NOTIFY the outbox trigger sends for every committed row,
+    which also covers expiries and changes committed by other instances. Both drop cached
+    access decisions right away.
+
+    Streams get rows in (txid, id) order instead. Outbox ids are assigned at insert, so a
+    lower id can commit after a higher one has been streamed, and a client resuming from the
+    higher id would never see it. While streams are open, a follower reads the outbox after
+    its position, woken by notifications and every CHANGE_FEED_POLL_SECONDS, and only up to
+    the oldest running transaction, so no row can later commit below a position already
+    streamed. A stream that falls behind is closed and the client resumes from its last
+    cursor. With sharded storage every shard has its own listener and outbox ids, so
+    notifications are streamed as they come, deduplicated per shard, and streams cannot be
+    resumed by cursor.
+    """
+
+    def __init__(self):
+        self._running = True
+        self._subscribers: set[FeedSubscription] = set()
+        self._recent_ids: collections.deque[tuple[str, int]] = collections.deque(maxlen=RECENT_IDS)
+        self._recent_set: set[tuple[str, int]] = set()
+        self._stopped = asyncio.Event()
+        # Last position handed to the streams, None while no stream is open
+        self._position: Position | None = None
+        self._position_lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        registry.gauge(
+            "change_feed_subscribers",
+            "Open change feed streams",
+            callback=lambda: [((), len(self._subscribers))],
+        )
+
+    def publish(self, event_id: int, payload: dict, shard: str, source: str = "local") -> None:
+        """Handle one committed change, once per shard and outbox id.
+
+        Drops the cached access decision of the pair, so the next check reads it again, adds
+        activated supporters to the supporter filter and records the pair's grant in the node's
+        entitlement snapshot. Then wakes the follower, or with sharded storage delivers the
+        change to every stream.
+        """
+        recent_id = (shard, event_id)
+        if recent_id in self._recent_set:
+            return
+        if len(self._recent_ids) == self._recent_ids.maxlen:
+            self._recent_set.discard(self._recent_ids[0])
+        self._recent_ids.append(recent_id)
+        self._recent_set.add(recent_id)
+        change_feed_events.inc(source=source)
+        supporter_id = uuid.UUID(payload["supporter_id"])
+        creator_id = uuid.UUID(payload["creator_id"])
+        access_lookups.invalidate((supporter_id, creator_id))
+        if payload["status"] == SubscriptionStatus.ACTIVE.value:
+            supporter_filter.add(supporter_id)
+        # The supporter may hold other tiers of the creator, so the grant is read back
+        entitlement_snapshot.record_change(shard_router.get(shard), supporter_id, creator_id)
+
+        if shard_router.sharded:
+            self._fan_out(None, entitlement_change(event_id, payload))
+        else:
+            self._wake.set()
+
+    def _fan_out(self, position: Position | None, change: dict) -> None:
+        for subscriber in list(self._subscribers):
+            try:
+                subscriber.queue.put_nowait((position, change))
+            except asyncio.QueueFull:
+                change_feed_dropped.inc()
+                self._close(subscriber)
+
+    def publish_event(self, event: OutboxEvent) -> None:
+        """Publish an outbox row the caller has just committed on the supporter's shard"""
+        shard = shard_router.shard_for(uuid.UUID(event.payload["supporter_id"]))
+        self.publish(event.id, event.payload, shard.name)
+
+    def _close(self, subscriber: FeedSubscription) -> None:
+        self._subscribers.discard(subscriber)
+        subscriber.closed.set()
+
+    def _close_all(self) -> None:
+        for subscriber in list(self._subscribers):
+            self._close(subscriber)
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[FeedSubscription]:
+        """Open a live subscription. The follower starts from the current end of the outbox
+        when the first stream opens, so everything before it is in that stream's backlog."""
+        subscriber = FeedSubscription()
+        if not shard_router.sharded:
+            async with self._position_lock:
+                if self._position is None:
+                    self._position = await _end_position()
+        self._subscribers.add(subscriber)
+        try:
+            yield subscriber
+        finally:
+            self._subscribers.discard(subscriber)
+            if not self._subscribers:
+                self._position = None
+
+    async def _follow_once(self) -> None:
+        while self._position is not None and self._subscribers:
+            changes = await changes_after(self._position, settings.CHANGE_FEED_CATCH_UP_BATCH_SIZE)
+            for position, change in changes:
+                self._fan_out(position, change)
+            if changes and self._position is not None:
+                self._position = changes[-1][0]
+            if len(changes) < settings.CHANGE_FEED_CATCH_UP_BATCH_SIZE:
+                return
+
+    async def _follow(self) -> None:
+        """Stream committed outbox rows in (txid, id) order while streams are open"""
+        while self._running:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), settings.CHANGE_FEED_POLL_SECONDS)
+            self._wake.clear()
+            try:
+                await self._follow_once()
+            except Exception as e:
+                logger.error(f"Change feed follower failed: {e}")
+                await asyncio.sleep(settings.CHANGE_FEED_RECONNECT_SECONDS)
+
+    def _on_notification(
+        self, shard: str, connection, pid: int, channel: str, payload: str
+    ) -> None:
+        try:
+            notification = json.loads(payload)
+            if notification == REBUILD_NOTIFICATION:
+                # Changes the filter and the snapshot never saw: stop trusting both until a new
+                # build
+                logger.info(f"Supporter filter and snapshot rebuild requested through {shard}")
+                supporter_filter.invalidate()
+                supporter_filter.request_rebuild()
+                snapshot_builder.invalidate()
+                return
+            self.publish(notification["id"], notification["payload"], shard, source="notify")
+        except (json.JSONDecodeError, KeyError) as e:
+            logger.error(f"Invalid change notification {payload!r}: {e}")
+
+    async def _listen_once(self, shard: Shard) -> None:
+        connection = await asyncpg.connect(shard.dsn)
+        lost = asyncio.Event()
+        connection.add_termination_listener(lambda _: lost.set())
+        try:
+            await connection.add_listener(
+                CHANGE_FEED_CHANNEL, functools.partial(self._on_notification, shard.name)
+            )
+            logger.info(f"Listening for changes on channel '{CHANGE_FEED_CHANNEL}' of {shard.name}")
+            # Activations committed while disconnected are only visible to a new build
+            supporter_filter.request_rebuild()
+            stopped = asyncio.create_task(self._stopped.wait())
+            lost_task = asyncio.create_task(lost.wait())
+            try:
+                await asyncio.wait({stopped, lost_task}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stopped.cancel()
+                lost_task.cancel()
+        finally:
+            if not connection.is_closed():
+                await connection.close()
+
+    async def _listen(self, shard: Shard) -> None:
+        while self._running:
+            try:
+                await self._listen_once(shard)
+            except Exception as e:
+                logger.error(f"Change feed listener of {shard.name} failed: {e}")
+            if shard_router.sharded:
+                # Notifications sent while disconnected are lost, streams must reconnect
+                self._close_all()
+            supporter_filter.invalidate()
+            if self._running:
+                await asyncio.sleep(settings.CHANGE_FEED_RECONNECT_SECONDS)
+
+    async def run(self):
+        """Keep a LISTEN connection open to every shard until stopped, reconnecting when one
+        drops"""
+        tasks = [self._listen(shard) for shard in shard_router.shards]
+        if not shard_router.sharded:
+            tasks.append(self._follow())
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            logger.info("Change feed listener task cancelled")
+        finally:
+            self._close_all()
+
+    def stop(self):
+        """Signal the listener to stop and close open streams"""
+        self._running = False
+        self._stopped.set()
+        self._wake.set()
+        self._close_all()
+
+
+def _changes_statement(after: Position, limit: int):
+    return (
+        select(OutboxEvent.txid, OutboxEvent.id, OutboxEvent.payload)
+        .where(
+            tuple_(OutboxEvent.txid, OutboxEvent.id)
+            > tuple_(*(literal(value, BigInteger) for value in after))
+        )
+        .where(OutboxEvent.txid < TXID_WATERMARK)
+        .order_by(OutboxEvent.txid, OutboxEvent.id)
+        .limit(limit)
+    )
+
+
+async def changes_after(after: Position, limit: int) -> list[tuple[Position, dict]]:
+    """Committed changes after the position, in (txid, id) order, up to the oldest running
+    transaction"""
+    async with AsyncSessionFactory() as session:
+        result = await session.execute(_changes_statement(after, limit))
+        return [
+            ((txid, event_id), entitlement_change(event_id, payload))
+            for txid, event_id, payload in result.all()
+        ]
+
+
+async def _end_position() -> Position:
+    """Position of the last row streams can be given now"""
+    statement = (
+        select(OutboxEvent.txid, OutboxEvent.id)
+        .where(OutboxEvent.txid < TXID_WATERMARK)
+        .order_by(OutboxEvent.txid.desc(), OutboxEvent.id.desc())
+        .limit(1)
+    )
+    async with AsyncSessionFactory() as session:
+        row = (await session.execute(statement)).one_or_none()
+    return tuple(row) if row else (0, 0)
+
+
+async def resume_position(cursor: int) -> Position:
+    """Position of the row a client last received, from its outbox id"""
+    if not cursor:
+        return (0, 0)
+    async with AsyncSessionFactory() as session:
+        txid = await session.scalar(select(OutboxEvent.txid).where(OutboxEvent.id == cursor))
+    if txid is None:
+        # Purged or unknown: replay everything retained rather than risk a gap
+        logger.warning(f"Change feed cursor {cursor} is no longer in the outbox, replaying all")
+        return (0, 0)
+    return (txid, cursor)
+
+
+async def stream_changes(cursor: int) -> AsyncIterator[dict | None]:
+    """Yield changes after the cursor: the outbox backlog first, then live changes.
+
+    Yields None when no change arrived within the heartbeat interval. Rows are sent in
+    (txid, id) order and only once their transaction and every older one have ended, so
+    resuming from the outbox id of any change sent never skips a row that committed later.
+    The live subscription is opened before the backlog is read, and live rows at or before
+    the last position sent are dropped. With sharded storage outbox ids are per shard and
+    there is no single backlog, only live changes are sent.
+    """
+    async with change_feed.subscribe() as subscriber:
+        position = None
+        if not shard_router.sharded:
+            position = await resume_position(cursor)
+            while True:
+                backlog = await changes_after(position, settings.CHANGE_FEED_CATCH_UP_BATCH_SIZE)
+                for position, change in backlog:
+                    yield change
+                if len(backlog) < settings.CHANGE_FEED_CATCH_UP_BATCH_SIZE:
+                    break
+
+        while not subscriber.closed.is_set():
+            live = await subscriber.next_change(settings.CHANGE_FEED_HEARTBEAT_SECONDS)
+            if live is None:
+                if not subscriber.closed.is_set():
+                    yield None
+                continue
+            change_position, change = live
+            if position is not None and change_position is not None:
+                if change_position <= position:
+                    continue
+                position = change_position
+            yield change
+
+
+change_feed = ChangeFeedHub()
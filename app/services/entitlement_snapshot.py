@@ -0,0 +1,461 @@
+import array
+import asyncio
+import bisect
+import contextlib
+import datetime
+import fcntl
+import heapq
+import logging
+import mmap
+import os
+import random
+import struct
+import sys
+import time
+import uuid
+from collections.abc import Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.sharding import Shard, shard_router
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+
+logger = logging.getLogger(__name__)
+
+# Snapshot file: header, then sorted 32-byte keys (supporter_id + creator_id), then one
+# little-endian int64 expiry (Unix microseconds) per key at the same index
+MAGIC = b"ENTSNAP1"
+HEADER = struct.Struct("<8sQq8x")  # magic, count, built_at (Unix microseconds)
+KEY_SIZE = 32
+EXPIRY = struct.Struct("<q")
+# Delta log record: key, expiry (0 revokes the pair), written_at (Unix microseconds)
+DELTA = struct.Struct("<32sqq")
+# Deltas written shortly before a snapshot started may not be in it yet
+DELTA_OVERLAP_MICROS = 30_000_000
+
+snapshot_lookups = registry.counter(
+    "entitlement_snapshot_lookups",
+    "Access checks by where they were answered: snapshot from the mapped file, delta from the "
+    "delta log, fallback from the database while no fresh snapshot is mapped",
+    ["source"],
+)
+snapshot_builds = registry.histogram(
+    "entitlement_snapshot_build_seconds", "Time to rebuild the entitlement snapshot from Postgres"
+)
+
+
+def _micros(moment: datetime.datetime) -> int:
+    return int(moment.timestamp() * 1_000_000)
+
+
+def pair_key(supporter_id: uuid.UUID, creator_id: uuid.UUID) -> bytes:
+    return supporter_id.bytes + creator_id.bytes
+
+
+class _Keys:
+    """Sequence view of the key region, so bisect runs over the mapping without copying"""
+
+    def __init__(self, view: memoryview, count: int):
+        self._view = view
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = HEADER.size + index * KEY_SIZE
+        return self._view[start : start + KEY_SIZE].tobytes()
+
+
+class EntitlementSnapshot:
+    """Read side of the node-local entitlement snapshot shared by all workers.
+
+    The snapshot file is built in bulk from Postgres and swapped in with a rename, so every
+    worker maps the same pages. Changes made after the build are appended to a small delta
+    log next to it by the one worker holding the node's recorder lock; each worker replays new
+    log records into a dict before answering. Lookups never touch the database and take a
+    binary search over the mapped keys.
+    """
+
+    def __init__(self, path: str | None):
+        self.path = path
+        self.delta_path = f"{path}.delta" if path else None
+        self.lock_path = f"{path}.lock" if path else None
+        self.recorder_path = f"{path}.recorder" if path else None
+        # Open and locked while this worker records the node's changes
+        self._recorder_lock = None
+        # Snapshots built before this time (Unix microseconds) are not trusted
+        self.stale_before = 0
+        self._file = None
+        self._map: mmap.mmap | None = None
+        self._view: memoryview | None = None
+        self._inode: int | None = None
+        self.count = 0
+        self.built_at = 0
+        self._keys: _Keys | None = None
+        self._delta_inode: int | None = None
+        self._delta_offset = 0
+        self._overrides: dict[bytes, int] = {}
+        # Pairs with a change not yet read back, and pairs whose recording task is running
+        self._changed: set[tuple[str, uuid.UUID, uuid.UUID]] = set()
+        self._recording: set[tuple[str, uuid.UUID, uuid.UUID]] = set()
+        self._tasks: set[asyncio.Task] = set()
+        registry.gauge(
+            "entitlement_snapshot_entries",
+            "Grants in the mapped snapshot and in the replayed delta log",
+            ["region"],
+            callback=lambda: [(("snapshot",), self.count), (("delta",), len(self._overrides))],
+        )
+        registry.gauge(
+            "entitlement_snapshot_age_seconds",
+            "Age of the mapped snapshot",
+            callback=lambda: [((), self.age() if self._map else 0.0)],
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def age(self) -> float:
+        return time.time() - self.built_at / 1_000_000
+
+    def is_fresh(self, max_age: float) -> bool:
+        return self._map is not None and self.built_at >= self.stale_before and self.age() < max_age
+
+    def invalidate(self) -> None:
+        """Stop answering until a snapshot started from now on is mapped, after changes were
+        committed that no delta records"""
+        self.stale_before = int(time.time() * 1_000_000)
+
+    def _close_map(self) -> None:
+        if self._view is not None:
+            self._view.release()
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._map = self._view = self._keys = None
+
+    def _remap(self) -> None:
+        """Map the snapshot file again if a build replaced it"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return
+        if inode == self._inode:
+            return
+        file = open(self.path, "rb")
+        try:
+            mapping = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            file.close()
+            return
+        magic, count, built_at = HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or len(mapping) != HEADER.size + count * (KEY_SIZE + EXPIRY.size):
+            logger.error(f"Ignoring malformed entitlement snapshot {self.path}")
+            mapping.close()
+            file.close()
+            return
+        self._close_map()
+        self._file, self._map, self._inode = file, mapping, inode
+        self._view = memoryview(mapping)
+        self.count, self.built_at = count, built_at
+        self._keys = _Keys(self._view, count)
+        # Replay the whole log against the new snapshot
+        self._delta_inode = None
+        logger.info(f"Mapped entitlement snapshot with {count} grants")
+
+    def _replay_deltas(self) -> None:
+        try:
+            stat = os.stat(self.delta_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._delta_inode:
+            self._delta_inode, self._delta_offset = stat.st_ino, 0
+            self._overrides.clear()
+        if stat.st_size - self._delta_offset < DELTA.size:
+            return
+        with open(self.delta_path, "rb") as log:
+            log.seek(self._delta_offset)
+            data = log.read(stat.st_size - self._delta_offset)
+        usable = len(data) - len(data) % DELTA.size
+        self._delta_offset += usable
+        oldest = self.built_at - DELTA_OVERLAP_MICROS
+        for key, expires_at, written_at in DELTA.iter_unpack(data[:usable]):
+            if written_at >= oldest:
+                self._overrides[key] = expires_at
+
+    def refresh(self) -> bool:
+        """Pick up a rebuilt snapshot and new deltas; True when the snapshot can answer"""
+        if not self.enabled:
+            return False
+        self._remap()
+        if not self.is_fresh(settings.ENTITLEMENT_SNAPSHOT_MAX_AGE_SECONDS):
+            return False
+        self._replay_deltas()
+        return True
+
+    def expires_at(self, supporter_id: uuid.UUID, creator_id: uuid.UUID) -> int | None:
+        """Expiry of the pair's grant in Unix microseconds, None without an active grant"""
+        key = pair_key(supporter_id, creator_id)
+        expires_at = self._overrides.get(key)
+        if expires_at is not None:
+            snapshot_lookups.inc(source="delta")
+            return expires_at or None
+        snapshot_lookups.inc(source="snapshot")
+        index = bisect.bisect_left(self._keys, key)
+        if index < self.count and self._keys[index] == key:
+            offset = HEADER.size + self.count * KEY_SIZE + index * EXPIRY.size
+            return EXPIRY.unpack_from(self._map, offset)[0]
+        return None
+
+    def has_access(self, supporter_id: uuid.UUID, creator_id: uuid.UUID) -> bool:
+        expires_at = self.expires_at(supporter_id, creator_id)
+        return expires_at is not None and expires_at > time.time() * 1_000_000
+
+    def append_delta(
+        self, supporter_id: uuid.UUID, creator_id: uuid.UUID, expires_at: datetime.datetime | None
+    ) -> None:
+        """Record the pair's current grant for every worker on the node"""
+        record = DELTA.pack(
+            pair_key(supporter_id, creator_id),
+            _micros(expires_at) if expires_at else 0,
+            int(time.time() * 1_000_000),
+        )
+        with open(self.lock_path, "a") as lock:
+            # Shared: appends from many workers, exclusive only while a build compacts the log
+            fcntl.flock(lock, fcntl.LOCK_SH)
+            fd = os.open(self.delta_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, record)
+            finally:
+                os.close(fd)
+
+    def _is_recorder(self) -> bool:
+        """Whether this worker records the node's changes, taking the recorder lock when no
+        live worker holds it.
+
+        Every worker sees every change, so one reading it back is enough. A worker taking over
+        from one that exited cannot tell which changes were left unrecorded, so it invalidates
+        the snapshot until the next build.
+        """
+        if self._recorder_lock is not None:
+            return True
+        lock = open(self.recorder_path, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock.close()
+            return False
+        self._recorder_lock = lock
+        logger.info("This worker now records entitlement changes for the node")
+        snapshot_builder.invalidate()
+        return True
+
+    def record_change(self, shard: Shard, supporter_id: uuid.UUID, creator_id: uuid.UUID) -> None:
+        """Append the pair's grant as committed on the shard, from a background task.
+
+        Called for every change the change feed sees, including NOTIFY from other instances,
+        and ignored unless this worker is the node's recorder. A pair changed again while its
+        task runs is read once more afterwards, so the last record appended for it always
+        reflects the last commit.
+        """
+        if not self.enabled or not self._is_recorder():
+            return
+        key = (shard.name, supporter_id, creator_id)
+        if key in self._changed:
+            return
+        self._changed.add(key)
+        if key in self._recording:
+            return
+        self._recording.add(key)
+        task = asyncio.create_task(self._record(shard, supporter_id, creator_id, key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _record(
+        self, shard: Shard, supporter_id: uuid.UUID, creator_id: uuid.UUID, key: tuple
+    ) -> None:
+        try:
+            while key in self._changed:
+                self._changed.discard(key)
+                async with shard.session_factory() as session:
+                    expires_at = await active_expiry(session, supporter_id, creator_id)
+                self.append_delta(supporter_id, creator_id, expires_at)
+        except Exception as e:
+            # The next rebuild picks the change up
+            self._changed.discard(key)
+            logger.error(f"Failed to record entitlement change for {supporter_id}: {e}")
+        finally:
+            self._recording.discard(key)
+
+
+async def active_expiry(
+    session: AsyncSession, supporter_id: uuid.UUID, creator_id: uuid.UUID
+) -> datetime.datetime | None:
+    """Latest expiry among the supporter's active subscriptions to the creator"""
+    statement = (
+        select(func.max(Subscription.expires_at))
+        .join(Tier, Subscription.tier_id == Tier.id)
+        .where(
+            (Subscription.supporter_id == supporter_id)
+            & (Tier.creator_id == creator_id)
+            & (Subscription.status == SubscriptionStatus.ACTIVE)
+        )
+    )
+    return await session.scalar(statement)
+
+
+def active_grants_statement():
+    # Postgres orders uuids bytewise, which is the order of the concatenated keys
+    return (
+        select(Subscription.supporter_id, Tier.creator_id, func.max(Subscription.expires_at))
+        .join(Tier, Subscription.tier_id == Tier.id)
+        .where(
+            (Subscription.status == SubscriptionStatus.ACTIVE)
+            & (Subscription.expires_at > func.now())
+        )
+        .group_by(Subscription.supporter_id, Tier.creator_id)
+        .order_by(Subscription.supporter_id, Tier.creator_id)
+    )
+
+
+async def _read_grants(shard: Shard) -> tuple[int, bytearray, array.array]:
+    """Start time, sorted keys and expiries of the active grants held by one shard"""
+    keys = bytearray()
+    expiries = array.array("q")
+    async with shard.session_factory() as session:
+        built_at = _micros(await session.scalar(select(func.now())))
+        result = await session.stream(
+            active_grants_statement().execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        async for rows in result.partitions():
+            for supporter_id, creator_id, expires_at in rows:
+                keys += supporter_id.bytes
+                keys += creator_id.bytes
+                expiries.append(_micros(expires_at))
+    return built_at, keys, expiries
+
+
+def _grants(keys: bytearray, expiries: array.array) -> Iterator[tuple[bytes, int]]:
+    for index, expiry in enumerate(expiries):
+        yield bytes(keys[index * KEY_SIZE : (index + 1) * KEY_SIZE]), expiry
+
+
+async def build_snapshot(path: str) -> int:
+    """Write a new snapshot of all active grants and swap it in, returns the grant count.
+
+    Every shard returns its grants in key order. Supporters never span shards but their keys
+    interleave, so the sorted runs of several shards are merged before writing.
+    """
+    started = time.perf_counter()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shards = [await _read_grants(shard) for shard in shard_router.shards]
+    # Deltas written after the earliest shard was read are replayed on top
+    built_at = min(shard_built_at for shard_built_at, _, _ in shards)
+    if len(shards) == 1:
+        _, keys, expiries = shards[0]
+    else:
+        keys = bytearray()
+        expiries = array.array("q")
+        runs = [_grants(shard_keys, shard_expiries) for _, shard_keys, shard_expiries in shards]
+        for key, expiry in heapq.merge(*runs):
+            keys += key
+            expiries.append(expiry)
+    if sys.byteorder == "big":
+        expiries.byteswap()
+    with open(tmp_path, "wb") as output:
+        output.write(HEADER.pack(MAGIC, len(expiries), built_at))
+        output.write(keys)
+        output.write(expiries.tobytes())
+    os.replace(tmp_path, path)
+    snapshot_builds.observe(time.perf_counter() - started)
+    return len(expiries)
+
+
+def compact_deltas(snapshot: EntitlementSnapshot, built_at: int) -> None:
+    """Drop delta records the new snapshot already covers"""
+    with open(snapshot.lock_path, "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            with open(snapshot.delta_path, "rb") as log:
+                data = log.read()
+        except FileNotFoundError:
+            return
+        oldest = built_at - DELTA_OVERLAP_MICROS
+        kept = b"".join(
+            DELTA.pack(*record)
+            for record in DELTA.iter_unpack(data[: len(data) - len(data) % DELTA.size])
+            if record[2] >= oldest
+        )
+        tmp_path = f"{snapshot.delta_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as output:
+            output.write(kept)
+        os.replace(tmp_path, snapshot.delta_path)
+
+
+class SnapshotBuilder:
+    """Rebuilds the node's snapshot when it gets old; one worker builds, the others map it"""
+
+    def __init__(self, snapshot: EntitlementSnapshot):
+        self.snapshot = snapshot
+        self._running = True
+        self._rebuild = asyncio.Event()
+
+    def invalidate(self) -> None:
+        """Distrust the current snapshot and build a new one right away"""
+        self.snapshot.invalidate()
+        self._rebuild.set()
+
+    async def build_if_stale(self) -> bool:
+        snapshot = self.snapshot
+        snapshot.refresh()
+        if snapshot.is_fresh(settings.ENTITLEMENT_SNAPSHOT_REBUILD_SECONDS):
+            return False
+        with open(f"{snapshot.path}.build", "a") as build_lock:
+            try:
+                fcntl.flock(build_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            # Another worker may have finished a build while this one waited
+            snapshot.refresh()
+            if snapshot.is_fresh(settings.ENTITLEMENT_SNAPSHOT_REBUILD_SECONDS):
+                return False
+            count = await build_snapshot(snapshot.path)
+            snapshot.refresh()
+            compact_deltas(snapshot, snapshot.built_at)
+        logger.info(f"Built entitlement snapshot with {count} grants")
+        return True
+
+    async def run(self):
+        if not self.snapshot.enabled:
+            return
+        try:
+            while self._running:
+                self._rebuild.clear()
+                try:
+                    await self.build_if_stale()
+                except Exception as e:
+                    logger.error(f"Entitlement snapshot build failed: {e}")
+                # Jitter so workers started together do not all contend for the build lock
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._rebuild.wait(),
+                        settings.ENTITLEMENT_SNAPSHOT_REBUILD_SECONDS
+                        / 4
+                        * random.uniform(0.5, 1.0),
+                    )
+        except asyncio.CancelledError:
+            logger.info("Entitlement snapshot builder task cancelled")
+
+    def stop(self):
+        self._running = False
+        self._rebuild.set()
+
+
+entitlement_snapshot = EntitlementSnapshot(settings.ENTITLEMENT_SNAPSHOT_PATH)
+snapshot_builder = SnapshotBuilder(entitlement_snapshot)
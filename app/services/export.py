@@ -0,0 +1,136 @@
+import csv
+import io
+import json
+import logging
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from typing import IO
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.sharding import shard_fanouts, shard_router
+from app.models.subscription import Subscription
+from app.models.tier import Tier
+
+logger = logging.getLogger(__name__)
+
+EXPORT_COLUMNS = (
+    "id",
+    "supporter_id",
+    "creator_id",
+    "tier_id",
+    "tier_name",
+    "status",
+    "started_at",
+    "expires_at",
+    "created_at",
+)
+
+# Same rows as export_statement, written by Postgres itself
+COPY_QUERY = """
+SELECT s.id, s.supporter_id, t.creator_id, s.tier_id, t.name AS tier_name,
+       lower(s.status::text) AS status, s.started_at, s.expires_at, s.created_at
+FROM subscription s JOIN tier t ON s.tier_id = t.id
+"""
+
+
+def export_statement(creator_id: uuid.UUID | None = None):
+    statement = select(
+        Subscription.id,
+        Subscription.supporter_id,
+        Tier.creator_id,
+        Subscription.tier_id,
+        Tier.name.label("tier_name"),
+        Subscription.status,
+        Subscription.started_at,
+        Subscription.expires_at,
+        Subscription.created_at,
+    ).join(Tier, Subscription.tier_id == Tier.id)
+    if creator_id is not None:
+        statement = statement.where(Tier.creator_id == creator_id)
+    return statement
+
+
+def _export_values(row: Sequence) -> list[str | None]:
+    """Text form of a row; csv writes None as an empty field, NDJSON as null"""
+    values = []
+    for value in row:
+        if value is None:
+            values.append(None)
+        elif hasattr(value, "isoformat"):
+            values.append(value.isoformat())
+        elif hasattr(value, "value"):
+            values.append(value.value)
+        else:
+            values.append(str(value))
+    return values
+
+
+def _csv_chunk(rows: Sequence[Sequence], header: bool = False) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(EXPORT_COLUMNS)
+    writer.writerows(_export_values(row) for row in rows)
+    return buffer.getvalue()
+
+
+def _ndjson_chunk(rows: Sequence[Sequence]) -> str:
+    return "".join(
+        json.dumps(dict(zip(EXPORT_COLUMNS, _export_values(row), strict=True))) + "\n"
+        for row in rows
+    )
+
+
+async def stream_export(creator_id: uuid.UUID | None, format: str) -> AsyncIterator[str]:
+    """Yield the export one batch of rows at a time through a server-side cursor.
+
+    Rows are fetched only when the previous chunk was sent, so memory stays at one batch
+    and a slow client slows down the cursor instead of filling buffers. With sharded storage
+    the shards are read one after the other.
+    """
+    statement = export_statement(creator_id).execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+    exported = 0
+    if format == "csv":
+        yield _csv_chunk((), header=True)
+    if shard_router.sharded:
+        shard_fanouts.inc(operation="export")
+    for shard in shard_router.shards:
+        async with shard.read_session_factory() as session:
+            result = await session.stream(statement)
+            async for rows in result.partitions():
+                exported += len(rows)
+                yield _csv_chunk(rows) if format == "csv" else _ndjson_chunk(rows)
+    logger.info(f"Exported {exported} subscriptions (creator_id: {creator_id})")
+
+
+def export_response(creator_id: uuid.UUID | None, format: str) -> StreamingResponse:
+    chunks = stream_export(creator_id, format)
+    if format == "csv":
+        return StreamingResponse(
+            chunks,
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="subscriptions.csv"'},
+        )
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
+async def copy_export(
+    connection: AsyncConnection,
+    output: IO[bytes],
+    creator_id: uuid.UUID | None = None,
+    header: bool = True,
+) -> str:
+    """Write the export as CSV with Postgres COPY on the given connection"""
+    query = COPY_QUERY
+    args = ()
+    if creator_id is not None:
+        query += "WHERE t.creator_id = $1"
+        args = (creator_id,)
+    raw_connection = await connection.get_raw_connection()
+    return await raw_connection.driver_connection.copy_from_query(
+        query, *args, output=output, format="csv", header=header
+    )
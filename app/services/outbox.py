@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import json
+import logging
+import time
+from collections.abc import Callable
+
+from confluent_kafka import KafkaError, Message, Producer
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.sharding import Shard, shard_router
+from app.core.tracing import TRACEPARENT_HEADER, current_traceparent
+from app.models.outbox import OutboxEvent
+from app.schemas.kafka_events import SubscriptionEvent
+
+logger = logging.getLogger(__name__)
+
+# Only one relay publishes per shard at a time, so batches never interleave. Rows are published in
+# id order as they become visible, and ids are taken before commit: a transaction committing after
+# a later id was published is published after it. Events therefore follow commit order only for
+# changes serialized by a row lock, e.g. those of one subscription.
+OUTBOX_RELAY_LOCK_ID = 0x5B0_0B0C
+PURGE_INTERVAL_SECONDS = 600
+
+outbox_published = registry.counter(
+    "outbox_events_published", "Outbox events delivered to Kafka", ["event_type"]
+)
+outbox_failures = registry.counter(
+    "outbox_publish_failures", "Outbox events Kafka did not acknowledge", ["event_type"]
+)
+outbox_batch_seconds = registry.histogram(
+    "outbox_publish_batch_seconds", "Time to publish and mark one outbox batch"
+)
+
+
+def add_subscription_event(session: AsyncSession, event: SubscriptionEvent) -> OutboxEvent:
+    """Stage an outbox row in the caller's transaction; it is committed with the state change"""
+    outbox_event = OutboxEvent(
+        event_type=event.event_type,
+        subscription_id=event.subscription_id,
+        key=str(event.supporter_id),
+        payload=event.model_dump(mode="json"),
+        traceparent=current_traceparent(),
+    )
+    session.add(outbox_event)
+    return outbox_event
+
+
+ProducerFactory = Callable[[dict], Producer]
+
+
+class OutboxRelay:
+    """Publishes committed outbox events of every shard to Kafka in batches through an
+    idempotent producer.
+
+    Delivery is at least once: an event still unacknowledged when the flush times out stays
+    unpublished and is produced again by a later batch, even if the first attempt gets through
+    after all. Each message carries an `event_id` header, stable across attempts, for consumers
+    to dedupe on.
+    """
+
+    def __init__(self, producer_factory: ProducerFactory = Producer):
+        self._running = True
+        self._producer: Producer | None = None
+        self._producer_factory = producer_factory
+        self._last_purge = 0.0
+
+    def _initialize_producer(self) -> Producer:
+        conf = {
+            "bootstrap.servers": settings.KAFKA_BOOTSTRAP_SERVERS,
+            "enable.idempotence": True,
+            "acks": "all",
+            "linger.ms": settings.KAFKA_PRODUCER_LINGER_MS,
+            "batch.size": settings.KAFKA_PRODUCER_BATCH_SIZE,
+            "compression.type": settings.KAFKA_PRODUCER_COMPRESSION,
+        }
+        logger.info(
+            f"Outbox producer initialized for topic '{settings.KAFKA_SUBSCRIPTION_EVENTS_TOPIC}'"
+        )
+        return self._producer_factory(conf)
+
+    async def publish_pending(self, shard: Shard) -> int:
+        """Publish one batch of the shard's unpublished events and mark the acknowledged ones"""
+        async with shard.session_factory() as session:
+            locked = await session.scalar(
+                select(func.pg_try_advisory_xact_lock(OUTBOX_RELAY_LOCK_ID))
+            )
+            if not locked:
+                return 0
+
+            statement = (
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(settings.OUTBOX_BATCH_SIZE)
+            )
+            events = (await session.execute(statement)).scalars().all()
+            if not events:
+                return 0
+
+            start = time.perf_counter()
+            delivered: list[int] = []
+
+            def on_delivery(event: OutboxEvent, error: KafkaError | None, msg: Message):
+                if error is None:
+                    delivered.append(event.id)
+                    outbox_published.inc(event_type=event.event_type)
+                else:
+                    outbox_failures.inc(event_type=event.event_type)
+                    logger.error(f"Outbox event {event.id} was not delivered: {error}")
+
+            for event in events:
+                headers = {"event_type": event.event_type, "event_id": f"{shard.name}:{event.id}"}
+                if event.traceparent:
+                    headers[TRACEPARENT_HEADER] = event.traceparent
+                self._producer.produce(
+                    settings.KAFKA_SUBSCRIPTION_EVENTS_TOPIC,
+                    key=event.key.encode(),
+                    value=json.dumps(event.payload).encode(),
+                    headers=headers,
+                    on_delivery=lambda error, msg, event=event: on_delivery(event, error, msg),
+                )
+            # flush blocks until every message is acknowledged or the timeout expires
+            await asyncio.to_thread(self._producer.flush, settings.OUTBOX_PUBLISH_TIMEOUT_SECONDS)
+
+            if delivered:
+                await session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(delivered))
+                    .values(published_at=func.now())
+                )
+            await session.commit()
+            outbox_batch_seconds.observe(time.perf_counter() - start)
+            logger.debug(f"Published {len(delivered)}/{len(events)} outbox events")
+            return len(delivered)
+
+    async def purge_published(self, shard: Shard) -> int:
+        """Delete the shard's events published longer ago than the retention window"""
+        cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(
+            hours=settings.OUTBOX_RETENTION_HOURS
+        )
+        async with shard.session_factory() as session:
+            result = await session.execute(
+                delete(OutboxEvent).where(OutboxEvent.published_at < cutoff)
+            )
+            await session.commit()
+            return result.rowcount
+
+    async def run(self):
+        """Relay events until stopped"""
+        self._producer = self._initialize_producer()
+        try:
+            while self._running:
+                purge = time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS
+                if purge:
+                    self._last_purge = time.monotonic()
+                backlog = False
+                for shard in shard_router.shards:
+                    try:
+                        published = await self.publish_pending(shard)
+                        backlog = backlog or published >= settings.OUTBOX_BATCH_SIZE
+                        if purge:
+                            purged = await self.purge_published(shard)
+                            logger.info(f"Purged {purged} published outbox events on {shard.name}")
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        logger.exception(f"Outbox relay iteration on {shard.name} failed: {e}")
+                # A full batch means there is a backlog, keep draining without sleeping
+                if not backlog:
+                    await asyncio.sleep(settings.OUTBOX_POLL_INTERVAL_SECONDS)
+        except asyncio.CancelledError:
+            logger.info("Outbox relay task cancelled")
+        finally:
+            remaining = await asyncio.to_thread(
+                self._producer.flush, settings.OUTBOX_PUBLISH_TIMEOUT_SECONDS
+            )
+            logger.info(f"Outbox relay stopped, {remaining} messages left unflushed")
+
+    def stop(self):
+        """Signal the relay to stop after the current batch"""
+        self._running = False
+
+
+outbox_relay = OutboxRelay()
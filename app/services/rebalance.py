@@ -0,0 +1,164 @@
+import dataclasses
+import datetime
+import logging
+
+from sqlalchemy import Table, delete, exists, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionFactory
+from app.core.sharding import Shard, bucket_sql, shard_router
+from app.models.subscription import Subscription, SubscriptionHistory
+from app.models.tier import Tier
+from app.services.revenue import backfill_revenue_rollups
+from app.services.tiers import upsert_tiers_statement
+
+logger = logging.getLogger(__name__)
+
+# Tables whose rows live on the shard of their supporter_id
+SHARDED_TABLES: tuple[Table, ...] = (Subscription.__table__, SubscriptionHistory.__table__)
+
+
+@dataclasses.dataclass
+class MoveReport:
+    """Rows found on a shard that does not own their supporter"""
+
+    misplaced: int = 0
+    deleted: int = 0
+    targets: set[str] = dataclasses.field(default_factory=set)
+
+
+async def sync_tiers(batch_size: int) -> tuple[int, int]:
+    """Make every shard's tier table match the primary database.
+
+    Tiers are copied over, and copies of tiers since deleted from the primary are deleted
+    unless subscriptions on the shard still refer to them. Returns the tier count and the
+    number of copies deleted.
+    """
+    copied = 0
+    primary_ids: set = set()
+    async with AsyncSessionFactory() as session:
+        result = await session.stream(
+            select(Tier.__table__).order_by(Tier.id).execution_options(yield_per=batch_size)
+        )
+        async for rows in result.mappings().partitions():
+            tiers = [dict(row) for row in rows]
+            for shard in shard_router.shards:
+                async with shard.session_factory() as shard_session:
+                    await shard_session.execute(upsert_tiers_statement(tiers))
+                    await shard_session.commit()
+            primary_ids.update(tier["id"] for tier in tiers)
+            copied += len(tiers)
+
+    deleted = 0
+    for shard in shard_router.shards:
+        async with shard.session_factory() as session:
+            shard_ids = (await session.scalars(select(Tier.id))).all()
+            stale = [tier_id for tier_id in shard_ids if tier_id not in primary_ids]
+            for start in range(0, len(stale), batch_size):
+                batch = stale[start : start + batch_size]
+                result = await session.execute(
+                    delete(Tier).where(
+                        Tier.id.in_(batch), ~exists().where(Subscription.tier_id == Tier.id)
+                    )
+                )
+                await session.commit()
+                deleted += result.rowcount
+                if result.rowcount < len(batch):
+                    logger.warning(
+                        f"{len(batch) - result.rowcount} tiers deleted from the primary are "
+                        f"still referenced by subscriptions on {shard.name}, kept them"
+                    )
+    return copied, deleted
+
+
+def misplaced_statement(table: Table, shard: Shard, after: tuple | None, batch_size: int):
+    """Next batch of rows on the shard whose supporter belongs to another one, in key order"""
+    key = list(table.primary_key.columns)
+    bucket = bucket_sql(table.c.supporter_id, settings.SUBSCRIPTION_SHARD_BUCKETS)
+    statement = (
+        select(table)
+        .where(bucket.not_in(shard_router.buckets_of(shard)))
+        .order_by(*key)
+        .limit(batch_size)
+    )
+    if after is not None:
+        statement = statement.where(tuple_(*key) > tuple_(*after))
+    return statement
+
+
+def upsert_rows_statement(table: Table, rows: list[dict]):
+    """Insert copied rows, keeping a row already on the target when it changed later"""
+    key = [column.name for column in table.primary_key.columns]
+    statement = insert(table).values(rows)
+    return statement.on_conflict_do_update(
+        index_elements=key,
+        set_={
+            column.name: statement.excluded[column.name]
+            for column in table.columns
+            if column.name not in key
+        },
+        where=table.c.updated_at <= statement.excluded.updated_at,
+    )
+
+
+async def _copy_to_targets(table: Table, rows: list[dict]) -> set[str]:
+    by_target: dict[str, list[dict]] = {}
+    for row in rows:
+        by_target.setdefault(shard_router.shard_for(row["supporter_id"]).name, []).append(row)
+    for name, target_rows in by_target.items():
+        async with shard_router.get(name).session_factory() as session:
+            await session.execute(upsert_rows_statement(table, target_rows))
+            await session.commit()
+    return set(by_target)
+
+
+async def _delete_copied(session: AsyncSession, table: Table, rows: list[dict]) -> int:
+    """Delete copied rows from the source unless they changed since they were read"""
+    key = [column.name for column in table.primary_key.columns]
+    versions = tuple_(*(table.c[name] for name in key), table.c.updated_at)
+    result = await session.execute(
+        delete(table).where(
+            versions.in_([(*(row[name] for name in key), row["updated_at"]) for row in rows])
+        )
+    )
+    await session.commit()
+    return result.rowcount
+
+
+async def move_misplaced(
+    table: Table, source: Shard, batch_size: int, copy_only: bool, dry_run: bool
+) -> MoveReport:
+    """Copy the source's misplaced rows to their shards, then delete them from the source.
+
+    Each batch is committed on the targets before it is deleted from the source, so a crash
+    leaves rows on both shards and a new run finishes the move. A source row updated after it
+    was read is not deleted; the next run copies and deletes it.
+    """
+    report = MoveReport()
+    key = list(table.primary_key.columns)
+    after = None
+    while True:
+        async with source.session_factory() as session:
+            statement = misplaced_statement(table, source, after, batch_size)
+            rows = [dict(row) for row in (await session.execute(statement)).mappings()]
+            if not rows:
+                break
+            after = tuple(rows[-1][column.name] for column in key)
+            report.misplaced += len(rows)
+            if not dry_run:
+                report.targets.update(await _copy_to_targets(table, rows))
+            if not dry_run and not copy_only:
+                report.deleted += await _delete_copied(session, table, rows)
+        logger.info(f"{table.name} on {source.name}: {report.misplaced} misplaced rows so far")
+        if len(rows) < batch_size:
+            break
+    return report
+
+
+async def rebuild_today_rollups(shard: Shard) -> None:
+    """Recount today's revenue rollups and the running tier stats after rows moved"""
+    today = datetime.datetime.now(datetime.UTC).date()
+    async with shard.session_factory() as session:
+        await backfill_revenue_rollups(session, today, today)
@@ -0,0 +1,310 @@
+import dataclasses
+import datetime
+import logging
+import uuid
+from collections.abc import Iterable, Mapping
+
+from sqlalchemy import (
+    BigInteger,
+    Date,
+    Integer,
+    Numeric,
+    Uuid,
+    cast,
+    column,
+    delete,
+    func,
+    select,
+    text,
+    values,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.analytics import CreatorRevenueDaily, CreatorTierStats
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class RollupDelta:
+    """Change to one tier's rollups caused by a single transaction"""
+
+    active: int = 0
+    activations: int = 0
+    churned: int = 0
+    payments: int = 0
+    payments_amount: int = 0
+
+
+def _utc_today():
+    return cast(func.timezone("UTC", func.now()), Date)
+
+
+async def apply_rollup_deltas(session: AsyncSession, deltas: Mapping[uuid.UUID, RollupDelta]):
+    """Add the deltas to the running tier stats and today's rows in the caller's transaction.
+
+    The running count is updated first and its new value becomes today's end-of-day
+    snapshot, in a single statement. Tiers are locked in id order to avoid deadlocks
+    between concurrent batches.
+    """
+    if not deltas:
+        return
+    changes = (
+        values(
+            column("tier_id", Uuid),
+            column("active", Integer),
+            column("activations", Integer),
+            column("churned", Integer),
+            column("payments", Integer),
+            column("payments_amount", BigInteger),
+            name="changes",
+        )
+        .data([(tier_id, *dataclasses.astuple(delta)) for tier_id, delta in deltas.items()])
+        .cte("changes")
+    )
+
+    stats = insert(CreatorTierStats).from_select(
+        ["tier_id", "creator_id", "currency", "active_supporters"],
+        select(Tier.id, Tier.creator_id, Tier.currency, changes.c.active)
+        .join_from(changes, Tier, changes.c.tier_id == Tier.id)
+        .order_by(Tier.id),
+    )
+    totals = (
+        stats.on_conflict_do_update(
+            index_elements=[CreatorTierStats.tier_id],
+            set_={
+                "active_supporters": CreatorTierStats.active_supporters
+                + stats.excluded.active_supporters,
+                "currency": stats.excluded.currency,
+                "updated_at": func.now(),
+            },
+        )
+        .returning(
+            CreatorTierStats.tier_id,
+            CreatorTierStats.creator_id,
+            CreatorTierStats.currency,
+            CreatorTierStats.active_supporters,
+        )
+        .cte("tier_totals")
+    )
+
+    daily = insert(CreatorRevenueDaily).from_select(
+        [
+            "day",
+            "creator_id",
+            "tier_id",
+            "currency",
+            "active_supporters",
+            "mrr",
+            "activations",
+            "churned",
+            "payments",
+            "payments_amount",
+        ],
+        select(
+            _utc_today(),
+            totals.c.creator_id,
+            totals.c.tier_id,
+            totals.c.currency,
+            totals.c.active_supporters,
+            cast(totals.c.active_supporters * Tier.price, Numeric(14, 2)),
+            changes.c.activations,
+            changes.c.churned,
+            changes.c.payments,
+            changes.c.payments_amount,
+        )
+        .join_from(totals, changes, totals.c.tier_id == changes.c.tier_id)
+        .join(Tier, totals.c.tier_id == Tier.id),
+    )
+    table = CreatorRevenueDaily.__table__.c
+    statement = daily.on_conflict_do_update(
+        index_elements=[table.creator_id, table.day, table.tier_id],
+        set_={
+            "currency": daily.excluded.currency,
+            "active_supporters": daily.excluded.active_supporters,
+            "mrr": daily.excluded.mrr,
+            "activations": table.activations + daily.excluded.activations,
+            "churned": table.churned + daily.excluded.churned,
+            "payments": table.payments + daily.excluded.payments,
+            "payments_amount": table.payments_amount + daily.excluded.payments_amount,
+        },
+    )
+    await session.execute(statement)
+
+
+# Rebuilds one UTC day from subscriptions. Cancelled subscriptions are counted until their
+# last update, lapsed ones until expiry, and payments are estimated from the tier price.
+BACKFILL_DAY_SQL = text(
+    """
+    WITH bounds AS (
+        SELECT CAST(:day AS date)::timestamp AT TIME ZONE 'UTC' AS day_start,
+               (CAST(:day AS date) + 1)::timestamp AT TIME ZONE 'UTC' AS day_end
+    ),
+    subs AS (
+        SELECT tier_id, started_at,
+               CASE WHEN status = 'CANCELLED' THEN least(updated_at, expires_at)
+                    ELSE expires_at END AS ended_at
+        FROM subscription
+        WHERE status <> 'PENDING'
+        UNION ALL
+        SELECT tier_id, started_at,
+               CASE WHEN status = 'CANCELLED' THEN least(updated_at, expires_at)
+                    ELSE expires_at END AS ended_at
+        FROM subscription_history
+        WHERE status <> 'PENDING' AND expires_at >= (SELECT day_start FROM bounds)
+    ),
+    per_tier AS (
+        SELECT s.tier_id,
+               count(*) FILTER (WHERE s.ended_at >= b.day_end) AS active_supporters,
+               count(*) FILTER (WHERE s.started_at >= b.day_start) AS activations,
+               count(*) FILTER (WHERE s.ended_at < b.day_end) AS churned
+        FROM subs s, bounds b
+        WHERE s.started_at < b.day_end AND s.ended_at >= b.day_start
+        GROUP BY s.tier_id
+    )
+    INSERT INTO creator_revenue_daily (
+        day, creator_id, tier_id, currency, active_supporters, mrr,
+        activations, churned, payments, payments_amount
+    )
+    SELECT CAST(:day AS date), t.creator_id, t.id, t.currency, p.active_supporters,
+           CAST(p.active_supporters * t.price AS numeric(14, 2)),
+           p.activations, p.churned, p.activations, round(p.activations * t.price * 100)
+    FROM per_tier p JOIN tier t ON t.id = p.tier_id
+    ON CONFLICT (creator_id, day, tier_id) DO UPDATE SET
+        currency = EXCLUDED.currency,
+        active_supporters = EXCLUDED.active_supporters,
+        mrr = EXCLUDED.mrr,
+        activations = EXCLUDED.activations,
+        churned = EXCLUDED.churned,
+        payments = EXCLUDED.payments,
+        payments_amount = EXCLUDED.payments_amount
+    """
+)
+
+
+async def rebuild_tier_stats(session: AsyncSession) -> int:
+    """Recount active supporters per tier from the subscription table"""
+    await session.execute(delete(CreatorTierStats))
+    statement = insert(CreatorTierStats).from_select(
+        ["tier_id", "creator_id", "currency", "active_supporters"],
+        select(Tier.id, Tier.creator_id, Tier.currency, func.count(Subscription.id))
+        .join(Subscription, Subscription.tier_id == Tier.id)
+        .where(Subscription.status == SubscriptionStatus.ACTIVE)
+        .group_by(Tier.id),
+    )
+    result = await session.execute(statement)
+    await session.commit()
+    return result.rowcount
+
+
+async def backfill_revenue_rollups(
+    session: AsyncSession, start: datetime.date, end: datetime.date
+) -> int:
+    """Rebuild daily rows for every day from start to end, one transaction per day"""
+    day = start
+    rows = 0
+    while day <= end:
+        result = await session.execute(BACKFILL_DAY_SQL, {"day": day})
+        await session.commit()
+        rows += result.rowcount
+        logger.info(f"Backfilled revenue rollups for {day}: {result.rowcount} tier rows")
+        day += datetime.timedelta(days=1)
+    tiers = await rebuild_tier_stats(session)
+    logger.info(f"Rebuilt running stats for {tiers} tiers")
+    return rows
+
+
+async def creator_tier_totals(session: AsyncSession, creator_id: uuid.UUID) -> list[dict]:
+    """Current active supporters and MRR per tier of the creator"""
+    statement = (
+        select(
+            CreatorTierStats.tier_id,
+            CreatorTierStats.currency,
+            CreatorTierStats.active_supporters,
+            cast(CreatorTierStats.active_supporters * Tier.price, Numeric(14, 2)).label("mrr"),
+        )
+        .join(Tier, CreatorTierStats.tier_id == Tier.id)
+        .where(CreatorTierStats.creator_id == creator_id)
+        .order_by(CreatorTierStats.tier_id)
+    )
+    result = await session.execute(statement)
+    return [dict(row) for row in result.mappings()]
+
+
+async def creator_daily_revenue(
+    session: AsyncSession, creator_id: uuid.UUID, start: datetime.date, end: datetime.date
+) -> list[dict]:
+    """One row per tier and day in the range, carrying end-of-day values over quiet days"""
+    columns = CreatorRevenueDaily.__table__.c
+    in_range = (
+        select(columns)
+        .where(columns.creator_id == creator_id, columns.day.between(start, end))
+        .order_by(columns.day)
+    )
+    # Latest row before the range gives the starting values of every tier
+    before_range = (
+        select(columns)
+        .where(columns.creator_id == creator_id, columns.day < start)
+        .order_by(columns.tier_id, columns.day.desc())
+        .distinct(columns.tier_id)
+    )
+    rows_by_day: dict[datetime.date, list] = {}
+    for row in (await session.execute(in_range)).mappings():
+        rows_by_day.setdefault(row["day"], []).append(row)
+    last = {row["tier_id"]: row for row in (await session.execute(before_range)).mappings()}
+
+    daily = []
+    day = start
+    while day <= end:
+        for row in rows_by_day.get(day, ()):
+            last[row["tier_id"]] = row
+        for tier_id, row in sorted(last.items(), key=lambda item: str(item[0])):
+            changed = row["day"] == day
+            daily.append(
+                {
+                    "day": day,
+                    "tier_id": tier_id,
+                    "currency": row["currency"],
+                    "active_supporters": row["active_supporters"],
+                    "mrr": row["mrr"],
+                    "activations": row["activations"] if changed else 0,
+                    "churned": row["churned"] if changed else 0,
+                    "payments": row["payments"] if changed else 0,
+                    "payments_amount": row["payments_amount"] if changed else 0,
+                }
+            )
+        day += datetime.timedelta(days=1)
+    return daily
+
+
+# Rollup fields that add up across shards; the rest are equal for the same key
+SHARD_SUMMED_FIELDS = (
+    "active_supporters",
+    "mrr",
+    "activations",
+    "churned",
+    "payments",
+    "payments_amount",
+)
+
+
+def merge_shard_rollups(rows_per_shard: Iterable[list[dict]], key: tuple[str, ...]) -> list[dict]:
+    """Add up the rollup rows of the same key read from different shards, sorted by key.
+
+    Each shard only counts the supporters it holds, so the creator's totals are the sums.
+    """
+    merged: dict[tuple, dict] = {}
+    for rows in rows_per_shard:
+        for row in rows:
+            row_key = tuple(row[field] for field in key)
+            total = merged.get(row_key)
+            if total is None:
+                merged[row_key] = dict(row)
+                continue
+            for field in SHARD_SUMMED_FIELDS:
+                if field in row:
+                    total[field] += row[field]
+    return [merged[row_key] for row_key in sorted(merged, key=lambda k: tuple(map(str, k)))]
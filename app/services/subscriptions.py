@@ -0,0 +1,162 @@
+import asyncio
+import collections
+import contextlib
+import datetime
+import logging
+import uuid
+
+from sqlalchemy import String, cast, func, insert, literal, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.sharding import shard_router
+from app.models.outbox import OutboxEvent
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+from app.schemas.kafka_events import SubscriptionCancelledEvent, SubscriptionExpiredEvent
+from app.services.change_feed import change_feed
+from app.services.outbox import add_subscription_event
+from app.services.revenue import RollupDelta, apply_rollup_deltas
+
+logger = logging.getLogger(__name__)
+
+EXPIRED_EVENT_TYPE = SubscriptionExpiredEvent.model_fields["event_type"].default
+
+
+def _json_field(name: str, value):
+    return literal(name, String), value
+
+
+async def expire_batch(session: AsyncSession, batch_size: int) -> int:
+    """Deactivate one batch of lapsed subscriptions and stage their expired events.
+
+    The UPDATE and the outbox INSERT run as a single statement, so the state change and
+    the event are committed together without loading rows into Python. Only the tier ids
+    come back, to update the revenue rollups in the same transaction.
+    """
+    candidates = (
+        select(Subscription.id)
+        .where(
+            Subscription.status == SubscriptionStatus.ACTIVE,
+            Subscription.expires_at <= func.now(),
+        )
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    expired = (
+        update(Subscription)
+        .where(Subscription.id.in_(candidates))
+        .values(status=SubscriptionStatus.INACTIVE)
+        .returning(
+            Subscription.id,
+            Subscription.supporter_id,
+            Subscription.tier_id,
+            Subscription.expires_at,
+        )
+        .cte("expired")
+    )
+    payload = func.jsonb_build_object(
+        *_json_field("event_type", literal(EXPIRED_EVENT_TYPE, String)),
+        *_json_field("subscription_id", expired.c.id),
+        *_json_field("supporter_id", expired.c.supporter_id),
+        *_json_field("creator_id", Tier.creator_id),
+        *_json_field("tier_id", expired.c.tier_id),
+        *_json_field("status", literal(SubscriptionStatus.INACTIVE.value, String)),
+        *_json_field("expires_at", expired.c.expires_at),
+        *_json_field("occurred_at", func.now()),
+    )
+    statement = (
+        insert(OutboxEvent)
+        .from_select(
+            ["event_type", "subscription_id", "key", "payload"],
+            select(
+                literal(EXPIRED_EVENT_TYPE, String),
+                expired.c.id,
+                cast(expired.c.supporter_id, String),
+                payload,
+            ).join_from(expired, Tier, expired.c.tier_id == Tier.id),
+        )
+        .returning(OutboxEvent.payload["tier_id"].astext)
+    )
+    result = await session.execute(statement)
+    churned = collections.Counter(uuid.UUID(tier_id) for tier_id in result.scalars())
+    await apply_rollup_deltas(
+        session,
+        {tier_id: RollupDelta(active=-count, churned=count) for tier_id, count in churned.items()},
+    )
+    await session.commit()
+    return churned.total()
+
+
+async def expire_lapsed_subscriptions(session: AsyncSession, batch_size: int) -> int:
+    """Expire every lapsed subscription, batch by batch"""
+    total = 0
+    while True:
+        expired = await expire_batch(session, batch_size)
+        total += expired
+        if expired < batch_size:
+            break
+    if total:
+        logger.info(f"Expired {total} lapsed subscriptions")
+    return total
+
+
+async def cancel_subscription(session: AsyncSession, subscription: Subscription, tier: Tier):
+    """Cancel a subscription and stage its cancelled event in the same transaction"""
+    if subscription.status == SubscriptionStatus.ACTIVE:
+        await apply_rollup_deltas(session, {tier.id: RollupDelta(active=-1, churned=1)})
+    subscription.status = SubscriptionStatus.CANCELLED
+    outbox_event = add_subscription_event(
+        session,
+        SubscriptionCancelledEvent(
+            subscription_id=subscription.id,
+            supporter_id=subscription.supporter_id,
+            creator_id=tier.creator_id,
+            tier_id=tier.id,
+            status=SubscriptionStatus.CANCELLED.value,
+            expires_at=subscription.expires_at,
+            occurred_at=datetime.datetime.now(datetime.UTC),
+        ),
+    )
+    await session.commit()
+    change_feed.publish_event(outbox_event)
+    await session.refresh(subscription)
+    logger.info(f"Cancelled subscription {subscription.id}")
+    return subscription
+
+
+class ExpirySweeper:
+    """Periodically expires lapsed subscriptions on every shard so their expired events reach
+    the outbox"""
+
+    def __init__(self):
+        self._running = True
+        self._stopped = asyncio.Event()
+
+    async def run(self):
+        """Sweep until stopped"""
+        try:
+            while self._running:
+                for shard in shard_router.shards:
+                    try:
+                        async with shard.session_factory() as session:
+                            await expire_lapsed_subscriptions(
+                                session, settings.SUBSCRIPTION_EXPIRY_BATCH_SIZE
+                            )
+                    except Exception as e:
+                        logger.exception(f"Subscription expiry sweep of {shard.name} failed: {e}")
+                # Wakes up early on stop, so shutdown does not wait out the interval
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(
+                        self._stopped.wait(), settings.SUBSCRIPTION_EXPIRY_INTERVAL_SECONDS
+                    )
+        except asyncio.CancelledError:
+            logger.info("Expiry sweeper task cancelled")
+
+    def stop(self):
+        """Signal the sweeper to stop after the current sweep"""
+        self._running = False
+        self._stopped.set()
+
+
+expiry_sweeper = ExpirySweeper()
@@ -0,0 +1,171 @@
+import asyncio
+import logging
+import time
+import uuid
+
+from sqlalchemy import distinct, func, select
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.sharding import Shard, shard_router
+from app.models.subscription import Subscription, SubscriptionStatus
+
+logger = logging.getLogger(__name__)
+
+supporter_filter_checks = registry.counter(
+    "supporter_filter_checks",
+    "Access checks seen by the supporter filter: negative was denied without a query, maybe "
+    "went on to the database, unready arrived before the filter was built",
+    ["outcome"],
+)
+supporter_filter_builds = registry.histogram(
+    "supporter_filter_build_seconds", "Time to rebuild the supporter filter from Postgres"
+)
+
+
+def active_supporters_statement():
+    return (
+        select(distinct(Subscription.supporter_id))
+        .where(Subscription.status == SubscriptionStatus.ACTIVE)
+        .where(Subscription.expires_at > func.now())
+    )
+
+
+class SupporterFilter:
+    """Bloom filter of supporters with at least one active subscription.
+
+    A supporter missing from the filter certainly has no active subscription, so the access
+    check is denied without a query. Activations are added as the change feed sees them, which
+    covers this instance's consumer and, through NOTIFY, every other instance. The filter is
+    only trusted while the change feed listener is connected: a lost listener may have missed
+    activations, so the filter goes unready until a build that started after reconnecting.
+    Subscription imports bypass the outbox and NOTIFY a rebuild request instead, which also
+    leaves the filter unready until the new build. Cancelled and expired supporters stay in the
+    filter until the next periodic rebuild.
+    """
+
+    def __init__(self):
+        self._running = True
+        self._filter: BloomFilter | None = None
+        self._ready = False
+        self._generation = 0
+        # Supporters activated while a build streams, added to the new filter before the swap
+        self._pending: list[bytes] | None = None
+        self._rebuild = asyncio.Event()
+        registry.gauge(
+            "supporter_filter_bytes",
+            "Memory held by the supporter filter bit array",
+            callback=lambda: [((), self._filter.size_bytes if self._filter else 0)],
+        )
+        registry.gauge(
+            "supporter_filter_entries",
+            "Supporters added to the filter since it was built",
+            callback=lambda: [((), self._filter.count if self._filter else 0)],
+        )
+        registry.gauge(
+            "supporter_filter_false_positive_rate",
+            "Estimated false positive rate for the supporters added so far",
+            callback=lambda: [
+                ((), self._filter.estimated_false_positive_rate() if self._filter else 0.0)
+            ],
+        )
+
+    def might_have_access(self, supporter_id: uuid.UUID) -> bool:
+        """False only when the supporter certainly has no active subscription"""
+        if not self._ready:
+            supporter_filter_checks.inc(outcome="unready")
+            return True
+        if supporter_id.bytes in self._filter:
+            supporter_filter_checks.inc(outcome="maybe")
+            return True
+        supporter_filter_checks.inc(outcome="negative")
+        return False
+
+    def add(self, supporter_id: uuid.UUID) -> None:
+        if self._filter is not None:
+            self._filter.add(supporter_id.bytes)
+        if self._pending is not None:
+            self._pending.append(supporter_id.bytes)
+
+    def invalidate(self) -> None:
+        """Stop answering until a fresh build, after activations may have been missed"""
+        self._ready = False
+        self._generation += 1
+
+    def request_rebuild(self) -> None:
+        self._rebuild.set()
+
+    async def build(self) -> None:
+        """Stream active supporters of every shard into a new filter sized for them and swap
+        it in"""
+        started = time.perf_counter()
+        generation = self._generation
+        self._pending = []
+        try:
+
+            async def count_active(shard: Shard) -> int:
+                async with shard.session_factory() as session:
+                    return await session.scalar(
+                        select(func.count()).select_from(active_supporters_statement().subquery())
+                    )
+
+            counts = await asyncio.gather(*(count_active(shard) for shard in shard_router.shards))
+            bloom = BloomFilter(
+                int(sum(counts) * settings.SUPPORTER_FILTER_HEADROOM) + 1000,
+                settings.SUPPORTER_FILTER_FALSE_POSITIVE_RATE,
+            )
+            for shard in shard_router.shards:
+                async with shard.session_factory() as session:
+                    result = await session.stream(
+                        active_supporters_statement().execution_options(
+                            yield_per=settings.EXPORT_BATCH_SIZE
+                        )
+                    )
+                    async for supporter_ids in result.scalars().partitions():
+                        for supporter_id in supporter_ids:
+                            bloom.add(supporter_id.bytes)
+            for item in self._pending:
+                bloom.add(item)
+        finally:
+            self._pending = None
+
+        self._filter = bloom
+        # A listener drop during the build may have lost activations the build did not see
+        self._ready = generation == self._generation
+        supporter_filter_builds.observe(time.perf_counter() - started)
+        logger.info(
+            f"Built supporter filter: {bloom.count} supporters, {bloom.size_bytes} bytes, "
+            f"{bloom.num_hashes} hashes, ready={self._ready}"
+        )
+
+    async def run(self):
+        """Rebuild periodically, or right away when the change feed listener reconnects"""
+        if not settings.SUPPORTER_FILTER_ENABLED:
+            return
+        try:
+            while self._running:
+                try:
+                    await asyncio.wait_for(
+                        self._rebuild.wait(), settings.SUPPORTER_FILTER_REBUILD_SECONDS
+                    )
+                except TimeoutError:
+                    pass
+                if not self._running:
+                    break
+                self._rebuild.clear()
+                try:
+                    await self.build()
+                except Exception as e:
+                    logger.error(f"Supporter filter build failed: {e}")
+                    await asyncio.sleep(settings.CHANGE_FEED_RECONNECT_SECONDS)
+                    self._rebuild.set()
+        except asyncio.CancelledError:
+            logger.info("Supporter filter task cancelled")
+
+    def stop(self):
+        self._running = False
+        self._rebuild.set()
+
+
+supporter_filter = SupporterFilter()
@@ -0,0 +1,129 @@
+import asyncio
+import contextlib
+import logging
+import uuid
+from collections.abc import Sequence
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionFactory, ReadAsyncSessionFactory
+from app.core.sharding import Shard, shard_router
+from app.core.single_flight import SingleFlight
+from app.models.tier import Tier
+
+logger = logging.getLogger(__name__)
+
+# Columns of TierRead, selected as plain rows for read responses
+TIER_READ_COLUMNS = (
+    Tier.id,
+    Tier.creator_id,
+    Tier.name,
+    Tier.description,
+    Tier.price,
+    Tier.currency,
+    Tier.created_at,
+    Tier.updated_at,
+)
+
+tier_lookups = SingleFlight(
+    "get_tier",
+    max_wait=settings.SINGLE_FLIGHT_MAX_WAIT_SECONDS,
+    cache_ttl=settings.TIER_CACHE_TTL_SECONDS,
+    cache_size=settings.SINGLE_FLIGHT_CACHE_SIZE,
+)
+
+
+async def _lookup_tier(tier_id: uuid.UUID) -> dict | None:
+    async with ReadAsyncSessionFactory() as session:
+        result = await session.execute(select(*TIER_READ_COLUMNS).where(Tier.id == tier_id))
+        row = result.mappings().one_or_none()
+        return dict(row) if row else None
+
+
+async def get_tier_read(tier_id: uuid.UUID) -> dict | None:
+    """TierRead row shared by all concurrent callers asking for the same tier"""
+    return await tier_lookups.do(tier_id, lambda: _lookup_tier(tier_id))
+
+
+def upsert_tiers_statement(rows: Sequence[dict]):
+    """Insert tier rows read from the primary database, overwriting existing copies"""
+    statement = insert(Tier).values(list(rows))
+    return statement.on_conflict_do_update(
+        index_elements=[Tier.id],
+        set_={
+            column.name: statement.excluded[column.name]
+            for column in Tier.__table__.columns
+            if column.name != "id"
+        },
+    )
+
+
+async def delete_tier_copies(tier_id: uuid.UUID) -> bool:
+    """Delete the tier's copy on every shard, or on none when a shard still has subscriptions
+    to it; False in that case.
+
+    The primary database enforces this with the subscription foreign key, but shards only see
+    their own copy of the tier. Each shard's foreign key refuses to delete a referenced copy,
+    and a subscription to the tier committed meanwhile waits for the delete and then fails. The
+    caller deletes the primary row after this, with the row locked so no update of the tier
+    copies it back in between.
+    """
+    if not shard_router.sharded:
+        return True
+    async with contextlib.AsyncExitStack() as stack:
+        sessions = [
+            await stack.enter_async_context(shard.session_factory())
+            for shard in shard_router.shards
+        ]
+        results = await asyncio.gather(
+            *(session.execute(delete(Tier).where(Tier.id == tier_id)) for session in sessions),
+            return_exceptions=True,
+        )
+        for shard, result in zip(shard_router.shards, results, strict=True):
+            if isinstance(result, IntegrityError):
+                logger.info(f"Tier {tier_id} still has subscriptions on shard {shard.name}")
+                return False
+            if isinstance(result, Exception):
+                raise result
+        # A shard failing to commit keeps its copy until rebalance_shards --tiers-only
+        for session in sessions:
+            await session.commit()
+    return True
+
+
+async def replicate_tier(tier_id: uuid.UUID) -> None:
+    """Copy a tier from the primary database to every shard, or delete the copies when it is gone.
+
+    Shards join subscriptions to their own copy of the tier table. Runs after the change is
+    committed, so it never raises: a shard that cannot be updated is logged and caught up by
+    app.cli.rebalance_shards --tiers-only, which copies missing tiers and deletes copies of
+    deleted ones.
+    """
+    if not shard_router.sharded:
+        return
+    try:
+        async with AsyncSessionFactory() as session:
+            result = await session.execute(select(Tier.__table__).where(Tier.id == tier_id))
+            row = result.mappings().one_or_none()
+    except Exception as e:
+        logger.error(f"Failed to read tier {tier_id} for the shards: {e}")
+        return
+
+    async def apply(shard: Shard) -> None:
+        async with shard.session_factory() as session:
+            if row is None:
+                await session.execute(delete(Tier).where(Tier.id == tier_id))
+            else:
+                await session.execute(upsert_tiers_statement([dict(row)]))
+            await session.commit()
+
+    results = await asyncio.gather(
+        *(apply(shard) for shard in shard_router.shards), return_exceptions=True
+    )
+    for shard, result in zip(shard_router.shards, results, strict=True):
+        if isinstance(result, Exception):
+            logger.error(f"Failed to copy tier {tier_id} to shard {shard.name}: {result}")
@@ -0,0 +1,36 @@
+import asyncio
+import logging
+import uuid
+
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlmodel import select
+
+from app.models.tier import Tier
+from app.services.access import active_access_statement
+
+logger = logging.getLogger(__name__)
+
+
+async def _warm_connection(engine: AsyncEngine, opened: asyncio.Barrier) -> None:
+    try:
+        async with engine.connect() as connection:
+            # Hold every connection until all are open so each task gets a distinct one
+            await opened.wait()
+            async with AsyncSession(bind=connection) as session:
+                # Unknown ids still make asyncpg introspect types and prepare the hot statements
+                await session.execute(active_access_statement(uuid.uuid4(), uuid.uuid4()))
+                await session.execute(select(Tier).where(Tier.id == uuid.uuid4()))
+    except BaseException:
+        await opened.abort()
+        raise
+
+
+async def warm_up_pool(engine: AsyncEngine, connections: int) -> None:
+    """Open connections up front and prepare the hot statements on each of them"""
+    # Overflow connections are closed on checkin, so warming more than pool_size is wasted
+    connections = min(connections, engine.pool.size())
+    if connections <= 0:
+        return
+    opened = asyncio.Barrier(connections)
+    await asyncio.gather(*(_warm_connection(engine, opened) for _ in range(connections)))
+    logger.info(f"Warmed {connections} connections on {engine.url.host}")
@@ -0,0 +1,4 @@
+import os
+
+# Benchmarks measure the service, not debug logging or SQL echo. Runs before app settings load.
+os.environ.setdefault("APP_ENV", "production")
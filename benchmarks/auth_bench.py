@@ -0,0 +1,72 @@
+"""Compare bearer token verification cost with and without the verified-token cache.
+
+Usage: python -m benchmarks.auth_bench --token JWT [--requests N]
+
+Both scenarios resolve the user dependency for a minimal route through the ASGI stack in
+process: "uncached" uses auth_lib.auth.CurrentUserUUID, "cached" the caching wrapper from
+app.core.auth. The token must be valid for the configured auth_lib (e.g. issued by
+auth_service); it can also be passed through the AUTH_BENCH_TOKEN environment variable.
+"""
+
+import argparse
+import asyncio
+import os
+import time
+import uuid
+
+import httpx
+from auth_lib import auth
+from fastapi import FastAPI
+
+from app.core.auth import CurrentUserUUID
+from benchmarks.common import LatencyRecorder, write_report
+
+bench_app = FastAPI()
+
+
+@bench_app.get("/uncached")
+async def uncached(user_id: auth.CurrentUserUUID) -> uuid.UUID:
+    return user_id
+
+
+@bench_app.get("/cached")
+async def cached(user_id: CurrentUserUUID) -> uuid.UUID:
+    return user_id
+
+
+async def run_scenario(client: httpx.AsyncClient, path: str, requests: int) -> dict:
+    recorder = LatencyRecorder(path.strip("/"))
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = await client.get(path)
+        recorder.record(time.perf_counter() - started, ok=response.is_success)
+    recorder.finish()
+    return recorder.summary()
+
+
+async def main(args: argparse.Namespace) -> None:
+    headers = {"Authorization": f"Bearer {args.token}"}
+    transport = httpx.ASGITransport(app=bench_app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", headers=headers
+    ) as client:
+        # Warm imports, JWKS fetches or key parsing the first verification may do
+        await client.get("/uncached")
+        results = {
+            "uncached": await run_scenario(client, "/uncached", args.requests),
+            "cached": await run_scenario(client, "/cached", args.requests),
+        }
+    config = {"requests": args.requests}
+    write_report({"benchmark": "auth", "config": config, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--token", default=os.environ.get("AUTH_BENCH_TOKEN"))
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+    if not args.token:
+        parser.error("a valid token is required (--token or AUTH_BENCH_TOKEN)")
+
+    asyncio.run(main(args))
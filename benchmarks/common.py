@@ -0,0 +1,92 @@
+import hashlib
+import json
+import math
+import platform
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+
+
+def seeded_uuid(name: str) -> uuid.UUID:
+    """Same value as md5(name)::uuid in Postgres, so seeds and load generators agree on ids"""
+    return uuid.UUID(hashlib.md5(name.encode()).hexdigest())
+
+
+def creator_id(index: int) -> uuid.UUID:
+    return seeded_uuid(f"creator-{index}")
+
+
+def tier_id(creator_index: int, tier_index: int) -> uuid.UUID:
+    return seeded_uuid(f"tier-{creator_index}-{tier_index}")
+
+
+def supporter_id(index: int) -> uuid.UUID:
+    return seeded_uuid(f"supporter-{index}")
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)) - 1, 0)
+    return sorted_values[rank]
+
+
+@dataclass
+class LatencyRecorder:
+    """Collects per-operation latencies and errors for one scenario"""
+
+    name: str
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: float | None = None
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+
+    def finish(self) -> None:
+        self.finished_at = time.perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        values = sorted(self.latencies)
+        return {
+            "operations": len(values),
+            "errors": self.errors,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_per_s": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 0.50) * 1000, 3),
+            "p95_ms": round(percentile(values, 0.95) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "max_ms": round(values[-1] * 1000, 3) if values else 0.0,
+        }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_report(report: dict, output: str | None) -> None:
+    report = {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        **report,
+    }
+    payload = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as f:
+            f.write(payload + "\n")
+    sys.stdout.write(payload + "\n")
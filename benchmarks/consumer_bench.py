@@ -0,0 +1,125 @@
+"""Measure payment event throughput of the Kafka consumer path against a local Postgres.
+
+Usage: python -m benchmarks.consumer_bench [--events N] [--rate N] [--key-skew X] [--duplicates X]
+
+A synthetic stream of payment.succeeded events is replayed through KafkaClient,
+MessageProcessor and SubscriptionHandler using the in-memory consumer backend, so no broker
+is needed. Tier ids come from benchmarks.seed, which must have run first.
+Reports events/sec, produce-to-commit latency and SQL statements per event as JSON.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import logging
+import random
+import time
+import uuid
+
+from app.core.database import dispose_engines
+from app.core.instrumentation import queries_per_operation
+from app.core.kafka_client import KafkaClient
+from app.core.kafka_memory import InMemoryConsumer
+from benchmarks.common import LatencyRecorder, supporter_id, tier_id, write_report
+
+logger = logging.getLogger(__name__)
+
+
+def synthetic_payment_events(args: argparse.Namespace):
+    """Yield (key, payload) pairs with skewed supporters and a share of redelivered payments"""
+    rng = random.Random(args.seed)
+    sent: list[tuple[bytes, bytes]] = []
+    for _ in range(args.events):
+        if sent and rng.random() < args.duplicates:
+            yield rng.choice(sent)
+            continue
+        # key_skew > 1 concentrates events on few supporters, 1 is uniform
+        supporter = supporter_id(1 + int(rng.random() ** args.key_skew * args.supporters))
+        creator = 1 + int(rng.random() ** 3 * args.creators)
+        event = {
+            "event_type": "payment.succeeded",
+            "payment_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "user_id": str(supporter),
+            "tier_id": str(tier_id(creator, 1 + rng.randrange(args.tiers_per_creator))),
+            "amount": 500,
+            "currency": "usd",
+            "paid_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "stripe_checkout_session_id": f"cs_bench_{rng.getrandbits(48):x}",
+        }
+        message = (str(supporter).encode(), json.dumps(event).encode())
+        sent.append(message)
+        yield message
+
+
+async def produce(backend: InMemoryConsumer, args: argparse.Namespace) -> None:
+    interval = 1 / args.rate if args.rate else 0
+    started = time.perf_counter()
+    for index, (key, value) in enumerate(synthetic_payment_events(args)):
+        backend.produce(value, key=key)
+        if interval:
+            delay = started + (index + 1) * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        elif index % 1000 == 0:
+            await asyncio.sleep(0)
+
+
+async def wait_until_drained(backend: InMemoryConsumer, consumer_task: asyncio.Task) -> None:
+    """Wait until every produced message was polled and commits stopped coming in"""
+    committed = -1
+    while not consumer_task.done():
+        await asyncio.sleep(0.5)
+        if backend.pending == 0 and len(backend.commit_latencies) == committed:
+            return
+        committed = len(backend.commit_latencies)
+
+
+async def main(args: argparse.Namespace) -> None:
+    backend = InMemoryConsumer(topic="payment_events", partitions=args.partitions)
+    client = KafkaClient(consumer_factory=backend)
+    operation = f"kafka:{backend.topic}"
+    events_before, statements_before = queries_per_operation.totals(operation=operation)
+
+    recorder = LatencyRecorder("consume")
+    try:
+        consumer_task = asyncio.create_task(client.consume_messages())
+        await produce(backend, args)
+        await wait_until_drained(backend, consumer_task)
+        recorder.finish()
+        client.close_consumer()
+        await consumer_task
+    finally:
+        await dispose_engines()
+
+    for latency in backend.commit_latencies:
+        recorder.record(latency)
+    events_after, statements_after = queries_per_operation.totals(operation=operation)
+    events = events_after - events_before
+    summary = recorder.summary()
+    summary["failed_events"] = args.events - len(backend.commit_latencies)
+    summary["statements_per_event"] = (
+        round((statements_after - statements_before) / events, 2) if events else 0.0
+    )
+    config = {
+        key: getattr(args, key)
+        for key in ("events", "rate", "key_skew", "duplicates", "partitions", "seed")
+    }
+    write_report({"benchmark": "consumer", "config": config, "results": summary}, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--rate", type=float, default=0, help="Events/sec to produce, 0 = burst")
+    parser.add_argument("--key-skew", type=float, default=2.0)
+    parser.add_argument("--duplicates", type=float, default=0.05, help="Share of redeliveries")
+    parser.add_argument("--partitions", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--creators", type=int, default=100_000)
+    parser.add_argument("--tiers-per-creator", type=int, default=3)
+    parser.add_argument("--supporters", type=int, default=500_000)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
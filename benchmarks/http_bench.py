@@ -0,0 +1,186 @@
+"""Drive the HTTP endpoints at fixed concurrency and report throughput and latency as JSON.
+
+Usage: python -m benchmarks.http_bench [--scenarios a,b] [--concurrency N] [--duration S]
+
+Requests go through the ASGI app in process, so no server, auth service or payment service
+is needed: CurrentUserUUID is replaced by a dependency reading the X-Bench-User header and the
+payment service call is answered by an httpx mock transport. Seed the database with
+benchmarks.seed first and run with the same --creators/--tiers-per-creator/--supporters.
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+import uuid
+from collections.abc import Awaitable, Callable
+from unittest import mock
+
+import httpx
+from fastapi import Request
+from sqlalchemy import text
+
+from app.core.auth import CurrentUserUUID
+from app.core.database import ReadAsyncSessionFactory, dispose_engines
+from app.main import app
+from benchmarks.common import LatencyRecorder, creator_id, supporter_id, tier_id, write_report
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_PAIRS = text(
+    """
+    SELECT s.supporter_id, t.creator_id
+    FROM subscription s JOIN tier t ON t.id = s.tier_id
+    WHERE s.status = 'ACTIVE' AND s.expires_at > now()
+    ORDER BY s.id
+    LIMIT :limit
+    """
+)
+
+Scenario = Callable[[httpx.AsyncClient, random.Random], Awaitable[httpx.Response]]
+
+
+def _bench_user(request: Request) -> uuid.UUID:
+    return uuid.UUID(request.headers["x-bench-user"])
+
+
+def _payment_service(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(
+        200,
+        json={"session_id": "cs_bench", "checkout_url": "https://checkout.invalid/cs_bench"},
+    )
+
+
+def build_scenarios(args: argparse.Namespace, active_pairs: list[tuple]) -> dict[str, Scenario]:
+    def random_creator(rng: random.Random) -> int:
+        # Mirror the seed's power-law popularity so hot creators get most of the traffic
+        return 1 + int(rng.random() ** 3 * args.creators)
+
+    async def check_access(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        if active_pairs and rng.random() < args.hit_ratio:
+            supporter, creator = rng.choice(active_pairs)
+        else:
+            supporter = supporter_id(rng.randint(1, args.supporters))
+            creator = creator_id(random_creator(rng))
+        return await client.get(
+            "/internal/check-access",
+            params={"supporter_id": str(supporter), "creator_id": str(creator)},
+        )
+
+    async def get_tier(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        tier = tier_id(random_creator(rng), rng.randint(1, args.tiers_per_creator))
+        return await client.get(f"/tier/tiers/{tier}")
+
+    async def list_tiers(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        return await client.get(f"/tier/users/{creator_id(random_creator(rng))}/tiers")
+
+    async def list_subscriptions(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        supporter = supporter_id(rng.randint(1, args.supporters))
+        return await client.get(f"/subscriptions/users/{supporter}/subscriptions")
+
+    async def create_subscription(client: httpx.AsyncClient, rng: random.Random) -> httpx.Response:
+        # Fresh supporters never hit the "already subscribed" conflict
+        return await client.post(
+            "/subscriptions/subscriptions",
+            json={"tier_id": str(tier_id(random_creator(rng), 1))},
+            headers={"X-Bench-User": str(uuid.UUID(int=rng.getrandbits(128)))},
+        )
+
+    return {
+        "check_access": check_access,
+        "get_tier": get_tier,
+        "list_tiers": list_tiers,
+        "list_subscriptions": list_subscriptions,
+        "create_subscription": create_subscription,
+    }
+
+
+def _ok(response: httpx.Response) -> bool:
+    # A 404 from check-access is a valid "denied" answer, not an error
+    return response.status_code < httpx.codes.INTERNAL_SERVER_ERROR
+
+
+async def run_scenario(
+    name: str, scenario: Scenario, client: httpx.AsyncClient, args: argparse.Namespace
+) -> dict:
+    async def worker(worker_id: int, recorder: LatencyRecorder | None, deadline: float) -> None:
+        rng = random.Random(f"{args.seed}-{name}-{worker_id}")
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = _ok(await scenario(client, rng))
+            except httpx.HTTPError:
+                ok = False
+            if recorder is not None:
+                recorder.record(time.perf_counter() - start, ok)
+
+    async def run(recorder: LatencyRecorder | None, seconds: float) -> None:
+        deadline = time.perf_counter() + seconds
+        await asyncio.gather(*(worker(i, recorder, deadline) for i in range(args.concurrency)))
+
+    await run(None, args.warmup)
+    recorder = LatencyRecorder(name)
+    await run(recorder, args.duration)
+    recorder.finish()
+    logger.info(f"{name}: {recorder.summary()}")
+    return recorder.summary()
+
+
+async def load_active_pairs(limit: int) -> list[tuple]:
+    async with ReadAsyncSessionFactory() as session:
+        result = await session.execute(ACTIVE_PAIRS, {"limit": limit})
+        return [tuple(row) for row in result.all()]
+
+
+async def main(args: argparse.Namespace) -> None:
+    app.dependency_overrides[CurrentUserUUID.__metadata__[0].dependency] = _bench_user
+    payment_transport = httpx.MockTransport(_payment_service)
+    real_async_client = httpx.AsyncClient
+
+    def payment_client(*client_args, **client_kwargs) -> httpx.AsyncClient:
+        return real_async_client(transport=payment_transport)
+
+    try:
+        active_pairs = await load_active_pairs(args.active_pairs)
+        scenarios = build_scenarios(args, active_pairs)
+        results = {}
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://bench",
+            headers={"Authorization": "Bearer bench", "X-Bench-User": str(supporter_id(1))},
+        ) as client:
+            with mock.patch("app.api.routers.subscription.httpx.AsyncClient", payment_client):
+                for name in args.scenarios.split(","):
+                    results[name] = await run_scenario(name, scenarios[name], client, args)
+    finally:
+        await dispose_engines()
+
+    config = {
+        key: getattr(args, key)
+        for key in ("concurrency", "duration", "warmup", "seed", "hit_ratio", "creators")
+    }
+    write_report({"benchmark": "http", "config": config, "results": results}, args.output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--scenarios",
+        default="check_access,get_tier,list_tiers,list_subscriptions,create_subscription",
+    )
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--duration", type=float, default=20.0, help="Measured seconds per scenario"
+    )
+    parser.add_argument("--warmup", type=float, default=3.0, help="Unmeasured seconds per scenario")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--hit-ratio", type=float, default=0.3, help="Share of granted checks")
+    parser.add_argument("--active-pairs", type=int, default=10_000)
+    parser.add_argument("--creators", type=int, default=100_000)
+    parser.add_argument("--tiers-per-creator", type=int, default=3)
+    parser.add_argument("--supporters", type=int, default=500_000)
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
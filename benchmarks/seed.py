@@ -0,0 +1,107 @@
+"""Seed a local Postgres with a reproducible benchmark data set.
+
+Usage: python -m benchmarks.seed [--creators N] [--subscriptions N] [--reset]
+
+Ids are md5-derived (see benchmarks.common), creator popularity follows a power law and
+random() is seeded, so two runs with the same arguments produce the same rows.
+The schema must already exist (alembic upgrade head).
+"""
+
+import argparse
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+from app.core.database import async_engine, dispose_engines
+
+logger = logging.getLogger(__name__)
+
+SEED_TIERS = text(
+    """
+    INSERT INTO tier (id, creator_id, name, description, price, currency, created_at, updated_at)
+    SELECT md5('tier-' || c || '-' || t)::uuid,
+           md5('creator-' || c)::uuid,
+           'Tier ' || t,
+           repeat('Exclusive posts, early access and behind the scenes. ', 8),
+           t * 5.0,
+           'usd',
+           now() - interval '400 days',
+           now() - interval '400 days'
+    FROM generate_series(1, :creators) AS c, generate_series(1, :tiers_per_creator) AS t
+    """
+)
+
+# Power-law creator popularity: a few creators hold most of the supporters
+SEED_SUBSCRIPTIONS = text(
+    """
+    INSERT INTO subscription
+        (id, supporter_id, tier_id, status, started_at, expires_at, created_at, updated_at)
+    SELECT md5('subscription-' || s)::uuid,
+           md5('supporter-' || (1 + (s * 7919) % :supporters))::uuid,
+           md5('tier-' || (1 + floor(power(random(), 3) * :creators)::int)
+               || '-' || (1 + floor(random() * :tiers_per_creator)::int))::uuid,
+           (CASE WHEN s % 10 < 7 THEN 'ACTIVE' WHEN s % 10 < 9 THEN 'INACTIVE' ELSE 'CANCELLED'
+            END)::subscriptionstatus,
+           now() - interval '1 day' * (random() * 365),
+           CASE WHEN s % 10 < 7 THEN now() + interval '1 day' * (1 + random() * 29)
+                ELSE now() - interval '1 day' * (random() * 365) END,
+           now() - interval '1 day' * (random() * 365),
+           now() - interval '1 day' * (random() * 30)
+    FROM generate_series(1, :subscriptions) AS s
+    """
+)
+
+
+async def seed(
+    creators: int, tiers_per_creator: int, supporters: int, subscriptions: int, reset: bool
+) -> None:
+    params = {
+        "creators": creators,
+        "tiers_per_creator": tiers_per_creator,
+        "supporters": supporters,
+        "subscriptions": subscriptions,
+    }
+    async with async_engine.begin() as connection:
+        if reset:
+            await connection.execute(text("TRUNCATE subscription, tier CASCADE"))
+        # A serial plan keeps random() deterministic after setseed
+        await connection.execute(text("SET LOCAL max_parallel_workers_per_gather = 0"))
+        await connection.execute(text("SELECT setseed(0.42)"))
+
+        start = time.perf_counter()
+        await connection.execute(SEED_TIERS, params)
+        logger.info(
+            f"Seeded {creators * tiers_per_creator} tiers in {time.perf_counter() - start:.1f}s"
+        )
+
+        start = time.perf_counter()
+        await connection.execute(SEED_SUBSCRIPTIONS, params)
+        logger.info(f"Seeded {subscriptions} subscriptions in {time.perf_counter() - start:.1f}s")
+
+    async with async_engine.connect() as connection:
+        await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("VACUUM ANALYZE tier"))
+        await connection.execute(text("VACUUM ANALYZE subscription"))
+
+
+async def main(args: argparse.Namespace) -> None:
+    try:
+        await seed(
+            args.creators, args.tiers_per_creator, args.supporters, args.subscriptions, args.reset
+        )
+    finally:
+        await dispose_engines()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--creators", type=int, default=100_000)
+    parser.add_argument("--tiers-per-creator", type=int, default=3)
+    parser.add_argument("--supporters", type=int, default=500_000)
+    parser.add_argument("--subscriptions", type=int, default=1_000_000)
+    parser.add_argument("--reset", action="store_true", help="Truncate tier and subscription first")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main(parser.parse_args()))
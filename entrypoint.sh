@@ -15,6 +15,11 @@ echo "Waiting for database to be ready..."
 echo "Running database migrations..."
 # Ensure Alembic uses the correct config (usually auto-detected via alembic.ini)
 alembic upgrade head
+# Every subscription shard carries the full schema
+for shard in $(python -c "from app.core.config import settings; print(' '.join(settings.SUBSCRIPTION_SHARDS))"); do
+  echo "Migrating shard $shard..."
+  alembic -x shard="$shard" upgrade head
+done
 
 echo "Migrations finished."
 
@@ -0,0 +1,10 @@
+import os
+
+# Settings are read at import; the unit tests never connect, so any server will do
+for name, value in {
+    "POSTGRES_SERVER": "localhost",
+    "POSTGRES_USER": "postgres",
+    "POSTGRES_PASSWORD": "postgres",
+    "POSTGRES_DB": "subscription_test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,85 @@
+"""Fixtures for the integration tests, which run the service against a primary database and
+two or more shard databases.
+
+They are skipped unless SHARDED_INTEGRATION_TESTS=1, because every test truncates all tables
+of the configured databases. SUBSCRIPTION_SHARDS and POSTGRES_* must point at disposable
+databases, such as the ones docker-compose.test.yml starts.
+"""
+
+import os
+import subprocess
+import sys
+import uuid
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi import Request
+from sqlalchemy import text
+from sqlmodel import SQLModel
+
+from app.core.auth import CurrentUserUUID
+from app.core.database import AsyncSessionFactory, dispose_engines
+from app.core.sharding import shard_router
+from app.main import app
+
+ENABLED = os.environ.get("SHARDED_INTEGRATION_TESTS") == "1"
+ROOT = Path(__file__).resolve().parents[2]
+MIN_SHARDS = 2
+
+
+def pytest_collection_modifyitems(config, items):
+    if ENABLED and len(shard_router.shards) < MIN_SHARDS:
+        raise pytest.UsageError("Integration tests need two or more SUBSCRIPTION_SHARDS")
+    if ENABLED:
+        return
+    skip = pytest.mark.skip(reason="set SHARDED_INTEGRATION_TESTS=1 and the test databases")
+    for item in items:
+        if Path(item.fspath).is_relative_to(Path(__file__).parent):
+            item.add_marker(skip)
+
+
+@pytest.fixture(scope="session")
+def migrated() -> None:
+    """Migrate the primary database and every shard once per run"""
+    commands = [["upgrade", "head"]]
+    commands += [["-x", f"shard={shard.name}", "upgrade", "head"] for shard in shard_router.shards]
+    for command in commands:
+        subprocess.run([sys.executable, "-m", "alembic", *command], cwd=ROOT, check=True)
+
+
+async def _truncate(session_factory) -> None:
+    tables = ", ".join(table.name for table in SQLModel.metadata.sorted_tables)
+    async with session_factory() as session:
+        await session.execute(text(f"TRUNCATE {tables} CASCADE"))
+        await session.commit()
+
+
+@pytest.fixture
+async def databases(migrated):
+    """Empty primary and shard databases; pools are disposed after the test, whose event
+    loop they are bound to"""
+    await _truncate(AsyncSessionFactory)
+    for shard in shard_router.shards:
+        await _truncate(shard.session_factory)
+    yield
+    await dispose_engines()
+
+
+def _test_user(request: Request) -> uuid.UUID:
+    return uuid.UUID(request.headers["x-test-user"])
+
+
+@pytest.fixture
+async def client(databases):
+    """Client for the ASGI app authenticating as the user in the X-Test-User header"""
+    app.dependency_overrides[CurrentUserUUID.__metadata__[0].dependency] = _test_user
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://test",
+            headers={"Authorization": "Bearer test"},
+        ) as http_client:
+            yield http_client
+    finally:
+        app.dependency_overrides.clear()
@@ -0,0 +1,3 @@
+-- Shard databases next to the primary subscription_test database of docker-compose.test.yml
+CREATE DATABASE subscription_test_s0;
+CREATE DATABASE subscription_test_s1;
@@ -0,0 +1,48 @@
+"""Helpers placing supporters on shards and feeding payments through the consumer path"""
+
+import asyncio
+import uuid
+
+from app.core.kafka_client import KafkaClient
+from app.core.kafka_memory import InMemoryConsumer
+from app.core.sharding import Shard, shard_router
+from app.schemas.kafka_events import PaymentSucceededEvent
+
+CONSUME_TIMEOUT_SECONDS = 30
+
+
+def supporter_on(shard: Shard) -> uuid.UUID:
+    """A new supporter id whose bucket belongs to the shard"""
+    while True:
+        supporter_id = uuid.uuid4()
+        if shard_router.shard_for(supporter_id) is shard:
+            return supporter_id
+
+
+def payment(supporter_id: uuid.UUID, tier_id: uuid.UUID) -> PaymentSucceededEvent:
+    return PaymentSucceededEvent(
+        payment_id=uuid.uuid4(),
+        user_id=supporter_id,
+        tier_id=tier_id,
+        amount=500,
+        currency="usd",
+        paid_at="2026-01-01T00:00:00Z",
+        stripe_checkout_session_id=f"cs_{uuid.uuid4().hex}",
+    )
+
+
+async def consume(events: list[PaymentSucceededEvent]) -> InMemoryConsumer:
+    """Run payment events through the Kafka consumer path until all are committed"""
+    consumer = InMemoryConsumer(partitions=1)
+    for event in events:
+        consumer.produce(event.model_dump_json().encode(), key=str(event.user_id).encode())
+    kafka_client = KafkaClient(consumer)
+    task = asyncio.create_task(kafka_client.consume_messages())
+    try:
+        async with asyncio.timeout(CONSUME_TIMEOUT_SECONDS):
+            while consumer.committed.get(0, 0) < len(events):
+                await asyncio.sleep(0.05)
+    finally:
+        kafka_client.close_consumer()
+        await task
+    return consumer
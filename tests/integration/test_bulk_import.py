@@ -0,0 +1,68 @@
+"""Bulk subscription import into a real shard database"""
+
+import datetime
+import io
+import json
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app.core.sharding import shard_router
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+from app.services.bulk_import import SUBSCRIPTIONS, RejectWriter, import_rows, read_rows
+
+STARTED_AT = datetime.datetime(2025, 1, 1, tzinfo=datetime.UTC)
+
+
+def ndjson(*rows: dict) -> io.StringIO:
+    return io.StringIO("".join(json.dumps(row) + "\n" for row in rows))
+
+
+@pytest.mark.asyncio
+async def test_rows_resolving_to_one_subscription_keep_the_last_and_reject_the_rest(databases):
+    shard = shard_router.shards[0]
+    supporter_id = uuid.uuid4()
+    tier = Tier(creator_id=uuid.uuid4(), name="Gold", price=5.0)
+    existing = Subscription(
+        supporter_id=supporter_id,
+        tier_id=tier.id,
+        status=SubscriptionStatus.ACTIVE,
+        started_at=STARTED_AT,
+        expires_at=STARTED_AT + datetime.timedelta(days=30),
+    )
+    async with shard.session_factory() as session:
+        session.add(tier)
+        await session.flush()
+        session.add(existing)
+        await session.commit()
+
+    row = {
+        "supporter_id": str(supporter_id),
+        "tier_id": str(tier.id),
+        "status": "active",
+        "started_at": STARTED_AT.isoformat(),
+    }
+    # The explicit id and the (supporter_id, tier_id) of the second row name the same row
+    source = ndjson(
+        {**row, "id": str(existing.id), "expires_at": "2025-03-01T00:00:00+00:00"},
+        {**row, "expires_at": "2025-04-01T00:00:00+00:00"},
+    )
+    rejects = io.StringIO()
+    async with shard.engine.connect() as connection:
+        raw_connection = await connection.get_raw_connection()
+        report = await import_rows(
+            raw_connection.driver_connection,
+            SUBSCRIPTIONS,
+            read_rows(source, "ndjson"),
+            RejectWriter(rejects),
+            batch_size=10,
+        )
+
+    assert (report.merged, report.rejected) == (1, 1)
+    assert "duplicate subscription in file" in rejects.getvalue()
+    async with shard.session_factory() as session:
+        (stored,) = (await session.execute(select(Subscription))).scalars()
+    assert stored.id == existing.id
+    assert stored.expires_at == datetime.datetime(2025, 4, 1, tzinfo=datetime.UTC)
@@ -0,0 +1,197 @@
+"""Subscriptions sharded by supporter_id over real Postgres databases: routing of the consumer,
+checkout and cancel, creator-scoped fan-out and the rebalance tool."""
+
+import datetime
+import json
+import uuid
+from unittest import mock
+
+import httpx
+import pytest
+from fastapi import status
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionFactory
+from app.core.sharding import Shard, shard_router
+from app.models.subscription import Subscription, SubscriptionStatus
+from app.models.tier import Tier
+from app.services.rebalance import move_misplaced, sync_tiers
+from tests.integration.shards import consume, payment, supporter_on
+
+CREATOR = uuid.UUID("00000000-0000-4000-8000-00000000c0de")
+
+
+async def subscriptions_on(shard: Shard, supporter_id: uuid.UUID) -> list[Subscription]:
+    async with shard.session_factory() as session:
+        result = await session.execute(
+            select(Subscription).where(Subscription.supporter_id == supporter_id)
+        )
+        return list(result.scalars())
+
+
+async def tier_on(shard: Shard, tier_id: uuid.UUID) -> Tier | None:
+    async with shard.session_factory() as session:
+        return await session.get(Tier, tier_id)
+
+
+async def create_tier(client: httpx.AsyncClient) -> uuid.UUID:
+    response = await client.post(
+        "/tier/tiers",
+        json={"name": "Gold", "price": 5.0, "currency": "usd"},
+        headers={"X-Test-User": str(CREATOR)},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    return uuid.UUID(response.json()["id"])
+
+
+async def add_subscription(shard: Shard, supporter_id: uuid.UUID, tier_id: uuid.UUID) -> uuid.UUID:
+    """Insert an active subscription directly, bypassing routing"""
+    now = datetime.datetime.now(datetime.UTC)
+    subscription = Subscription(
+        supporter_id=supporter_id,
+        tier_id=tier_id,
+        status=SubscriptionStatus.ACTIVE,
+        started_at=now,
+        expires_at=now + datetime.timedelta(days=30),
+    )
+    async with shard.session_factory() as session:
+        session.add(subscription)
+        await session.commit()
+    return subscription.id
+
+
+@pytest.mark.asyncio
+async def test_tiers_are_copied_to_every_shard(client):
+    tier_id = await create_tier(client)
+
+    for shard in shard_router.shards:
+        assert await tier_on(shard, tier_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_consumer_writes_each_payment_to_the_supporters_shard(client):
+    tier_id = await create_tier(client)
+    supporters = {shard.name: supporter_on(shard) for shard in shard_router.shards}
+
+    await consume([payment(supporter_id, tier_id) for supporter_id in supporters.values()])
+
+    for owner in shard_router.shards:
+        supporter_id = supporters[owner.name]
+        for shard in shard_router.shards:
+            rows = await subscriptions_on(shard, supporter_id)
+            assert len(rows) == (1 if shard is owner else 0), (owner.name, shard.name)
+
+
+@pytest.mark.asyncio
+async def test_checkout_and_cancel_use_the_supporters_shard(client):
+    tier_id = await create_tier(client)
+    owner, other = shard_router.shards[0], shard_router.shards[1]
+    subscribed, misplaced = supporter_on(owner), supporter_on(owner)
+    subscription_id = await add_subscription(owner, subscribed, tier_id)
+    # A row on a shard that does not own the supporter must be invisible to checkout
+    await add_subscription(other, misplaced, tier_id)
+
+    payment_client = httpx.AsyncClient(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(
+                200, json={"session_id": "cs_test", "checkout_url": "https://checkout.invalid"}
+            )
+        )
+    )
+    with mock.patch("app.api.routers.subscription.httpx.AsyncClient", return_value=payment_client):
+        duplicate = await client.post(
+            "/subscriptions/subscriptions",
+            json={"tier_id": str(tier_id)},
+            headers={"X-Test-User": str(subscribed)},
+        )
+        fresh = await client.post(
+            "/subscriptions/subscriptions",
+            json={"tier_id": str(tier_id)},
+            headers={"X-Test-User": str(misplaced)},
+        )
+    assert duplicate.status_code == status.HTTP_409_CONFLICT
+    assert fresh.status_code == status.HTTP_200_OK, fresh.text
+
+    cancelled = await client.post(
+        f"/subscriptions/subscriptions/{subscription_id}/cancel",
+        headers={"X-Test-User": str(subscribed)},
+    )
+    assert cancelled.status_code == status.HTTP_200_OK, cancelled.text
+    [row] = await subscriptions_on(owner, subscribed)
+    assert row.status == SubscriptionStatus.CANCELLED
+
+    listed = await client.get(f"/subscriptions/users/{subscribed}/subscriptions")
+    assert [item["id"] for item in listed.json()] == [str(subscription_id)]
+
+
+@pytest.mark.asyncio
+async def test_creator_reads_fan_out_to_every_shard(client):
+    tier_id = await create_tier(client)
+    supporters = [supporter_on(shard) for shard in shard_router.shards for _ in range(2)]
+    await consume([payment(supporter_id, tier_id) for supporter_id in supporters])
+    creator = {"X-Test-User": str(CREATOR)}
+
+    analytics = await client.get("/analytics/creators/me", headers=creator)
+    assert analytics.status_code == status.HTTP_200_OK, analytics.text
+    [tier] = analytics.json()["tiers"]
+    assert tier["active_supporters"] == len(supporters)
+
+    export = await client.get(
+        "/subscriptions/creators/me/subscriptions/export",
+        params={"format": "ndjson"},
+        headers=creator,
+    )
+    assert export.status_code == status.HTTP_200_OK
+    exported = {json.loads(line)["supporter_id"] for line in export.text.splitlines()}
+    assert exported == {str(supporter_id) for supporter_id in supporters}
+
+
+@pytest.mark.asyncio
+async def test_deleting_a_tier_with_subscriptions_on_a_shard_fails(client):
+    tier_id = await create_tier(client)
+    shard = shard_router.shards[-1]
+    await add_subscription(shard, supporter_on(shard), tier_id)
+
+    response = await client.delete(f"/tier/tiers/{tier_id}", headers={"X-Test-User": str(CREATOR)})
+
+    assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+    assert response.json()["detail"] == "Could not delete tier"
+    async with AsyncSessionFactory() as session:
+        assert await session.get(Tier, tier_id) is not None
+    # No shard lost its copy, including the ones without subscriptions
+    for copy_shard in shard_router.shards:
+        assert await tier_on(copy_shard, tier_id) is not None
+
+
+@pytest.mark.asyncio
+async def test_rebalance_copies_then_deletes_misplaced_rows(client):
+    tier_id = await create_tier(client)
+    source, owner = shard_router.shards[0], shard_router.shards[1]
+    supporter_id = supporter_on(owner)
+    subscription_id = await add_subscription(source, supporter_id, tier_id)
+    table = Subscription.__table__
+
+    copied = await move_misplaced(table, source, 100, copy_only=True, dry_run=False)
+    assert (copied.misplaced, copied.deleted, copied.targets) == (1, 0, {owner.name})
+    assert [row.id for row in await subscriptions_on(source, supporter_id)] == [subscription_id]
+    assert [row.id for row in await subscriptions_on(owner, supporter_id)] == [subscription_id]
+
+    moved = await move_misplaced(table, source, 100, copy_only=False, dry_run=False)
+    assert (moved.misplaced, moved.deleted) == (1, 1)
+    assert await subscriptions_on(source, supporter_id) == []
+    assert [row.id for row in await subscriptions_on(owner, supporter_id)] == [subscription_id]
+
+
+@pytest.mark.asyncio
+async def test_sync_tiers_deletes_copies_of_deleted_tiers(client):
+    kept, dropped = await create_tier(client), await create_tier(client)
+    async with AsyncSessionFactory() as session:
+        await session.delete(await session.get(Tier, dropped))
+        await session.commit()
+
+    copied, deleted = await sync_tiers(100)
+
+    assert (copied, deleted) == (1, len(shard_router.shards))
+    for shard in shard_router.shards:
+        assert await tier_on(shard, kept) is not None
+        assert await tier_on(shard, dropped) is None
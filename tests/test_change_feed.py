@@ -0,0 +1,67 @@
+"""Change feed streams without a database: the outbox reads are replaced with fixed rows"""
+
+import asyncio
+
+import pytest
+
+from app.services import change_feed as change_feed_module
+from app.services.change_feed import ChangeFeedHub, stream_changes
+
+# Outbox id 10 was inserted before id 11 but its transaction committed later
+EARLY_ID, LATE_ID, NEW_ID = 11, 10, 12
+
+
+def change(event_id: int) -> dict:
+    return {"cursor": event_id, "supporter_id": "s", "creator_id": "c", "expires_at": None}
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    """A fresh hub over an outbox holding the two rows at (txid, id) positions"""
+    rows = [((5, EARLY_ID), change(EARLY_ID)), ((6, LATE_ID), change(LATE_ID))]
+
+    async def changes_after(after, limit):
+        return [row for row in rows if row[0] > after][:limit]
+
+    async def end_position():
+        return rows[-1][0]
+
+    async def resume_position(cursor):
+        return next((position for position, row in rows if row["cursor"] == cursor), (0, 0))
+
+    hub = ChangeFeedHub()
+    monkeypatch.setattr(change_feed_module, "change_feed", hub)
+    monkeypatch.setattr(change_feed_module, "changes_after", changes_after)
+    monkeypatch.setattr(change_feed_module, "_end_position", end_position)
+    monkeypatch.setattr(change_feed_module, "resume_position", resume_position)
+    monkeypatch.setattr(change_feed_module.settings, "CHANGE_FEED_HEARTBEAT_SECONDS", 30.0)
+    return hub
+
+
+@pytest.mark.asyncio
+async def test_backlog_follows_transaction_order_and_resumes_after_the_cursor(hub):
+    stream = stream_changes(EARLY_ID)
+    assert (await anext(stream))["cursor"] == LATE_ID
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_live_rows_already_in_the_backlog_are_dropped(hub):
+    stream = stream_changes(0)
+    assert [(await anext(stream))["cursor"] for _ in range(2)] == [EARLY_ID, LATE_ID]
+    hub._fan_out((6, LATE_ID), change(LATE_ID))
+    hub._fan_out((7, NEW_ID), change(NEW_ID))
+    assert (await anext(stream))["cursor"] == NEW_ID
+    await stream.aclose()
+
+
+@pytest.mark.asyncio
+async def test_closed_stream_ends_without_waiting_for_the_heartbeat(hub):
+    stream = stream_changes(EARLY_ID)
+    await anext(stream)
+    waiting = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0.05)
+    hub.stop()
+
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(waiting, 1)
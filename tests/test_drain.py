@@ -0,0 +1,219 @@
+"""Shutdown drain of the Kafka consumer, driven through the app lifespan without a broker or
+database: the in-memory consumer backend serves the messages and every background worker and
+engine disposal is replaced with a recorder."""
+
+import asyncio
+import signal
+import socket
+
+import pytest
+import uvicorn
+from confluent_kafka import KafkaException
+
+import app.main
+from app.core.health import readiness
+from app.core.kafka_client import KafkaClient
+from app.core.kafka_memory import InMemoryConsumer
+from app.services import change_feed as change_feed_module
+from app.services.change_feed import ChangeFeedHub
+
+
+class RecordingConsumer(InMemoryConsumer):
+    """In-memory consumer logging commits next to the shutdown steps"""
+
+    def __init__(self, events: list[str], failing_commits: int = 0):
+        super().__init__(partitions=1)
+        self.events = events
+        self.failing_commits = failing_commits
+
+    def commit(self, message=None, offsets=None, asynchronous=True) -> None:
+        if message is not None and self.failing_commits:
+            self.failing_commits -= 1
+            raise KafkaException("commit failed")
+        super().commit(message=message, offsets=offsets, asynchronous=asynchronous)
+        self.events.append("commit" if message is not None else "flush")
+
+    def close(self) -> None:
+        super().close()
+        self.events.append("close")
+
+
+class IdleWorker:
+    """Background worker that only waits to be stopped"""
+
+    def __init__(self):
+        self._stopped = asyncio.Event()
+
+    async def run(self):
+        await self._stopped.wait()
+
+    def stop(self):
+        self._stopped.set()
+
+
+class SlowProcessor:
+    """Message processor that holds each message until released"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.finished = False
+
+    async def process_message(self, msg) -> bool:
+        self.started.set()
+        await self.release.wait()
+        self.finished = True
+        return True
+
+
+@pytest.fixture
+def events() -> list[str]:
+    return []
+
+
+@pytest.fixture
+def lifespan_env(monkeypatch, events):
+    """Patch app.main so lifespan runs the given Kafka client against no real services"""
+
+    async def no_warm_up():
+        readiness.database_warmed = True
+
+    async def dispose_engines():
+        events.append("dispose")
+
+    monkeypatch.setattr(readiness, "draining", False)
+    monkeypatch.setattr(readiness, "database_warmed", False)
+    monkeypatch.setattr(readiness, "kafka_subscribed", False)
+    monkeypatch.setattr(app.main, "warm_up_database", no_warm_up)
+    monkeypatch.setattr(app.main, "dispose_engines", dispose_engines)
+    for name in (
+        "outbox_relay",
+        "expiry_sweeper",
+        "change_feed",
+        "snapshot_builder",
+        "supporter_filter",
+        "span_processor",
+    ):
+        monkeypatch.setattr(app.main, name, IdleWorker())
+    monkeypatch.setattr(app.main.settings, "SHUTDOWN_DRAIN_TIMEOUT_SECONDS", 1.0)
+
+    def install(consumer: RecordingConsumer, processor: SlowProcessor) -> KafkaClient:
+        client = KafkaClient(consumer)
+        client.processor = processor
+        monkeypatch.setattr(app.main, "kafka_client", client)
+        return client
+
+    return install
+
+
+async def release_after(processor: SlowProcessor, delay: float) -> None:
+    await asyncio.sleep(delay)
+    processor.release.set()
+
+
+@pytest.mark.asyncio
+async def test_in_flight_message_commits_before_engines_are_disposed(lifespan_env, events):
+    consumer = RecordingConsumer(events)
+    processor = SlowProcessor()
+    lifespan_env(consumer, processor)
+    message = consumer.produce(b"{}", key=b"supporter")
+
+    async with app.main.lifespan(app.main.app):
+        await asyncio.wait_for(processor.started.wait(), 1)
+        # Finishes while shutdown is already draining the consumer
+        releaser = asyncio.create_task(release_after(processor, 0.1))
+    await releaser
+
+    assert events == ["commit", "close", "dispose"]
+    assert consumer.committed == {message.partition(): message.offset() + 1}
+
+
+@pytest.mark.asyncio
+async def test_failed_commits_are_flushed_before_close(lifespan_env, events):
+    consumer = RecordingConsumer(events, failing_commits=1)
+    processor = SlowProcessor()
+    processor.release.set()
+    client = lifespan_env(consumer, processor)
+    message = consumer.produce(b"{}", key=b"supporter")
+
+    async with app.main.lifespan(app.main.app):
+        await asyncio.wait_for(processor.started.wait(), 1)
+        # Let the consumer record the failed commit before shutdown starts
+        while not client.consumer._uncommitted:
+            await asyncio.sleep(0.01)
+
+    assert events == ["flush", "close", "dispose"]
+    assert consumer.committed == {message.partition(): message.offset() + 1}
+    assert client.consumer._uncommitted == {}
+
+
+@pytest.mark.asyncio
+async def test_message_running_past_the_drain_timeout_is_cancelled_uncommitted(
+    lifespan_env, events, monkeypatch
+):
+    monkeypatch.setattr(app.main.settings, "SHUTDOWN_DRAIN_TIMEOUT_SECONDS", 0.2)
+    consumer = RecordingConsumer(events)
+    processor = SlowProcessor()
+    lifespan_env(consumer, processor)
+    consumer.produce(b"{}", key=b"supporter")
+
+    async with app.main.lifespan(app.main.app):
+        await asyncio.wait_for(processor.started.wait(), 1)
+
+    assert not processor.finished
+    assert consumer.committed == {}
+    assert events == ["close", "dispose"]
+
+
+class IdleChangeFeed(ChangeFeedHub):
+    """Change feed over an empty outbox that only waits to be stopped"""
+
+    async def run(self):
+        await self._stopped.wait()
+
+
+@pytest.mark.asyncio
+async def test_stop_signal_ends_open_change_streams_before_the_server_waits_for_them(
+    lifespan_env, events, monkeypatch
+):
+    async def end_position():
+        return (0, 0)
+
+    async def changes_after(after, limit):
+        return []
+
+    hub = IdleChangeFeed()
+    monkeypatch.setattr(change_feed_module, "change_feed", hub)
+    monkeypatch.setattr(change_feed_module, "_end_position", end_position)
+    monkeypatch.setattr(change_feed_module, "changes_after", changes_after)
+    monkeypatch.setattr(change_feed_module.settings, "CHANGE_FEED_HEARTBEAT_SECONDS", 30.0)
+    monkeypatch.setattr(app.main, "change_feed", hub)
+    lifespan_env(RecordingConsumer(events), SlowProcessor())
+    # The server hands the signal back to the handler it replaced once it has stopped
+    monkeypatch.setattr(app.main.settings, "SHUTDOWN_DRAIN_TIMEOUT_SECONDS", 5.0)
+    previous = signal.signal(signal.SIGTERM, lambda sig, frame: None)
+
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app.main.app, log_level="warning"))
+    serving = asyncio.create_task(server.serve(sockets=[sock]))
+    try:
+        while not server.started:
+            await asyncio.sleep(0.01)
+        reader, writer = await asyncio.open_connection(*sock.getsockname())
+        writer.write(b"GET /internal/changes?format=ndjson HTTP/1.1\r\nHost: test\r\n\r\n")
+        await writer.drain()
+        assert (await reader.readline()).startswith(b"HTTP/1.1 200")
+        while not hub._subscribers:
+            await asyncio.sleep(0.01)
+
+        signal.raise_signal(signal.SIGTERM)
+        # The chunked body ends with an empty chunk once the stream is closed
+        body = await asyncio.wait_for(reader.read(), 2)
+        await asyncio.wait_for(serving, 2)
+        writer.close()
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+
+    assert body.endswith(b"0\r\n\r\n")
+    assert events == ["close", "dispose"]
@@ -0,0 +1,89 @@
+"""Entitlement snapshot workers sharing one node-local path, without a database: snapshot files
+are written directly and grant read-backs return a fixed expiry."""
+
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import time
+import types
+import uuid
+
+import pytest
+
+from app.services import entitlement_snapshot as snapshot_module
+from app.services.change_feed import REBUILD_NOTIFICATION, ChangeFeedHub
+from app.services.entitlement_snapshot import (
+    DELTA,
+    HEADER,
+    MAGIC,
+    EntitlementSnapshot,
+    SnapshotBuilder,
+)
+from app.services.supporter_filter import supporter_filter
+
+SUPPORTER_ID, CREATOR_ID = uuid.uuid4(), uuid.uuid4()
+EXPIRES_AT = datetime.datetime(2030, 1, 1, tzinfo=datetime.UTC)
+
+
+@contextlib.asynccontextmanager
+async def no_session():
+    yield None
+
+
+SHARD = types.SimpleNamespace(name="primary", session_factory=no_session)
+
+
+def write_snapshot(path: str, built_at: int) -> None:
+    """Swap in an empty snapshot the way a build does"""
+    with open(f"{path}.tmp", "wb") as output:
+        output.write(HEADER.pack(MAGIC, 0, built_at))
+    os.replace(f"{path}.tmp", path)
+
+
+@pytest.fixture
+def workers(tmp_path, monkeypatch):
+    """Two workers of one node sharing the snapshot path"""
+
+    async def active_expiry(session, supporter_id, creator_id):
+        return EXPIRES_AT
+
+    monkeypatch.setattr(snapshot_module, "active_expiry", active_expiry)
+    path = str(tmp_path / "entitlements")
+    snapshots = [EntitlementSnapshot(path), EntitlementSnapshot(path)]
+    # Takeover invalidates through the module's builder
+    monkeypatch.setattr(snapshot_module, "snapshot_builder", SnapshotBuilder(snapshots[0]))
+    return snapshots
+
+
+def delta_records(snapshot: EntitlementSnapshot) -> list[tuple]:
+    with open(snapshot.delta_path, "rb") as log:
+        return list(DELTA.iter_unpack(log.read()))
+
+
+@pytest.mark.asyncio
+async def test_only_the_recorder_appends_a_change_seen_by_every_worker(workers):
+    recorder, other = workers
+    for snapshot in workers:
+        snapshot.record_change(SHARD, SUPPORTER_ID, CREATOR_ID)
+    await asyncio.gather(*recorder._tasks)
+
+    assert not other._tasks
+    assert len(delta_records(recorder)) == 1
+
+
+def test_rebuild_notification_distrusts_the_snapshot_until_a_newer_build(workers, monkeypatch):
+    snapshot = workers[0]
+    builder = SnapshotBuilder(snapshot)
+    monkeypatch.setattr("app.services.change_feed.snapshot_builder", builder)
+    monkeypatch.setattr(supporter_filter, "_ready", supporter_filter._ready)
+    write_snapshot(snapshot.path, int(time.time() * 1_000_000))
+    assert snapshot.refresh()
+
+    ChangeFeedHub()._on_notification("primary", None, 0, "", json.dumps(REBUILD_NOTIFICATION))
+
+    assert builder._rebuild.is_set()
+    assert not snapshot.refresh()
+    write_snapshot(snapshot.path, snapshot.stale_before + 1)
+    assert snapshot.refresh()
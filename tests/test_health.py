@@ -0,0 +1,37 @@
+"""Readiness of the Kafka consumer, against the in-memory consumer backend"""
+
+import pytest
+from confluent_kafka import KafkaError
+
+from app.core.health import readiness
+from app.core.kafka_client import KafkaClient
+from app.core.kafka_memory import InMemoryConsumer
+from app.core.kafka_metrics import consumer_metrics
+
+
+@pytest.fixture(autouse=True)
+def fresh_readiness(monkeypatch):
+    monkeypatch.setattr(readiness, "database_warmed", True)
+    monkeypatch.setattr(readiness, "kafka_subscribed", False)
+    monkeypatch.setattr(readiness, "draining", False)
+    monkeypatch.setattr(consumer_metrics, "fatal_error", None)
+    monkeypatch.setattr(consumer_metrics, "assigned_partitions", 0)
+
+
+def test_consumer_without_partitions_is_ready():
+    # More pods than partitions: the group leaves this one idle
+    client = KafkaClient(InMemoryConsumer(partitions=0))
+    client.consumer._initialize_consumer()
+
+    assert readiness.ready
+    assert consumer_metrics.health()[1]["assigned_partitions"] == 0
+
+
+def test_fatal_client_error_makes_the_pod_unready():
+    client = KafkaClient(InMemoryConsumer(partitions=1))
+    client.consumer._initialize_consumer()
+
+    client.consumer._on_error(KafkaError(KafkaError._FATAL, "fenced", fatal=True))
+
+    assert not readiness.ready
+    assert readiness.checks()["kafka"] is False